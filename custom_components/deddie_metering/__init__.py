@@ -3,6 +3,7 @@ from datetime import datetime, timedelta
 from homeassistant import config_entries
 import homeassistant.util.dt as dt_util
 from homeassistant.helpers import entity_registry as er
+import homeassistant.helpers.config_validation as cv
 import asyncio
 
 from .const import (
@@ -16,12 +17,40 @@ from .const import (
 )
 from .coordinator import DeddieDataUpdateCoordinator
 from .helpers.translate import translate
-from .helpers.utils import run_initial_batches
-from .helpers.storage import save_initial_jump_flag
+from .helpers.utils import run_initial_batches, shutdown_process_pool
+from .helpers.statistics import (
+    cancel_pending_corrections,
+    cancel_purge,
+    forget_metadata_ids,
+    forget_purged_states,
+)
+from .helpers.storage import (
+    async_flush_stores,
+    async_preload_stores,
+    save_initial_jump_flag,
+    clear_checkpoint,
+    save_confirmed_until,
+)
 from .api.client import validate_credentials
 
 _LOGGER = logging.getLogger("deddie_metering")
 
+CONFIG_SCHEMA = cv.config_entry_only_config_schema(DOMAIN)
+
+
+async def async_setup(hass, config) -> bool:
+    """
+    Προφόρτωση (μία φορά κατά την εκκίνηση) της αποθηκευμένης κατάστασης
+    όλων των παροχών, την οποία μοιράζονται στη συνέχεια όλες οι
+    καταχωρήσεις, οι coordinators και οι αισθητήρες.
+    """
+    supplies = [
+        entry.data.get("supplyNumber")
+        for entry in hass.config_entries.async_entries(DOMAIN)
+    ]
+    await async_preload_stores(hass, [supply for supply in supplies if supply])
+    return True
+
 
 async def async_migrate_entry(hass, entry: config_entries.ConfigEntry) -> bool:
     """Migration from version 1 → 2"""
@@ -125,10 +154,6 @@ async def async_setup_entry(hass, entry):
     # Έλεγχος πρώτης εγκατάστασης (fresh setup)
     fresh_setup = options.pop(CONF_FRESH_SETUP, False)
 
-    # Αν κάποιο από τα δύο keys βρέθηκε κι αφαιρέθηκε, ενημερώνουμε το entry
-    if migrated or fresh_setup:
-        hass.config_entries.async_update_entry(entry, options=options)
-
     # Συνθήκες για επιλογή βήματος στον coordinator:
     # 1) Αν migrated=True (βήμα Α1):
     #    -> fresh not first για κατανάλωση(restore persistent δεδομένα)
@@ -152,6 +177,7 @@ async def async_setup_entry(hass, entry):
                 initial_time,
                 has_pv,
                 inc_con=False,
+                options=options,
             )
         choose_step_flag = "A1"
     else:
@@ -169,6 +195,7 @@ async def async_setup_entry(hass, entry):
                 initial_time,
                 has_pv,
                 inc_con=True,
+                options=options,
             )
             await save_initial_jump_flag(hass, supply, False, key=ATTR_CONSUMPTION)
             if has_pv:
@@ -187,6 +214,16 @@ async def async_setup_entry(hass, entry):
                 await save_initial_jump_flag(hass, supply, True, key=ATTR_INJECTION)
             choose_step_flag = "C"
 
+    # Αν κάποιο από τα δύο keys βρέθηκε κι αφαιρέθηκε, ενημερώνουμε το entry.
+    # Γίνεται μετά το batch processing, ώστε μια επανεκκίνηση στη διάρκειά του
+    # να το συνεχίσει από το τελευταίο checkpoint.
+    if migrated or fresh_setup:
+        hass.config_entries.async_update_entry(entry, options=options)
+        # Η αρχική λήψη ολοκληρώθηκε: διαγραφή των checkpoints, ώστε να μη
+        # θεωρείται διακοπείσα και να μη μένει αποθηκευμένο παλιό σύνολο
+        for key in (ATTR_CONSUMPTION, ATTR_PRODUCTION, ATTR_INJECTION):
+            await clear_checkpoint(hass, supply, key=key)
+
     # Δημιουργία Coordinator
     update_interval = timedelta(hours=interval)
     coordinator = DeddieDataUpdateCoordinator(
@@ -220,6 +257,18 @@ async def async_unload_entry(hass, entry):
     entry_data = hass.data[DOMAIN].pop(entry.entry_id)
     if "coordinator" in entry_data:
         await entry_data["coordinator"].async_shutdown()
+    # Άμεση εγγραφή όσων αποθηκεύσεων εκκρεμούν στο παράθυρο συγχώνευσης
+    await async_flush_stores()
+    # Ακύρωση των εκκρεμών διορθώσεων, της cache των metadata_id και των
+    # states του τελευταίου purge της παροχής
+    cancel_pending_corrections(entry.data["supplyNumber"])
+    forget_metadata_ids(entry.data["supplyNumber"])
+    forget_purged_states(entry.data["supplyNumber"])
+    # Τερματισμός του process pool και του κοινού purge με την αφαίρεση
+    # της τελευταίας καταχώρησης
+    if not hass.data[DOMAIN]:
+        shutdown_process_pool()
+        cancel_purge()
     _LOGGER.info(
         "Παροχή %s: Η καταχώρηση της ενσωμάτωσης "
         "απενεργοποιήθηκε ή διαμορφώθηκε εκ νέου.",
@@ -230,4 +279,12 @@ async def async_unload_entry(hass, entry):
 
 async def async_remove_entry(hass, entry):
     supply = entry.data["supplyNumber"]
+    # Διαγραφή checkpoints και επιβεβαιωμένων ωρών ώστε μια νέα καταχώρηση
+    # να ξεκινήσει από την αρχή
+    for key in (ATTR_CONSUMPTION, ATTR_PRODUCTION, ATTR_INJECTION):
+        await clear_checkpoint(hass, supply, key=key)
+        await save_confirmed_until(hass, supply, None, key=key)
+    cancel_pending_corrections(supply)
+    forget_metadata_ids(supply)
+    forget_purged_states(supply)
     _LOGGER.info("Παροχή %s: Η καταχώρηση της ενσωμάτωσης διαγράφηκε.", supply)
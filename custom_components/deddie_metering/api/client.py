@@ -10,7 +10,17 @@ from ..helpers.translate import translate
 _LOGGER = logging.getLogger("deddie_metering")
 
 
-async def get_data_from_api(hass, token, supply, tax, from_dt, to_dt, class_type):
+async def get_data_from_api(
+    hass,
+    token,
+    supply,
+    tax,
+    from_dt,
+    to_dt,
+    class_type,
+    raw: bool = False,
+    confirmed: bool = False,
+):
     """
     Αλληλεπίδραση με το API ΔΕΔΔΗΕ: κλήσεις τακτικής άντλησης δεδομένων με έλεγχο
     λήξης κλειδιού token.
@@ -18,6 +28,10 @@ async def get_data_from_api(hass, token, supply, tax, from_dt, to_dt, class_type
       - το toDate να έχει ώρα 20:00:00.000Z
       - το fromDate να έχει ώρα 20:00:00.000Z με αφαίρεση 1 ημέρας.
     Χρησιμοποιεί analysisType=2 για ωριαία άντληση δεδομένων.
+    Με raw=True επιστρέφεται η ακατέργαστη απόκριση (bytes), χωρίς
+    αποκωδικοποίηση του JSON στο event loop. Με confirmed=True ζητούνται
+    μόνο τα επιβεβαιωμένα δεδομένα (confirmedDataFlag)· χρησιμοποιείται μόνο
+    στον επανέλεγχο αναθεωρήσεων με ενεργό το confirmed_tracking.
     """
     headers = {
         "accept": "application/json;charset=utf-8",
@@ -30,7 +44,7 @@ async def get_data_from_api(hass, token, supply, tax, from_dt, to_dt, class_type
     payload = {
         "analysisType": 2,
         "classType": class_type,
-        "confirmedDataFlag": False,
+        "confirmedDataFlag": confirmed,
         "fromDate": from_date_str,
         "hourAnalysisFlag": False,
         "supplyNumber": supply,
@@ -76,6 +90,8 @@ async def get_data_from_api(hass, token, supply, tax, from_dt, to_dt, class_type
                 supply,
                 response.status,
             )
+        if raw:
+            return await response.read()
         data = await response.json()
         if "error" in data:
             raise Exception(data["error"])
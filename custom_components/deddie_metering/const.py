@@ -9,6 +9,53 @@ API_URL = "https://apps.deddie.gr/mdp/rest/getCurves"
 CONF_HAS_PV = "has_pv"
 CONF_FRESH_SETUP = "fresh_setup"
 
+# Process-pool offload της επεξεργασίας μεγάλων αποκρίσεων (opt-in)
+CONF_PROCESS_OFFLOAD = "process_offload"
+CONF_OFFLOAD_MIN_BYTES = "offload_min_bytes"
+# Μικρότερες αποκρίσεις (π.χ. περιοδικές ενημερώσεις) επεξεργάζονται inline
+DEFAULT_OFFLOAD_MIN_BYTES = 256 * 1024
+
+# Cooperative επεξεργασία σε slices, με παραχώρηση του event loop (opt-in)
+CONF_COOPERATIVE = "cooperative_processing"
+CONF_MAX_SLICE_MS = "max_slice_ms"
+DEFAULT_MAX_SLICE_MS = 20
+
+# Memory-bounded backfill: στόχος μέγιστης μνήμης (bytes) ανά παράθυρο (opt-in)
+CONF_BACKFILL_MEMORY_TARGET = "backfill_memory_target"
+# Εκτιμώμενο μέγεθος (bytes) ενός record του API και ενός StatisticData
+ESTIMATED_RECORD_BYTES = 1024
+ESTIMATED_STATISTIC_BYTES = 512
+
+# Incremental re-basing όταν η αρχική ημερομηνία μετακινείται νωρίτερα (opt-in)
+CONF_INCREMENTAL_REBASE = "incremental_rebase"
+
+# Αναθεωρήσεις (revisions) του ΔΕΔΔΗΕ: επανέλεγχος των τελευταίων ημερών (opt-in)
+CONF_REVISION_SCAN = "revision_scan"
+CONF_REVISION_WINDOW_DAYS = "revision_window_days"
+DEFAULT_REVISION_WINDOW_DAYS = 7
+DEFAULT_REVISION_INTERVAL = timedelta(days=1)
+# Ο επανέλεγχος ζητά μόνο τα επιβεβαιωμένα δεδομένα μετά την τελευταία
+# επιβεβαιωμένη ώρα, ώστε κάθε ώρα να ελέγχεται μία φορά (opt-in)
+CONF_CONFIRMED_TRACKING = "confirmed_tracking"
+# Τοπικό αρχείο (SQLite) των ωριαίων τιμών, στο ίδιο πέρασμα με την
+# εισαγωγή των στατιστικών (opt-in)
+CONF_RAW_ARCHIVE = "raw_archive"
+# Μορφή του τοπικού αρχείου: SQLite ή δυαδικά αρχεία ανά έτος μέσω mmap
+CONF_ARCHIVE_BACKEND = "archive_backend"
+ARCHIVE_BACKEND_SQLITE = "sqlite"
+ARCHIVE_BACKEND_MMAP = "mmap"
+DEFAULT_ARCHIVE_BACKEND = ARCHIVE_BACKEND_SQLITE
+# Έτη μετά τα οποία τα αρχεία έτους (mmap) συμπιέζονται (cold storage)
+CONF_ARCHIVE_COLD_AFTER_YEARS = "archive_cold_after_years"
+# Παράθυρο (δευτερόλεπτα) συγχώνευσης των εγγραφών στα αρχεία αποθήκευσης
+STORAGE_SAVE_DELAY = 10
+# Μέγιστη αναμονή (δευτερόλεπτα) ερωτημάτων στη βάση δεδομένων HA
+STATISTICS_QUERY_TIMEOUT = 30
+# Παράθυρο (δευτερόλεπτα) συγχώνευσης των διορθώσεων στατιστικών ανά αισθητήρα
+STATISTICS_CORRECTION_DEBOUNCE = 5
+# Παράθυρο (δευτερόλεπτα) συγκέντρωσης των αισθητήρων για κοινό purge flat states
+PURGE_COALESCE_WINDOW = 300
+
 # Number of consecutive days without PV production
 DEFAULT_PV_THRESHOLD = 7
 
@@ -20,3 +67,9 @@ ATTR_PRODUCTION = "produced"
 ATTR_INJECTION = "injected"
 ATTR_CONSUMPTION = "active"
 ATTR_PV_DETECTION = "pv_detection"
+
+# Πολιτική επικύρωσης records ανά classType: οι προεπιλογές βρίσκονται στο
+# helpers.validation (DEFAULT_VALIDATION_POLICY), ώστε να είναι διαθέσιμες
+# και στο worker process· τα options (validation_policy) μπορούν να
+# παρακάμψουν επιμέρους κανόνες.
+CONF_VALIDATION_POLICY = "validation_policy"
@@ -6,15 +6,23 @@ import homeassistant.util.dt as dt_util
 import homeassistant.components.persistent_notification as pn
 import asyncio
 
-from .helpers.utils import batch_fetch, fetch_since
-from .helpers.storage import load_last_total, load_last_update
+from .helpers.utils import batch_fetch, fetch_since, scan_revisions
+from .helpers.storage import (
+    load_last_total,
+    load_last_update,
+    load_revision_scan,
+    save_revision_scan,
+)
 from .helpers.translate import translate
+from .helpers.watchdog import get_loop_lag_watchdog
 from .api.detection import detect_pv
 from .const import (
     DEFAULT_PV_THRESHOLD,
     ATTR_CONSUMPTION,
     ATTR_PRODUCTION,
     ATTR_INJECTION,
+    CONF_REVISION_SCAN,
+    DEFAULT_REVISION_INTERVAL,
 )
 
 _LOGGER = logging.getLogger("deddie_metering")
@@ -52,6 +60,11 @@ class DeddieDataUpdateCoordinator(DataUpdateCoordinator):
             update_interval=update_interval,
         )
 
+    @property
+    def _options(self) -> Dict[str, Any]:
+        """Τα options της config entry, για τις ρυθμίσεις επεξεργασίας."""
+        return getattr(self._entry, "options", None) or {}
+
     async def _async_update_data(self) -> Dict[str, Any]:
         try:
             # (A1) Fresh not first κατανάλωση & Fresh setup παραγωγή/έγχυση
@@ -135,6 +148,9 @@ class DeddieDataUpdateCoordinator(DataUpdateCoordinator):
     # Εκτέλεση βήματος (D)
     async def _handle_periodic_update(self) -> Dict[str, Any]:
         now = dt_util.now()
+        # Μηδενισμός του loop-lag watchdog για την τρέχουσα ανανέωση
+        watchdog = get_loop_lag_watchdog(self._supply)
+        watchdog.reset()
         # 1o τμήμα - Κατανάλωση
         await self._update_consumption(now)
         # 2 τμήμα - PV detection
@@ -143,6 +159,15 @@ class DeddieDataUpdateCoordinator(DataUpdateCoordinator):
         if self.has_pv:
             await self._update_production(now)
             await self._update_injection(now)
+        # Επανέλεγχος αναθεωρήσεων (opt-in, σε αραιά διαστήματα)
+        await self._maybe_scan_revisions(now)
+        _LOGGER.debug(
+            "Παροχή %s: Μέγιστη διάρκεια επεξεργασίας στο event loop "
+            "χωρίς διακοπή: %.1f ms (%d slices).",
+            self._supply,
+            watchdog.max_slice * 1000,
+            watchdog.slices,
+        )
         # 5ο τμήμα - payload
         return await self._build_payload(now)
 
@@ -209,6 +234,7 @@ class DeddieDataUpdateCoordinator(DataUpdateCoordinator):
                 label,
                 60,
                 ATTR_CONSUMPTION,
+                options=self._options,
             )
         else:
             _LOGGER.info(
@@ -227,6 +253,7 @@ class DeddieDataUpdateCoordinator(DataUpdateCoordinator):
                 label,
                 60,
                 ATTR_CONSUMPTION,
+                options=self._options,
             )
 
     # Χρησιμοποιείται στο Βήμα (D) -> 2o τμήμα
@@ -259,6 +286,7 @@ class DeddieDataUpdateCoordinator(DataUpdateCoordinator):
                 label,
                 60,
                 ATTR_PRODUCTION,
+                options=self._options,
             )
         else:
             _LOGGER.info(
@@ -277,6 +305,7 @@ class DeddieDataUpdateCoordinator(DataUpdateCoordinator):
                 label,
                 60,
                 ATTR_PRODUCTION,
+                options=self._options,
             )
 
     # Χρησιμοποιείται στο Βήμα (D) -> 4ο τμήμα
@@ -302,6 +331,7 @@ class DeddieDataUpdateCoordinator(DataUpdateCoordinator):
                 label,
                 60,
                 ATTR_INJECTION,
+                options=self._options,
             )
         else:
             _LOGGER.info(
@@ -320,8 +350,37 @@ class DeddieDataUpdateCoordinator(DataUpdateCoordinator):
                 label,
                 60,
                 ATTR_INJECTION,
+                options=self._options,
             )
 
+    # Χρησιμοποιείται στο Βήμα (D), μετά τις ενημερώσεις
+    async def _maybe_scan_revisions(self, now: datetime) -> None:
+        if not self._options.get(CONF_REVISION_SCAN, False):
+            return
+        for key in (ATTR_CONSUMPTION, ATTR_PRODUCTION, ATTR_INJECTION):
+            if key != ATTR_CONSUMPTION and not self.has_pv:
+                continue
+            last = await load_revision_scan(self.hass, self._supply, key=key)
+            if last and (now - last) < DEFAULT_REVISION_INTERVAL:
+                continue
+            await save_revision_scan(self.hass, self._supply, now, key=key)
+            try:
+                await scan_revisions(
+                    self.hass,
+                    self._token,
+                    self._supply,
+                    self._tax,
+                    key,
+                    options=self._options,
+                )
+            except Exception as err:
+                _LOGGER.warning(
+                    "Παροχή %s: Αποτυχία ελέγχου αναθεωρήσεων %s: %s",
+                    self._supply,
+                    key,
+                    err,
+                )
+
     # Χρησιμοποιείται ως βοηθητική στο Βήμα (D) στο 5ο τμήμα
     async def _maybe_warn_on_pv_gap(self, latest) -> None:
         # Έλεγχος συνεχόμενων ημερών χωρίς παραγωγή
@@ -0,0 +1,29 @@
+"""Diagnostics για τον ΔΕΔΔΗΕ."""
+
+from typing import Any, Dict
+from homeassistant.core import HomeAssistant
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.components.diagnostics import REDACTED, async_redact_data
+from .helpers.storage import storage_stats
+
+# Ευαίσθητα πεδία που δεν εμφανίζονται στα diagnostics (ο τίτλος της
+# καταχώρησης περιέχει τον αριθμό παροχής και αποκρύπτεται επίσης)
+TO_REDACT = {"token", "taxNumber", "supplyNumber"}
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> Dict[str, Any]:
+    """
+    Επιστρέφει τα diagnostics της παροχής: τα στοιχεία του config entry
+    (χωρίς τα ευαίσθητα πεδία) και τους μετρητές του storage (κλήσεις,
+    bytes, p50/p95 διάρκεια ανά λειτουργία και hit ratio της cache).
+    """
+    return {
+        "entry": {
+            "title": REDACTED,
+            "data": async_redact_data(dict(entry.data), TO_REDACT),
+            "options": async_redact_data(dict(entry.options), TO_REDACT),
+        },
+        "storage": storage_stats(),
+    }
@@ -0,0 +1,355 @@
+import logging
+import mmap
+import os
+import sqlite3
+import struct
+from datetime import datetime, timezone
+
+from ..const import DOMAIN, ARCHIVE_BACKEND_MMAP, ARCHIVE_BACKEND_SQLITE
+from .codec import encode_series, iter_decode
+from .parsing import meter_dt_from_seconds
+
+_LOGGER = logging.getLogger("deddie_metering")
+
+# Τοπικό αρχείο (SQLite) των ωριαίων τιμών του ΔΕΔΔΗΕ, στον φάκελο
+# ρυθμίσεων του HA. Το πρωτεύον κλειδί (supply, class_type, hour_ts) είναι
+# και το ευρετήριο των αναζητήσεων ανά παροχή, κλάση και ώρα.
+ARCHIVE_FILENAME = f"{DOMAIN}_archive.db"
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS curves ("
+    "supply TEXT NOT NULL, "
+    "class_type TEXT NOT NULL, "
+    "hour_ts INTEGER NOT NULL, "
+    "value REAL NOT NULL, "
+    "PRIMARY KEY (supply, class_type, hour_ts)"
+    ") WITHOUT ROWID"
+)
+
+
+# Εναλλακτική μορφή: ένα δυαδικό αρχείο σταθερής διάταξης ανά παροχή, κλάση
+# και έτος (UTC), με YEAR_SLOTS τιμές float32 (μία ανά ώρα, έως και δίσεκτο
+# έτος) και bitmap παρουσίας, με πρόσβαση μέσω mmap (~35 KB ανά έτος).
+ARCHIVE_DIRNAME = f"{DOMAIN}_archive"
+YEAR_SLOTS = 366 * 24
+_VALUE_FORMAT = "<f"
+_VALUES_BYTES = YEAR_SLOTS * 4
+YEAR_FILE_BYTES = _VALUES_BYTES + YEAR_SLOTS // 8
+# Παλαιότερα έτη (cold storage) συμπιέζονται σε αρχείο .vz (βλ. codec)
+COLD_SUFFIX = ".vz"
+
+
+def archive_path(hass) -> str:
+    """Διαδρομή του αρχείου SQLite στον φάκελο ρυθμίσεων του HA."""
+    return hass.config.path(ARCHIVE_FILENAME)
+
+
+def archive_dir(hass) -> str:
+    """Φάκελος των δυαδικών αρχείων ανά έτος στον φάκελο ρυθμίσεων του HA."""
+    return hass.config.path(ARCHIVE_DIRNAME)
+
+
+def hourly_values(meter_seconds, sums, start_total: float, tz_name=None) -> list:
+    """
+    Ανακτά τις ωριαίες τιμές από τους συμπαγείς πίνακες της επεξεργασίας
+    (διαφορές διαδοχικών συνόλων, με αρχή το start_total) και επιστρέφει
+    λίστα από (hour_ts, value), όπου hour_ts το epoch της αρχής της ώρας,
+    όπως το start_ts του πίνακα statistics.
+    """
+    rows = []
+    previous = start_total
+    for seconds, total in zip(meter_seconds, sums):
+        start_dt = meter_dt_from_seconds(seconds - 3600, tz_name)
+        rows.append((int(start_dt.timestamp()), round(total - previous, 6)))
+        previous = total
+    return rows
+
+
+def _connect(path: str):
+    conn = sqlite3.connect(path)
+    conn.execute(_SCHEMA)
+    return conn
+
+
+def write_hours(path: str, supply: str, class_type: str, rows: list) -> int:
+    """
+    Αποθηκεύει (ή αντικαθιστά) τις ωριαίες τιμές σε μία συναλλαγή.
+    Επιστρέφει το πλήθος των γραμμών.
+    """
+    conn = _connect(path)
+    try:
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO curves (supply, class_type, hour_ts, value) "
+                "VALUES (?, ?, ?, ?)",
+                ((supply, class_type, hour_ts, value) for hour_ts, value in rows),
+            )
+    finally:
+        conn.close()
+    return len(rows)
+
+
+def read_hours(
+    path: str, supply: str, class_type: str, from_ts: int, to_ts: int
+) -> list:
+    """
+    Επιστρέφει τις αποθηκευμένες ωριαίες τιμές (hour_ts, value) της παροχής
+    και κλάσης για from_ts <= hour_ts <= to_ts, με χρονολογική σειρά.
+    """
+    conn = _connect(path)
+    try:
+        return conn.execute(
+            "SELECT hour_ts, value FROM curves "
+            "WHERE supply = ? AND class_type = ? AND hour_ts BETWEEN ? AND ? "
+            "ORDER BY hour_ts",
+            (supply, class_type, from_ts, to_ts),
+        ).fetchall()
+    finally:
+        conn.close()
+
+
+def _year_slot(hour_ts: int) -> tuple:
+    """Έτος (UTC) και θέση (ώρα από την αρχή του έτους) ενός hour_ts."""
+    year = datetime.fromtimestamp(hour_ts, timezone.utc).year
+    year_start = int(datetime(year, 1, 1, tzinfo=timezone.utc).timestamp())
+    return year, year_start, (hour_ts - year_start) // 3600
+
+
+def _year_file(directory: str, supply: str, class_type: str, year: int) -> str:
+    return os.path.join(directory, f"{supply}_{class_type}_{year}.bin")
+
+
+def _cold_file(directory: str, supply: str, class_type: str, year: int) -> str:
+    return os.path.join(directory, f"{supply}_{class_type}_{year}{COLD_SUFFIX}")
+
+
+def _year_bounds(year: int) -> tuple:
+    start = int(datetime(year, 1, 1, tzinfo=timezone.utc).timestamp())
+    end = int(datetime(year + 1, 1, 1, tzinfo=timezone.utc).timestamp())
+    return start, end
+
+
+def _read_cold(path: str, from_ts: int, to_ts: int) -> list:
+    """
+    Αποκωδικοποιεί το εύρος ενός συμπιεσμένου έτους. Αλλοιωμένο (ValueError)
+    ή ελλιπές (IndexError) αρχείο αναφέρεται ως ValueError με τη διαδρομή του.
+    """
+    with open(path, "rb") as cold_file:
+        data = cold_file.read()
+    try:
+        return list(iter_decode(data, from_ts, to_ts))
+    except (ValueError, IndexError) as err:
+        raise ValueError(f"Αλλοιωμένο συμπιεσμένο αρχείο {path}: {err!r}") from err
+
+
+def _read_mapped(mapped, year_start: int, first: int, last: int) -> list:
+    rows = []
+    count = last - first + 1
+    values = struct.unpack_from(f"<{count}f", mapped, first * 4)
+    for offset, value in enumerate(values):
+        slot = first + offset
+        if mapped[_VALUES_BYTES + slot // 8] & (1 << (slot % 8)):
+            rows.append((year_start + slot * 3600, value))
+    return rows
+
+
+def _write_mapped(mapped, year_start: int, rows) -> None:
+    for hour_ts, value in rows:
+        slot = (hour_ts - year_start) // 3600
+        struct.pack_into(_VALUE_FORMAT, mapped, slot * 4, value)
+        mapped[_VALUES_BYTES + slot // 8] |= 1 << (slot % 8)
+
+
+def _map_year_file(path: str, create: bool):
+    """
+    Αντιστοιχίζει (mmap) ένα αρχείο έτους· None αν δεν υπάρχει. Ένα νέο
+    αρχείο δημιουργείται ατομικά (προσωρινό αρχείο και os.replace), ώστε μια
+    διακοπή να μην αφήνει αρχείο έτους μικρότερου μεγέθους.
+    """
+    if not os.path.exists(path):
+        if not create:
+            return None
+        with open(f"{path}.tmp", "wb") as new_file:
+            new_file.truncate(YEAR_FILE_BYTES)
+        os.replace(f"{path}.tmp", path)
+    with open(path, "r+b") as year_file:
+        return mmap.mmap(year_file.fileno(), YEAR_FILE_BYTES)
+
+
+def write_year_hours(directory: str, supply: str, class_type: str, rows: list) -> int:
+    """
+    Αποθηκεύει τις ωριαίες τιμές στα αρχεία έτους (μία θέση ανά ώρα, O(1))
+    και σημειώνει την παρουσία τους στο bitmap. Ένα συμπιεσμένο (cold) έτος
+    επαναφέρεται πρώτα σε αρχείο έτους. Επιστρέφει το πλήθος των τιμών.
+    """
+    os.makedirs(directory, exist_ok=True)
+    by_year: dict = {}
+    for hour_ts, value in rows:
+        year = _year_slot(hour_ts)[0]
+        by_year.setdefault(year, []).append((hour_ts, value))
+    for year, year_rows in by_year.items():
+        year_start, year_end = _year_bounds(year)
+        cold = _cold_file(directory, supply, class_type, year)
+        previous = []
+        if os.path.exists(cold):
+            previous = _read_cold(cold, year_start, year_end - 1)
+        mapped = _map_year_file(_year_file(directory, supply, class_type, year), True)
+        try:
+            _write_mapped(mapped, year_start, previous)
+            _write_mapped(mapped, year_start, year_rows)
+            mapped.flush()
+        finally:
+            mapped.close()
+        if previous:
+            os.remove(cold)
+    return len(rows)
+
+
+def read_year_hours(
+    directory: str, supply: str, class_type: str, from_ts: int, to_ts: int
+) -> list:
+    """
+    Επιστρέφει τις αποθηκευμένες ωριαίες τιμές (hour_ts, value) για
+    from_ts <= hour_ts <= to_ts από τα αρχεία έτους (ένα unpack ανά έτος) ή,
+    για τα συμπιεσμένα έτη, από την αποκωδικοποίηση μόνο των μπλοκ του εύρους.
+    """
+    rows = []
+    current = from_ts
+    while current <= to_ts:
+        year, year_start, first = _year_slot(current)
+        next_year = _year_bounds(year)[1]
+        last_ts = min(to_ts, next_year - 1)
+        mapped = _map_year_file(_year_file(directory, supply, class_type, year), False)
+        if mapped is not None:
+            try:
+                rows += _read_mapped(
+                    mapped, year_start, first, (last_ts - year_start) // 3600
+                )
+            finally:
+                mapped.close()
+        else:
+            cold = _cold_file(directory, supply, class_type, year)
+            if os.path.exists(cold):
+                rows += _read_cold(cold, current, last_ts)
+        current = next_year
+    return rows
+
+
+def compact_year_files(
+    directory: str, supply: str, class_type: str, before_year: int
+) -> int:
+    """
+    Συμπιέζει (cold storage) τα αρχεία έτους της παροχής και κλάσης που
+    είναι παλαιότερα του before_year. Το συμπιεσμένο αρχείο γράφεται
+    ατομικά (προσωρινό αρχείο και os.replace) πριν διαγραφεί το αρχικό.
+    Επιστρέφει το πλήθος των ετών που συμπιέστηκαν.
+    """
+    if not os.path.isdir(directory):
+        return 0
+    prefix = f"{supply}_{class_type}_"
+    compacted = 0
+    for name in sorted(os.listdir(directory)):
+        if not (name.startswith(prefix) and name.endswith(".bin")):
+            continue
+        year_part = name[len(prefix) : -len(".bin")]
+        if not year_part.isdigit() or int(year_part) >= before_year:
+            continue
+        year = int(year_part)
+        path = os.path.join(directory, name)
+        year_start = _year_bounds(year)[0]
+        mapped = _map_year_file(path, False)
+        try:
+            rows = _read_mapped(mapped, year_start, 0, YEAR_SLOTS - 1)
+        finally:
+            mapped.close()
+        if rows:
+            cold = _cold_file(directory, supply, class_type, year)
+            with open(f"{cold}.tmp", "wb") as cold_file:
+                cold_file.write(encode_series(rows))
+            os.replace(f"{cold}.tmp", cold)
+        os.remove(path)
+        compacted += 1
+    return compacted
+
+
+async def async_archive_hours(
+    hass,
+    supply: str,
+    class_type: str,
+    rows: list,
+    backend: str = ARCHIVE_BACKEND_SQLITE,
+) -> int:
+    """
+    Αποθηκεύει τις ωριαίες τιμές στο τοπικό αρχείο (SQLite ή αρχεία έτους),
+    εκτός event loop. Κάθε σφάλμα του αρχείου (π.χ. ValueError του mmap για
+    αλλοιωμένο αρχείο έτους) καταγράφεται χωρίς να διακόπτει την εισαγωγή.
+    """
+    if not rows:
+        return 0
+    if backend == ARCHIVE_BACKEND_MMAP:
+        job = (write_year_hours, archive_dir(hass))
+    else:
+        job = (write_hours, archive_path(hass))
+    try:
+        return await hass.async_add_executor_job(*job, supply, class_type, rows)
+    except Exception as err:
+        _LOGGER.warning(
+            "Παροχή %s: Σφάλμα αποθήκευσης ωριαίων τιμών στο τοπικό αρχείο: %s",
+            supply,
+            err,
+        )
+        return 0
+
+
+async def async_compact_archive(
+    hass, supply: str, class_type: str, before_year: int
+) -> int:
+    """
+    Συμπιέζει, εκτός event loop, τα αρχεία έτους που είναι παλαιότερα του
+    before_year. Κάθε σφάλμα καταγράφεται χωρίς να διακόπτει την εισαγωγή.
+    """
+    try:
+        return await hass.async_add_executor_job(
+            compact_year_files, archive_dir(hass), supply, class_type, before_year
+        )
+    except Exception as err:
+        _LOGGER.warning(
+            "Παροχή %s: Σφάλμα συμπίεσης παλαιότερων ετών του τοπικού αρχείου: %s",
+            supply,
+            err,
+        )
+        return 0
+
+
+async def async_read_hours(
+    hass,
+    supply: str,
+    class_type: str,
+    from_dt,
+    to_dt,
+    backend: str = ARCHIVE_BACKEND_SQLITE,
+) -> list:
+    """
+    Επιστρέφει τις ωριαίες τιμές (hour_ts, value) του τοπικού αρχείου για
+    ώρες με αρχή από from_dt έως και to_dt, εκτός event loop. Σφάλματα του
+    αρχείου καταγράφονται και επιστρέφεται κενή λίστα.
+    """
+    if backend == ARCHIVE_BACKEND_MMAP:
+        job = (read_year_hours, archive_dir(hass))
+    else:
+        job = (read_hours, archive_path(hass))
+    try:
+        return await hass.async_add_executor_job(
+            *job,
+            supply,
+            class_type,
+            int(from_dt.timestamp()),
+            int(to_dt.timestamp()),
+        )
+    except Exception as err:
+        _LOGGER.warning(
+            "Παροχή %s: Σφάλμα ανάγνωσης ωριαίων τιμών από το τοπικό αρχείο: %s",
+            supply,
+            err,
+        )
+        return []
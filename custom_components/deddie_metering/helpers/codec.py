@@ -0,0 +1,114 @@
+# Συμπαγής κωδικοποίηση (cold storage) ωριαίων σειρών (hour_ts, value):
+# οι τιμές κβαντίζονται σε Wh (VALUE_SCALE) και αποθηκεύονται ως διαφορές
+# (delta) από την προηγούμενη ώρα, με zigzag και varint (LEB128), σε μπλοκ
+# σταθερού πλήθους ωρών. Το χαμηλό bit κάθε varint δηλώνει κενό (ελλείπουσες
+# ώρες), οπότε για συνεχείς ώρες δεν αποθηκεύεται χρονοσφραγίδα. Η κεφαλίδα
+# περιέχει ευρετήριο των μπλοκ, ώστε να αποκωδικοποιείται μόνο το ζητούμενο
+# εύρος. Το module δεν εξαρτάται από το Home Assistant.
+
+MAGIC = b"DDV1"
+VALUE_SCALE = 1000
+BLOCK_HOURS = 7 * 24
+
+
+def _zigzag(value: int) -> int:
+    return value * 2 if value >= 0 else -value * 2 - 1
+
+
+def _unzigzag(value: int) -> int:
+    return value >> 1 if not value & 1 else -((value + 1) >> 1)
+
+
+def _write_varint(out: bytearray, value: int) -> None:
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _read_varint(data, pos: int) -> tuple:
+    result = 0
+    shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return result, pos
+        shift += 7
+
+
+def _encode_block(rows) -> bytearray:
+    block = bytearray()
+    _write_varint(block, len(rows))
+    previous_ts = rows[0][0] - 3600
+    previous_value = 0
+    for hour_ts, value in rows:
+        quantized = round(value * VALUE_SCALE)
+        step = (hour_ts - previous_ts) // 3600
+        gap = step > 1
+        _write_varint(block, _zigzag(quantized - previous_value) << 1 | gap)
+        if gap:
+            _write_varint(block, step)
+        previous_ts = hour_ts
+        previous_value = quantized
+    return block
+
+
+def encode_series(rows: list, block_hours: int = BLOCK_HOURS) -> bytes:
+    """
+    Κωδικοποιεί μια χρονολογικά ταξινομημένη σειρά (hour_ts, value) σε
+    μπλοκ των block_hours ωρών. Επιστρέφει: MAGIC, πλήθος μπλοκ, ευρετήριο
+    (πρώτη ώρα, εύρος σε ώρες και μήκος ανά μπλοκ) και τα δεδομένα τους.
+    """
+    header = bytearray(MAGIC)
+    payload = bytearray()
+    blocks = [rows[i : i + block_hours] for i in range(0, len(rows), block_hours)]
+    _write_varint(header, len(blocks))
+    for block_rows in blocks:
+        block = _encode_block(block_rows)
+        first_ts = block_rows[0][0]
+        _write_varint(header, first_ts)
+        _write_varint(header, (block_rows[-1][0] - first_ts) // 3600)
+        _write_varint(header, len(block))
+        payload += block
+    return bytes(header + payload)
+
+
+def iter_decode(data: bytes, from_ts: int | None = None, to_ts: int | None = None):
+    """
+    Streaming αποκωδικοποίηση: επιστρέφει (yield) τα (hour_ts, value) με
+    from_ts <= hour_ts <= to_ts, αποκωδικοποιώντας μόνο τα μπλοκ που
+    επικαλύπτουν το εύρος (τα υπόλοιπα παρακάμπτονται μέσω του ευρετηρίου).
+    """
+    if data[: len(MAGIC)] != MAGIC:
+        raise ValueError("Μη έγκυρη κωδικοποιημένη σειρά")
+    count, pos = _read_varint(data, len(MAGIC))
+    index = []
+    for _ in range(count):
+        first_ts, pos = _read_varint(data, pos)
+        span, pos = _read_varint(data, pos)
+        length, pos = _read_varint(data, pos)
+        index.append((first_ts, first_ts + span * 3600, length))
+    offset = pos
+    for first_ts, last_ts, length in index:
+        block_pos = offset
+        offset += length
+        if (from_ts is not None and last_ts < from_ts) or (
+            to_ts is not None and first_ts > to_ts
+        ):
+            continue
+        rows, block_pos = _read_varint(data, block_pos)
+        hour_ts = first_ts - 3600
+        quantized = 0
+        for _ in range(rows):
+            delta, block_pos = _read_varint(data, block_pos)
+            step = 1
+            if delta & 1:
+                step, block_pos = _read_varint(data, block_pos)
+            hour_ts += step * 3600
+            quantized += _unzigzag(delta >> 1)
+            if to_ts is not None and hour_ts > to_ts:
+                return
+            if from_ts is None or hour_ts >= from_ts:
+                yield hour_ts, quantized / VALUE_SCALE
@@ -0,0 +1,257 @@
+import json
+import logging
+from array import array
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+from .validation import (
+    DEFAULT_CLASS_TYPE,
+    DEFAULT_VALIDATION_POLICY,
+    compile_validator,
+    resolve_policy,
+)
+
+# Το module εξαρτάται μόνο από το helpers.validation (όχι από το const ή το
+# Home Assistant), ώστε οι συναρτήσεις του να εκτελούνται σε worker process
+# (process pool) χωρίς να φορτώνεται η ενσωμάτωση (βλ. helpers.worker).
+
+_LOGGER = logging.getLogger("deddie_metering")
+
+METER_DATE_FORMAT = "%d/%m/%Y %H:%M"
+
+# Naive "epoch" για τη συμπαγή αναπαράσταση των meterDate ως ακέραια
+# δευτερόλεπτα, ανεξάρτητα από ζώνη ώρας.
+NAIVE_EPOCH = datetime(1970, 1, 1)
+
+# Πλήθος records ομαδοποίησης ανάμεσα σε δύο σημεία διακοπής (yield)
+GROUP_SLICE = 256
+
+# Ωριαίες εγγραφές μιας ημέρας χωρίς αλλαγή ώρας
+HOURS_PER_DAY = 24
+
+
+def decode_curves(raw: bytes) -> list:
+    """
+    Αποκωδικοποιεί την ακατέργαστη απόκριση (bytes) του ΔΕΔΔΗΕ API και
+    επιστρέφει τη λίστα curves. Ρίχνει Exception αν το API επέστρεψε σφάλμα.
+    """
+    data = json.loads(raw)
+    if "error" in data:
+        raise Exception(data["error"])
+    return data.get("curves", [])
+
+
+def expected_hours(day: date, tz_name: str | None) -> int:
+    """
+    Επιστρέφει το πλήθος των ωρών της (τοπικής) ημέρας στη ζώνη ώρας
+    tz_name: 23 την ημέρα της θερινής ώρας, 25 την ημέρα επαναφοράς της
+    χειμερινής και 24 τις υπόλοιπες ημέρες (ή χωρίς ζώνη ώρας).
+    """
+    if not tz_name:
+        return HOURS_PER_DAY
+    tz = ZoneInfo(tz_name)
+    start = datetime.combine(day, time(), tz)
+    end = datetime.combine(day + timedelta(days=1), time(), tz)
+    return int((end.timestamp() - start.timestamp()) // 3600)
+
+
+def _meter_seconds(meter_dt: datetime, tz, fold: int) -> int:
+    """
+    Μετατρέπει τη (naive, τοπική) meterDate σε δευτερόλεπτα από NAIVE_EPOCH.
+    Με ζώνη ώρας, τα δευτερόλεπτα είναι UTC epoch: υπολογίζονται από την
+    αρχή της ώρας (meterDate - 1 ώρα), όπου το fold ξεχωρίζει την
+    επαναλαμβανόμενη ώρα της επαναφοράς στη χειμερινή ώρα.
+    """
+    if tz is None:
+        return int((meter_dt - NAIVE_EPOCH).total_seconds())
+    start = (meter_dt - timedelta(hours=1)).replace(tzinfo=tz, fold=fold)
+    return int(start.timestamp()) + 3600
+
+
+def _drain_records(records: list):
+    """Επιστρέφει τα records αφαιρώντας τα ένα-ένα από το τέλος της λίστας."""
+    while records:
+        yield records.pop()
+
+
+def iter_accumulate(
+    records: list,
+    supply: str,
+    total_consumption: float,
+    drop_records: bool = False,
+    tz_name: str | None = None,
+    policy: tuple | None = None,
+):
+    """
+    Ομαδοποιεί τα records ανά ημέρα (με offset -1 ώρα), απορρίπτει τις
+    ελλιπείς ημέρες (διάφορες των αναμενόμενων έγκυρων records) και
+    υπολογίζει τα συσσωρευμένα σύνολα των πλήρων ημερών. Η εγκυρότητα κάθε
+    record κρίνεται από την πολιτική επικύρωσης (policy, βλ. resolve_policy),
+    με προεπιλογή την πολιτική της κατανάλωσης. Αποδεκτές κενές ή
+    ελλείπουσες τιμές μετρούν ως 0.
+    Με ζώνη ώρας (tz_name) οι αναμενόμενες εγγραφές ανά ημέρα προκύπτουν
+    από τις αλλαγές ώρας (23 ή 25 αντί για 24) και τα meterDate
+    επιστρέφονται ως UTC epoch δευτερόλεπτα (βλ. meter_dt_from_seconds).
+    Στην ημέρα επαναφοράς της χειμερινής ώρας θεωρείται ότι η meterDate της
+    διπλής ώρας εμφανίζεται δύο φορές· ημέρες με εγγραφές που δεν
+    αντιστοιχούν σε μοναδικές ώρες απορρίπτονται.
+    Είναι generator: κάνει yield σε σημεία όπου η επεξεργασία μπορεί να
+    διακοπεί (ανά GROUP_SLICE records και ανά ημέρα) και επιστρέφει
+    (StopIteration.value) συμπαγείς πίνακες (array) με τα meterDate ως naive
+    δευτερόλεπτα από NAIVE_EPOCH και τα αντίστοιχα σύνολα, μαζί με
+    overall_count, skipped_count και το νέο συνολικό consumption.
+    Με drop_records=True (memory-bounded mode) η λίστα records αδειάζει
+    κατά την ομαδοποίηση και κάθε ημέρα απελευθερώνεται μόλις
+    επεξεργαστεί, ώστε να μη διατηρούνται ταυτόχρονα όλα τα δεδομένα.
+    """
+    skipped_count = 0
+    overall_count = 0
+    tz = ZoneInfo(tz_name) if tz_name else None
+    if policy is None:
+        policy = resolve_policy(DEFAULT_VALIDATION_POLICY[DEFAULT_CLASS_TYPE])
+    is_valid = compile_validator(policy)
+    meter_seconds = array("q")
+    sums = array("d")
+
+    # Ομαδοποίηση των records, λαμβάνοντας υπόψη το offset -1 ώρα για το start_dt.
+    records_by_day = defaultdict(list)
+    if drop_records:
+        # Αντιστροφή (in place) ώστε το pop() να δίνει τη χρονολογική σειρά
+        records.reverse()
+        source = _drain_records(records)
+    else:
+        source = records
+    for index, rec in enumerate(source, 1):
+        try:
+            meter_dt = datetime.strptime(rec["meterDate"], METER_DATE_FORMAT)
+            day_key = (meter_dt - timedelta(hours=1)).date()
+            records_by_day[day_key].append(rec)
+        except Exception as e:
+            _LOGGER.info("Παροχή %s: Αδυναμία ομαδοποίησης record: %s", supply, e)
+            skipped_count += 1
+        if index % GROUP_SLICE == 0:
+            yield
+
+    # Επεξεργασία των ομάδων (ημέρες) με χρονολογική σειρά
+    for day in sorted(records_by_day):
+        if drop_records:
+            day_records = records_by_day.pop(day)
+        else:
+            day_records = records_by_day[day]
+        # Έλεγχος ότι υπάρχουν ακριβώς όσες εγγραφές έχει η ημέρα (24, ή
+        # 23/25 στις αλλαγές ώρας) και ότι κάθε εγγραφή είναι έγκυρη
+        # σύμφωνα με την πολιτική επικύρωσης.
+        if len(day_records) != expected_hours(day, tz_name) or not all(
+            map(is_valid, day_records)
+        ):
+            _LOGGER.debug(
+                "Παροχή %s: Ημέρα %s απορρίπτεται λόγω ελλιπών ή μη έγκυρων εγγραφών.",
+                supply,
+                day.strftime("%d/%m/%Y"),
+            )
+            skipped_count += len(day_records)
+            yield
+            continue
+
+        # Επεξεργασία της πλήρους ημέρας:
+        # Τα records της ημέρας ταξινομούνται βάσει της meterDate.
+        day_records.sort(
+            key=lambda r: datetime.strptime(r["meterDate"], METER_DATE_FORMAT)
+        )
+        day_seconds = []
+        day_values = []
+        previous_dt = None
+        for rec in day_records:
+            try:
+                meter_dt = datetime.strptime(rec["meterDate"], METER_DATE_FORMAT)
+                consumption = float(rec.get("consumption") or 0)
+            except Exception as e:
+                _LOGGER.info(
+                    "Παροχή %s: Παράβλεψη εγγραφής για την ημέρα %s λόγω σφάλματος: %s",
+                    supply,
+                    day,
+                    e,
+                )
+                skipped_count += 1
+                continue
+            # Υπόθεση: ο ΔΕΔΔΗΕ επαναλαμβάνει τη meterDate της διπλής ώρας
+            # της επαναφοράς στη χειμερινή ώρα, οπότε η δεύτερη εμφάνισή
+            # της είναι η επαναλαμβανόμενη ώρα (fold=1).
+            fold = 1 if meter_dt == previous_dt else 0
+            previous_dt = meter_dt
+            day_seconds.append(_meter_seconds(meter_dt, tz, fold))
+            day_values.append(consumption)
+        # Κάθε εγγραφή πρέπει να αντιστοιχεί σε μοναδική ώρα: μια ημέρα με
+        # διπλή meterDate εκτός της επαναλαμβανόμενης ώρας (ή μια ημέρα 25
+        # ωρών χωρίς αυτήν) απορρίπτεται, αντί να εισαχθούν διπλές ώρες.
+        if len(set(day_seconds)) != len(day_seconds):
+            _LOGGER.debug(
+                "Παροχή %s: Ημέρα %s απορρίπτεται λόγω διπλών ωρών.",
+                supply,
+                day.strftime("%d/%m/%Y"),
+            )
+            skipped_count += len(day_seconds)
+            yield
+            continue
+        for seconds, consumption in zip(day_seconds, day_values):
+            total_consumption += consumption
+            meter_seconds.append(seconds)
+            sums.append(total_consumption)
+        overall_count += len(day_records)
+        yield
+
+    return meter_seconds, sums, overall_count, skipped_count, total_consumption
+
+
+def run_to_completion(steps):
+    """
+    Εκτελεί χωρίς διακοπές έναν generator επεξεργασίας και επιστρέφει
+    το αποτέλεσμά του.
+    """
+    while True:
+        try:
+            next(steps)
+        except StopIteration as stop:
+            return stop.value
+
+
+def accumulate_records(
+    records: list,
+    supply: str,
+    total_consumption: float,
+    tz_name: str | None = None,
+    policy: tuple | None = None,
+) -> tuple:
+    """Εκτέλεση της iter_accumulate χωρίς διακοπές (inline ή σε worker)."""
+    return run_to_completion(
+        iter_accumulate(
+            records, supply, total_consumption, tz_name=tz_name, policy=policy
+        )
+    )
+
+
+def decode_and_accumulate(
+    raw: bytes,
+    supply: str,
+    total_consumption: float,
+    tz_name: str | None = None,
+    policy: tuple | None = None,
+) -> tuple:
+    """
+    Worker συνάρτηση για το process pool: αποκωδικοποίηση, έλεγχος και
+    υπολογισμός συσσωρευμένων συνόλων από την ακατέργαστη απόκριση του API.
+    """
+    return accumulate_records(
+        decode_curves(raw), supply, total_consumption, tz_name, policy
+    )
+
+
+def meter_dt_from_seconds(seconds: int, tz_name: str | None = None) -> datetime:
+    """
+    Μετατρέπει τα δευτερόλεπτα της iter_accumulate σε meterDate: naive
+    χωρίς ζώνη ώρας, αλλιώς aware στη ζώνη ώρας tz_name.
+    """
+    if not tz_name:
+        return NAIVE_EPOCH + timedelta(seconds=seconds)
+    return datetime.fromtimestamp(seconds, timezone.utc).astimezone(ZoneInfo(tz_name))
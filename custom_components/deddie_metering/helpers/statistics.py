@@ -1,24 +1,153 @@
+import asyncio
 import logging
 from datetime import datetime
-import homeassistant.util.dt as dt_util
+from functools import partial
+from homeassistant.core import callback
 from homeassistant.components.recorder import get_instance
-from homeassistant.components.recorder.statistics import (
-    async_import_statistics,
-    StatisticData,
-    StatisticMetaData,
-    StatisticMeanType,
-)
-from homeassistant.const import UnitOfEnergy
+from homeassistant.components.recorder.tasks import RecorderTask
+from homeassistant.helpers.event import async_call_later
 from sqlalchemy import text
 
-from homeassistant.components.sensor import SensorDeviceClass
+from ..const import (
+    PURGE_COALESCE_WINDOW,
+    STATISTICS_CORRECTION_DEBOUNCE,
+    STATISTICS_QUERY_TIMEOUT,
+)
 
 _LOGGER = logging.getLogger("deddie_metering")
 
+# Cache των metadata_id (πίνακας statistics_meta) ανά statistic_id
+_METADATA_IDS: dict[str, int] = {}
+# Εκκρεμείς διορθώσεις ανά statistic_id: ο νεότερος στόχος και η ακύρωση
+# του timer
+_PENDING_CORRECTIONS: dict[str, dict] = {}
+# Αισθητήρες (όλων των παροχών) προς purge: entity_id -> (παροχή, state),
+# η παροχή και το state κάθε αισθητήρα στο τελευταίο purge και η ακύρωση
+# του timer του παραθύρου
+_PURGE_QUEUE: dict[str, tuple] = {}
+_LAST_PURGED: dict[str, tuple] = {}
+_PURGE_TIMER: dict = {"cancel": None}
+
+
+def _fetch_metadata_id(engine, statistic_id: str):
+    """Επιστρέφει το metadata_id του statistic_id (None αν δεν υπάρχει)."""
+    with engine.connect() as conn:
+        row = conn.execute(
+            text("SELECT id FROM statistics_meta WHERE statistic_id = :statistic_id"),
+            {"statistic_id": statistic_id},
+        ).fetchone()
+    return row[0] if row else None
+
+
+async def _async_metadata_id(instance, statistic_id: str):
+    """
+    Επιστρέφει το metadata_id του statistic_id, αναζητώντας το στη βάση
+    μόνο την πρώτη φορά (στον executor του recorder).
+    """
+    metadata_id = _METADATA_IDS.get(statistic_id)
+    if metadata_id is None:
+        metadata_id = await instance.async_add_executor_job(
+            _fetch_metadata_id, instance.engine, statistic_id
+        )
+        if metadata_id is not None:
+            _METADATA_IDS[statistic_id] = metadata_id
+    return metadata_id
+
+
+class _WriteTask(RecorderTask):
+    """
+    Εγγραφή στη βάση HA που εκτελείται στο thread του recorder, μετά το
+    commit των δικών του εκκρεμών εγγραφών (commit_before), ώστε να μην
+    ανταγωνίζεται τη συνεδρία του για το κλείδωμα της βάσης (SQLite
+    "database is locked"). Το αποτέλεσμα επιστρέφει στο event loop.
+    """
+
+    commit_before = True
+
+    def __init__(self, job, args: tuple, loop, future) -> None:
+        self.job = job
+        self.args = args
+        self.loop = loop
+        self.future = future
+
+    def run(self, instance) -> None:
+        try:
+            result = self.job(instance.engine, *self.args)
+        except Exception as err:
+            self.loop.call_soon_threadsafe(_resolve, self.future, None, err)
+        else:
+            self.loop.call_soon_threadsafe(_resolve, self.future, result, None)
+
+
+def _resolve(future, result, err) -> None:
+    # Η αναμονή μπορεί να έχει ήδη ακυρωθεί (λήξη χρόνου)
+    if future.done():
+        return
+    if err is not None:
+        future.set_exception(err)
+    else:
+        future.set_result(result)
 
-async def _connect(instance, engine):
-    """Τυλίγει το engine.connect() μέσα σε async_add_executor_job."""
-    return await instance.async_add_executor_job(engine.connect)
+
+async def _async_recorder_write(instance, job, *args):
+    """
+    Εκτελεί τη job(engine, *args) ως εργασία του recorder (βλ. _WriteTask)
+    και επιστρέφει το αποτέλεσμά της.
+    """
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+    instance.queue_task(_WriteTask(job, args, loop, future))
+    return await future
+
+
+def forget_metadata_ids(supply: str) -> None:
+    """
+    Αφαιρεί από την cache τα metadata_id των αισθητήρων της παροχής, ώστε να
+    αναζητηθούν ξανά (π.χ. μετά από αφαίρεση ή επαναφορά της καταχώρησης).
+    """
+    for statistic_id in [
+        statistic_id
+        for statistic_id in _METADATA_IDS
+        if statistic_id.startswith("sensor.deddie_")
+        and statistic_id.endswith(f"_{supply}")
+    ]:
+        del _METADATA_IDS[statistic_id]
+
+
+def _has_future_rows(engine, metadata_id: int, last_ts: float) -> bool:
+    """
+    Ελέγχει με LIMIT 1 (ευρετήριο metadata_id, start_ts) αν υπάρχουν
+    εγγραφές του metadata_id μετά το last_ts. Τερματίζει άμεσα τη συνήθη
+    περίπτωση όπου δεν υπάρχουν, χωρίς εργασία στην ουρά του recorder.
+    """
+    with engine.connect() as conn:
+        row = conn.execute(
+            text(
+                "SELECT 1 FROM statistics WHERE metadata_id = :metadata_id "
+                "AND start_ts > :last_ts LIMIT 1"
+            ),
+            {"metadata_id": metadata_id, "last_ts": last_ts},
+        ).fetchone()
+    return row is not None
+
+
+def _update_future_rows(
+    engine, metadata_id: int, last_ts: float, last_total: float
+) -> int:
+    """
+    Θέτει state = sum = last_total στις εγγραφές του metadata_id μετά το
+    last_ts, με ένα ενιαίο UPDATE σε μία συναλλαγή, και επιστρέφει το
+    rowcount.
+    """
+    params = {"metadata_id": metadata_id, "last_ts": last_ts, "total": last_total}
+    with engine.begin() as conn:
+        return conn.execute(
+            text(
+                "UPDATE statistics SET state = :total, sum = :total "
+                "WHERE metadata_id = :metadata_id AND start_ts > :last_ts"
+            ),
+            params,
+        ).rowcount
 
 
 async def update_future_statistics(
@@ -33,90 +162,51 @@ async def update_future_statistics(
     που ανήκουν στον αισθητήρα (βάσει του metadata_id από τον πίνακα
     statistics_meta), για τις οποίες το start_ts είναι μεγαλύτερο από το timestamp
     του last_meter_dt. Ενημερώνει τα πεδία state και sum ώστε να έχουν την τιμή
-    last_total και επιστρέφει τον αριθμό των ενημερωμένων εγγραφών για να υπάρχει
-    σωστή απεικόνιση στο Energy dashboard του HA (διορθώνει τις αρνητικές τιμές που
-    προκαλούνταν μετά από νέα ενημέρωση API).
+    last_total, με ένα ενιαίο (set-based) UPDATE, και επιστρέφει τον αριθμό των
+    ενημερωμένων εγγραφών για να υπάρχει σωστή απεικόνιση στο Energy dashboard
+    του HA (διορθώνει τις αρνητικές τιμές που προκαλούνταν μετά από νέα
+    ενημέρωση API).
     """
     statistic_id = f"sensor.deddie_{type_key}_{supply}"
-
-    # Εσωτερική async συνάρτηση για λήψη των timestamps
-    async def get_future_timestamps() -> list:
-        instance = get_instance(hass)
-        engine = instance.engine
-        try:
-            conn = await _connect(instance, engine)
-        except Exception as e:
-            _LOGGER.error(
-                "Παροχή %s: Σφάλμα σύνδεσης στη βάση HA "
-                "για έλεγχο δεδομένων του αισθητήρα: %s",
-                supply,
-                e,
-            )
-            return []
-
-        try:
-            stmt = text(
-                "SELECT start_ts FROM statistics WHERE metadata_id IN "
-                "(SELECT id FROM statistics_meta WHERE statistic_id = :statistic_id) "
-                "AND start_ts > :last_ts"
-            )
-            result = conn.execute(
-                stmt,
-                {"statistic_id": statistic_id, "last_ts": last_meter_dt.timestamp()},
-            )
-            timestamps = [row[0] for row in result.fetchall()]
-        finally:
-            try:
-                if not conn.closed:
-                    await instance.async_add_executor_job(conn.close)
-            except Exception as e:
-                _LOGGER.warning(
-                    "Παροχή %s: Σφάλμα στο κλείσιμο της σύνδεσης "
-                    "με τη βάση δεδομένων HA: %s",
-                    supply,
-                    e,
+    # Οι αναζητήσεις εκτελούνται στον executor του recorder και μόνο η
+    # συναλλαγή (όταν υπάρχουν εγγραφές) στο thread του· το event loop απλώς
+    # αναμένει, με όριο χρόνου
+    instance = get_instance(hass)
+    last_ts = last_meter_dt.timestamp()
+    try:
+        async with asyncio.timeout(STATISTICS_QUERY_TIMEOUT):
+            metadata_id = await _async_metadata_id(instance, statistic_id)
+            updated = 0
+            if metadata_id is not None and await instance.async_add_executor_job(
+                _has_future_rows, instance.engine, metadata_id, last_ts
+            ):
+                updated = await _async_recorder_write(
+                    instance, _update_future_rows, metadata_id, last_ts, last_total
                 )
-        return timestamps
+    except TimeoutError:
+        _LOGGER.warning(
+            "Παροχή %s: Λήξη χρόνου (%d s) στον έλεγχο δεδομένων του αισθητήρα "
+            "στη βάση HA· ο έλεγχος θα επαναληφθεί στην επόμενη ενημέρωση.",
+            supply,
+            STATISTICS_QUERY_TIMEOUT,
+        )
+        return 0
+    except Exception as e:
+        _LOGGER.error(
+            "Παροχή %s: Σφάλμα σύνδεσης στη βάση HA "
+            "για έλεγχο δεδομένων του αισθητήρα: %s",
+            supply,
+            e,
+        )
+        return 0
 
-    future_timestamps = await get_future_timestamps()
-    if not future_timestamps:
+    if not updated:
         _LOGGER.info(
             "Παροχή %s: Δεν βρέθηκαν ασυνεπείς εγγραφές του αισθητήρα "
             "στη βάση δεδομένων HA.",
             supply,
         )
-        return 0
-
-    future_starts = [
-        dt_util.as_local(datetime.fromtimestamp(ts)) for ts in future_timestamps
-    ]
-    statistic_data_list = [
-        StatisticData(start=start, state=last_total, sum=last_total)
-        for start in future_starts
-    ]
-    # Δυναμικό όνομα βάσει type_key
-    if type_key == "consumption":
-        display_name = f"Κατανάλωση ΔΕΔΔΗΕ {supply}"
-    elif type_key == "production":
-        display_name = f"Παραγωγή ΔΕΔΔΗΕ {supply}"
-    elif type_key == "injection":
-        display_name = f"Έγχυση ΔΕΔΔΗΕ {supply}"
-
-    metadata = StatisticMetaData(
-        statistic_id=statistic_id,
-        source="recorder",
-        name=display_name,
-        unit_of_measurement=UnitOfEnergy.KILO_WATT_HOUR,
-        has_mean=False,
-        has_sum=True,
-        mean_type=StatisticMeanType.NONE,
-        unit_class=SensorDeviceClass.ENERGY,
-    )
-    # Καλείται η async_import_statistics μέσα σε async_add_executor_job
-    await hass.async_add_executor_job(
-        async_import_statistics, hass, metadata, statistic_data_list
-    )
-    return len(statistic_data_list)
+    return updated
 
 
 async def run_update_future_statistics(
@@ -146,9 +236,243 @@ async def run_update_future_statistics(
         )
 
 
-async def purge_flat_states(
-    hass, entity_id: str, supply: str, keep_days: int = 0
+async def async_wait_for_commit(hass, timeout: float) -> bool:
+    """
+    Αναμένει έως ότου ο recorder εκτελέσει και επικυρώσει (commit) όσες
+    εργασίες βρίσκονται στην ουρά του, όπως οι εισαγωγές στατιστικών της
+    async_import_statistics. Επιστρέφει False αν δεν ολοκληρώθηκαν εντός
+    timeout δευτερολέπτων.
+    """
+    try:
+        async with asyncio.timeout(timeout):
+            await get_instance(hass).async_block_till_done()
+    except TimeoutError:
+        return False
+    return True
+
+
+async def _async_update_after_commit(
+    hass,
+    supply: str,
+    last_start_dt: datetime,
+    total: float,
+    type_key: str,
+    commit_timeout: float,
+) -> None:
+    if not await async_wait_for_commit(hass, commit_timeout):
+        _LOGGER.warning(
+            "Παροχή %s: Ο recorder δεν ολοκλήρωσε την εισαγωγή των στατιστικών "
+            "εντός %d s· ο έλεγχος ασυνεπών εγγραφών εκτελείται χωρίς αναμονή.",
+            supply,
+            commit_timeout,
+        )
+    await run_update_future_statistics(hass, supply, last_start_dt, total, type_key)
+
+
+@callback
+def _start_correction(hass, statistic_id: str, _now=None) -> None:
+    pending = _PENDING_CORRECTIONS.pop(statistic_id)
+    hass.async_create_task(
+        _async_update_after_commit(
+            hass,
+            pending["supply"],
+            pending["last_start_dt"],
+            pending["total"],
+            pending["type_key"],
+            pending["commit_timeout"],
+        )
+    )
+
+
+def schedule_future_statistics_update(
+    hass,
+    supply: str,
+    last_start_dt: datetime,
+    total: float,
+    type_key: str,
+    commit_timeout: float,
 ) -> None:
+    """
+    Προγραμματίζει τη run_update_future_statistics αμέσως μετά το commit των
+    στατιστικών που εισήχθησαν (και όχι μετά από σταθερή καθυστέρηση), με
+    μέγιστη αναμονή commit_timeout δευτερόλεπτα. Οι διορθώσεις του ίδιου
+    αισθητήρα συγχωνεύονται: κρατείται μόνο ο νεότερος στόχος (last_start_dt,
+    total) και η διόρθωση εκτελείται μία φορά, STATISTICS_CORRECTION_DEBOUNCE
+    δευτερόλεπτα μετά τον τελευταίο προγραμματισμό.
+    """
+    statistic_id = f"sensor.deddie_{type_key}_{supply}"
+    pending = _PENDING_CORRECTIONS.get(statistic_id)
+    if pending is not None:
+        pending["cancel"]()
+    _PENDING_CORRECTIONS[statistic_id] = {
+        "supply": supply,
+        "type_key": type_key,
+        "last_start_dt": last_start_dt,
+        "total": total,
+        "commit_timeout": commit_timeout,
+        "cancel": async_call_later(
+            hass,
+            STATISTICS_CORRECTION_DEBOUNCE,
+            partial(_start_correction, hass, statistic_id),
+        ),
+    }
+
+
+def cancel_pending_corrections(supply: str) -> None:
+    """
+    Ακυρώνει τις εκκρεμείς (μη εκτελεσμένες) διορθώσεις των αισθητήρων της
+    παροχής, π.χ. κατά την απενεργοποίηση ή αφαίρεση της καταχώρησης.
+    """
+    for statistic_id in [
+        statistic_id
+        for statistic_id, pending in _PENDING_CORRECTIONS.items()
+        if pending["supply"] == supply
+    ]:
+        _PENDING_CORRECTIONS.pop(statistic_id)["cancel"]()
+
+
+def _execute_in_transaction(engine, stmt, params) -> int:
+    """Εκτελεί ένα statement σε ενιαία συναλλαγή και επιστρέφει το rowcount."""
+    with engine.begin() as conn:
+        return conn.execute(stmt, params).rowcount
+
+
+async def shift_statistics(
+    hass,
+    supply: str,
+    from_dt: datetime,
+    offset: float,
+    type_key: str,
+) -> int:
+    """
+    Μετατοπίζει κατά offset τα πεδία state και sum όλων των εγγραφών του
+    αισθητήρα στον πίνακα statistics με start_ts >= from_dt, με ένα ενιαίο
+    (set-based) UPDATE σε μία συναλλαγή. Χρησιμοποιείται στο incremental
+    re-basing, όταν η αρχική ημερομηνία μετακινείται νωρίτερα. Ο αισθητήρας
+    εντοπίζεται με το metadata_id της cache (βλ. _async_metadata_id).
+    Επιστρέφει τον αριθμό των ενημερωμένων εγγραφών.
+    """
+    statistic_id = f"sensor.deddie_{type_key}_{supply}"
+    instance = get_instance(hass)
+    metadata_id = await _async_metadata_id(instance, statistic_id)
+    if metadata_id is None:
+        return 0
+    stmt = text(
+        "UPDATE statistics SET state = state + :offset, sum = sum + :offset "
+        "WHERE metadata_id = :metadata_id AND start_ts >= :from_ts"
+    )
+    updated = await _async_recorder_write(
+        instance,
+        _execute_in_transaction,
+        stmt,
+        {
+            "offset": offset,
+            "metadata_id": metadata_id,
+            "from_ts": from_dt.timestamp(),
+        },
+    )
+    _LOGGER.info(
+        "Παροχή %s: Μετατοπίστηκαν κατά %.2f KWh %d εγγραφές του αισθητήρα %s.",
+        supply,
+        offset,
+        updated,
+        statistic_id,
+    )
+    return updated
+
+
+def _fetch_all(engine, stmt, params) -> list:
+    """Εκτελεί ένα ερώτημα και επιστρέφει όλες τις γραμμές του."""
+    with engine.connect() as conn:
+        return conn.execute(stmt, params).fetchall()
+
+
+async def load_statistic_sums(
+    hass,
+    supply: str,
+    from_ts: float,
+    to_ts: float,
+    type_key: str,
+) -> dict:
+    """
+    Επιστρέφει τα αποθηκευμένα sum του αισθητήρα στον πίνακα statistics,
+    ανά start_ts, για from_ts <= start_ts <= to_ts (κενό λεξικό αν ο
+    αισθητήρας δεν έχει ακόμη metadata_id).
+    """
+    statistic_id = f"sensor.deddie_{type_key}_{supply}"
+    instance = get_instance(hass)
+    metadata_id = await _async_metadata_id(instance, statistic_id)
+    if metadata_id is None:
+        return {}
+    stmt = text(
+        "SELECT start_ts, sum FROM statistics WHERE metadata_id = :metadata_id "
+        "AND start_ts >= :from_ts AND start_ts <= :to_ts"
+    )
+    rows = await instance.async_add_executor_job(
+        _fetch_all,
+        instance.engine,
+        stmt,
+        {"metadata_id": metadata_id, "from_ts": from_ts, "to_ts": to_ts},
+    )
+    return {start_ts: total for start_ts, total in rows}
+
+
+def _apply_range_shifts(engine, metadata_id: int, ranges: list) -> int:
+    """
+    Εφαρμόζει σε μία συναλλαγή τις μετατοπίσεις (from_ts, to_ts, shift):
+    ένα UPDATE ανά διάστημα [from_ts, to_ts), με to_ts=None για το τελευταίο
+    (ανοιχτό) διάστημα. Επιστρέφει το συνολικό rowcount.
+    """
+    where = "WHERE metadata_id = :metadata_id AND start_ts >= :from_ts"
+    update = "UPDATE statistics SET state = state + :shift, sum = sum + :shift "
+    bounded = text(f"{update}{where} AND start_ts < :to_ts")
+    open_ended = text(f"{update}{where}")
+    updated = 0
+    with engine.begin() as conn:
+        for from_ts, to_ts, shift in ranges:
+            params = {"metadata_id": metadata_id, "from_ts": from_ts, "shift": shift}
+            if to_ts is None:
+                updated += conn.execute(open_ended, params).rowcount
+            else:
+                params["to_ts"] = to_ts
+                updated += conn.execute(bounded, params).rowcount
+    return updated
+
+
+async def patch_statistics(
+    hass,
+    supply: str,
+    revisions: list,
+    type_key: str,
+) -> int:
+    """
+    Εφαρμόζει αναθεωρήσεις ωριαίων τιμών (λίστα από (start_ts, delta)) σε
+    μία συναλλαγή. Οι αναθεωρήσεις ταξινομούνται χρονολογικά και κάθε
+    διάστημα ανάμεσα σε δύο διαδοχικές αναθεωρημένες ώρες μετατοπίζεται με
+    ένα UPDATE κατά το σωρευτικό άθροισμα των delta έως την αρχή του, ώστε
+    κάθε εγγραφή να ενημερώνεται μία φορά με σταθερές παραμέτρους.
+    Επιστρέφει τον αριθμό των ενημερωμένων εγγραφών (0 χωρίς metadata_id).
+    """
+    statistic_id = f"sensor.deddie_{type_key}_{supply}"
+    instance = get_instance(hass)
+    metadata_id = await _async_metadata_id(instance, statistic_id)
+    if metadata_id is None:
+        return 0
+    ordered = sorted(revisions)
+    ranges = []
+    shift = 0.0
+    for index, (start_ts, delta) in enumerate(ordered):
+        shift += delta
+        to_ts = ordered[index + 1][0] if index + 1 < len(ordered) else None
+        ranges.append((start_ts, to_ts, shift))
+    return await _async_recorder_write(
+        instance, _apply_range_shifts, metadata_id, ranges
+    )
+
+
+async def purge_flat_states(
+    hass, entity_ids: list, supplies: str, keep_days: int = 0
+) -> bool:
     """
     Ασύγχρονη συνάρτηση που χρησιμοποιεί την υπηρεσία recorder.purge_entities.
     Με αυτή τη λειτουργία, μόλις πραγματοποιηθεί μια επιτυχημένη ενημέρωση από
@@ -156,9 +480,11 @@ async def purge_flat_states(
     short-term states που έχουν δημιουργηθεί στο διάστημα μεταξύ των επιτυχημένων
     ενημερώσεων ώστε να υπάρχει σωστή απεικόνιση στο ιστορικό UI του αισθητήρα
     (διορθώνει τις μειωμένες "flat" τιμές που δημιουργούνται στο ιστορικό UI).
+    Όλοι οι αισθητήρες entity_ids (των παροχών supplies) καθαρίζονται με μία
+    κλήση. Επιστρέφει True σε επιτυχία.
     """
     data = {
-        "entity_id": [entity_id],
+        "entity_id": entity_ids,
         "keep_days": keep_days,
     }
     try:
@@ -168,16 +494,79 @@ async def purge_flat_states(
             service_data=data,
             blocking=True,
         )
-        _LOGGER.info(
-            "Παροχή %s: Επιτυχής διαγραφή των flat state εγγραφών του αισθητήρα %s.",
-            supply,
-            entity_id,
-        )
     except Exception as err:
         _LOGGER.error(
-            "Παροχή %s: Σφάλμα κατά τη διαγραφή των flat state εγγραφών "
-            "του αισθητήρα %s: %s",
-            supply,
-            entity_id,
+            "Παροχές %s: Σφάλμα κατά τη διαγραφή των flat state εγγραφών "
+            "των αισθητήρων %s: %s",
+            supplies,
+            ", ".join(entity_ids),
             err,
         )
+        return False
+    _LOGGER.info(
+        "Παροχές %s: Επιτυχής διαγραφή των flat state εγγραφών των αισθητήρων %s.",
+        supplies,
+        ", ".join(entity_ids),
+    )
+    return True
+
+
+def schedule_purge(hass, entity_id: str, supply: str, state: float) -> None:
+    """
+    Προσθέτει τον αισθητήρα στο επόμενο κοινό (batched) purge flat states,
+    που εκτελείται μία φορά ανά PURGE_COALESCE_WINDOW για όλες τις παροχές.
+    Αισθητήρες των οποίων το state δεν άλλαξε από το τελευταίο purge
+    παραλείπονται.
+    """
+    if _LAST_PURGED.get(entity_id) == (supply, state):
+        return
+    _PURGE_QUEUE[entity_id] = (supply, state)
+    if _PURGE_TIMER["cancel"] is None:
+        _PURGE_TIMER["cancel"] = async_call_later(
+            hass, PURGE_COALESCE_WINDOW, partial(_start_purge, hass)
+        )
+
+
+@callback
+def _start_purge(hass, _now=None) -> None:
+    _PURGE_TIMER["cancel"] = None
+    hass.async_create_task(async_purge_pending(hass))
+
+
+def cancel_purge() -> None:
+    """
+    Ακυρώνει το παράθυρο purge που εκκρεμεί και αδειάζει την ουρά του, π.χ.
+    κατά την απενεργοποίηση της τελευταίας καταχώρησης.
+    """
+    if _PURGE_TIMER["cancel"] is not None:
+        _PURGE_TIMER["cancel"]()
+        _PURGE_TIMER["cancel"] = None
+    _PURGE_QUEUE.clear()
+
+
+def forget_purged_states(supply: str) -> None:
+    """
+    Αφαιρεί τα states του τελευταίου purge των αισθητήρων της παροχής, ώστε
+    μετά από επαναφόρτωση ή αφαίρεση της καταχώρησης να μην παραλειφθεί το
+    πρώτο purge τους.
+    """
+    for entity_id in [
+        entity_id
+        for entity_id, (purged_supply, _) in _LAST_PURGED.items()
+        if purged_supply == supply
+    ]:
+        del _LAST_PURGED[entity_id]
+
+
+async def async_purge_pending(hass, keep_days: int = 0) -> None:
+    """
+    Εκτελεί μία κλήση της purge_flat_states για όλους τους αισθητήρες που
+    συγκεντρώθηκαν στο παράθυρο.
+    """
+    batch = dict(_PURGE_QUEUE)
+    _PURGE_QUEUE.clear()
+    if not batch:
+        return
+    supplies = ", ".join(sorted({supply for supply, _ in batch.values()}))
+    if await purge_flat_states(hass, sorted(batch), supplies, keep_days):
+        _LAST_PURGED.update(batch)
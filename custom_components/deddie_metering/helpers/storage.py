@@ -1,94 +1,486 @@
+import asyncio
+import json
+import time
+from collections import deque
+from functools import partial, wraps
 import homeassistant.util.dt as dt_util
 from homeassistant.helpers.storage import Store
-from ..const import DOMAIN, ATTR_CONSUMPTION
+from ..const import DOMAIN, ATTR_CONSUMPTION, STORAGE_SAVE_DELAY
 
+# Έκδοση και όνομα των stores κατάστασης: ένα αρχείο (shard) ανά παροχή
+# ({DOMAIN}_state_{supply}.json), ώστε η εγγραφή μιας παροχής να μην
+# ξαναγράφει τα δεδομένα των υπολοίπων.
+STORAGE_VERSION = 1
+STATE_STORE = "state"
+# Αρχεία της αρχικής μορφής (όνομα -> πεδίο της ενιαίας εγγραφής)
+LEGACY_STORES = {
+    "last_total": "total",
+    "last_update": "last_update",
+    "initial_jump": "jump",
+}
 
+
+# Πλήθος πρόσφατων μετρήσεων διάρκειας που κρατούνται ανά λειτουργία
+STATS_SAMPLES = 512
+
+
+class _OpStats:
+    """Μετρητές μιας λειτουργίας: κλήσεις, bytes και πρόσφατες διάρκειες."""
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.bytes = 0
+        self.samples: deque = deque(maxlen=STATS_SAMPLES)
+
+    def record(self, elapsed: float | None = None, size: int = 0) -> None:
+        self.calls += 1
+        self.bytes += size
+        if elapsed is not None:
+            self.samples.append(elapsed)
+
+    def as_dict(self) -> dict:
+        ordered = sorted(self.samples)
+        return {
+            "calls": self.calls,
+            "bytes": self.bytes,
+            "p50_ms": _percentile_ms(ordered, 50),
+            "p95_ms": _percentile_ms(ordered, 95),
+        }
+
+
+def _percentile_ms(ordered: list, percent: int):
+    # Nearest-rank εκατοστημόριο (ms) ταξινομημένων διαρκειών (δευτερόλεπτα)
+    if not ordered:
+        return None
+    rank = max(1, -(-len(ordered) * percent // 100))
+    return round(ordered[rank - 1] * 1000, 3)
+
+
+# Μετρητές ανά λειτουργία (process-wide): οι δημόσιες συναρτήσεις με το όνομά
+# τους και οι προσβάσεις αρχείου ως file_load/file_save/file_delay_save
+_STATS: dict[str, _OpStats] = {}
+_CACHE_STATS = {"hits": 0, "misses": 0}
+
+
+def _stats(name: str) -> _OpStats:
+    stats = _STATS.get(name)
+    if stats is None:
+        stats = _STATS[name] = _OpStats()
+    return stats
+
+
+def _json_size(data) -> int:
+    return len(json.dumps(data, default=str)) if data is not None else 0
+
+
+def _instrumented(func):
+    """Καταγράφει κλήσεις και διάρκεια της δημόσιας συνάρτησης του store."""
+
+    @wraps(func)
+    async def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return await func(*args, **kwargs)
+        finally:
+            _stats(func.__name__).record(time.perf_counter() - start)
+
+    return wrapper
+
+
+def storage_stats() -> dict:
+    """
+    Επιστρέφει τους μετρητές του storage: ανά λειτουργία πλήθος κλήσεων,
+    bytes και p50/p95 διάρκεια (ms), καθώς και τα hits/misses της cache.
+    """
+    hits, misses = _CACHE_STATS["hits"], _CACHE_STATS["misses"]
+    total = hits + misses
+    return {
+        "operations": {name: _STATS[name].as_dict() for name in sorted(_STATS)},
+        "cache": {
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": round(hits / total, 4) if total else None,
+        },
+        "stores": len(_STORES),
+    }
+
+
+def reset_storage_stats() -> None:
+    """Μηδενίζει τους μετρητές του storage."""
+    _STATS.clear()
+    _CACHE_STATS.update(hits=0, misses=0)
+
+
+class _CachedStore:
+    """
+    Store ενός αρχείου με αντίγραφο των δεδομένων του στη μνήμη. Το αρχείο
+    διαβάζεται μία φορά· οι επόμενες αναγνώσεις εξυπηρετούνται από τη μνήμη
+    και οι εγγραφές ενημερώνουν τη μνήμη και το αρχείο (write-through).
+    Με το async_delay_save οι εγγραφές συγχωνεύονται σε μία εγγραφή αρχείου
+    ανά παράθυρο STORAGE_SAVE_DELAY· το Store του HA την ολοκληρώνει και
+    κατά τον τερματισμό (final write), ενώ το async_flush την επιβάλλει.
+    Αν το αρχείο δεν υπάρχει, το migrate (εφόσον δοθεί) παράγει τα αρχικά
+    δεδομένα μία μόνο φορά.
+    """
+
+    def __init__(self, hass, filename: str, version: int = 1, migrate=None) -> None:
+        self._hass = hass
+        self.filename = filename
+        self._store = Store(hass, version, filename)
+        self._migrate = migrate
+        self._data = None
+        self._loaded = False
+        self._pending = False
+        self._lock = asyncio.Lock()
+
+    async def async_load(self):
+        if self._loaded:
+            _CACHE_STATS["hits"] += 1
+            return self._data
+        async with self._lock:
+            if self._loaded:
+                _CACHE_STATS["hits"] += 1
+                return self._data
+            _CACHE_STATS["misses"] += 1
+            start = time.perf_counter()
+            data = await self._store.async_load()
+            _stats("file_load").record(time.perf_counter() - start, _json_size(data))
+            if data is None and self._migrate is not None:
+                data = await self._migrate(self._hass, self)
+            self._data = data
+            self._loaded = True
+        return self._data
+
+    async def async_save(self, data) -> None:
+        self._data = data
+        self._loaded = True
+        self._pending = False
+        start = time.perf_counter()
+        await self._store.async_save(data)
+        _stats("file_save").record(time.perf_counter() - start, _json_size(data))
+
+    def async_delay_save(self, data) -> None:
+        self._data = data
+        self._loaded = True
+        self._pending = True
+        self._store.async_delay_save(self._data_to_save, STORAGE_SAVE_DELAY)
+
+    def _data_to_save(self):
+        # Καλείται από το Store τη στιγμή της εγγραφής: πάντα τα τρέχοντα δεδομένα
+        self._pending = False
+        _stats("file_delay_save").record(size=_json_size(self._data))
+        return self._data
+
+    async def async_flush(self) -> None:
+        if self._pending:
+            await self.async_save(self._data)
+
+
+# Ένα store ανά αρχείο για όλη τη διεργασία
+_STORES: dict[str, _CachedStore] = {}
+
+
+def _get_store(hass, name: str, version: int = 1, migrate=None) -> _CachedStore:
+    """Επιστρέφει (δημιουργώντας το μία φορά) το store του αρχείου name."""
+    filename = f"{DOMAIN}_{name}.json"
+    store = _STORES.get(filename)
+    if store is None:
+        store = _STORES[filename] = _CachedStore(hass, filename, version, migrate)
+    return store
+
+
+async def async_preload_stores(hass, supplies) -> None:
+    """
+    Φορτώνει παράλληλα, μία φορά, τα shards όλων των παροχών, ώστε οι
+    αναγνώσεις κατά την εκκίνηση (setup, coordinators, αισθητήρες) να
+    εξυπηρετούνται από τη μνήμη.
+    """
+    await asyncio.gather(
+        *(_shard_store(hass, supply).async_load() for supply in supplies)
+    )
+
+
+async def async_flush_stores() -> None:
+    """Γράφει άμεσα στα αρχεία όσες εγγραφές εκκρεμούν στο παράθυρο συγχώνευσης."""
+    for store in list(_STORES.values()):
+        await store.async_flush()
+
+
+def reset_store_cache() -> None:
+    """Αδειάζει την cache των stores (επόμενη ανάγνωση από το αρχείο)."""
+    _STORES.clear()
+
+
+def _parse_legacy_key(field: str, legacy_key: str):
+    """
+    Αναλύει ένα κλειδί της προηγούμενης μορφής σε (κλάση, παροχή). Τα κλειδιά
+    χωρίς κλάση (π.χ. total_{supply}) αφορούν την κατανάλωση και επιστρέφουν
+    fallback=True, ώστε να μην υπερισχύουν των κλειδιών με κλάση.
+    """
+    head, _, supply = legacy_key.rpartition("_")
+    if head == field:
+        return ATTR_CONSUMPTION, supply, True
+    if field == "total":
+        return head.removesuffix("_total"), supply, False
+    return head.removeprefix(f"{field}_"), supply, False
+
+
+async def _async_load_legacy(hass):
+    """
+    Διαβάζει τα αρχεία της αρχικής μορφής και επιστρέφει τις εγγραφές ανά
+    παροχή και κλάση, μαζί με τα stores που βρέθηκαν.
+    """
+    supplies: dict = {}
+    legacy_stores = []
+    for name, field in LEGACY_STORES.items():
+        legacy = Store(hass, 1, f"{DOMAIN}_{name}.json")
+        legacy_data = await legacy.async_load()
+        if not legacy_data:
+            continue
+        legacy_stores.append(legacy)
+        for legacy_key, value in legacy_data.items():
+            key, supply, fallback = _parse_legacy_key(field, legacy_key)
+            record = supplies.setdefault(supply, {}).setdefault(key, {})
+            if fallback:
+                record.setdefault(field, value)
+            else:
+                record[field] = value
+    return supplies, legacy_stores
+
+
+# Σειριοποίηση της μετάπτωσης μεταξύ των shards
+_MIGRATION_LOCK = asyncio.Lock()
+
+
+async def _async_migrate_shard(hass, store: _CachedStore, supply: str) -> dict:
+    """
+    Μετάπτωση (μία φορά) των αρχείων της αρχικής μορφής σε shards: με το πρώτο
+    shard που λείπει, δημιουργούνται τα shards όλων των παροχών που
+    βρέθηκαν (χωρίς να αντικαθίστανται όσα ήδη υπάρχουν) και τα παλιά
+    αρχεία διαγράφονται μόνο αφού αποθηκευτούν τα νέα.
+    """
+    async with _MIGRATION_LOCK:
+        # Το shard μπορεί να δημιουργήθηκε από τη μετάπτωση άλλης παροχής
+        data = await Store(hass, STORAGE_VERSION, store.filename).async_load()
+        if data is not None:
+            return data
+        supplies, old_stores = await _async_load_legacy(hass)
+        for other, records in supplies.items():
+            if other == supply:
+                continue
+            shard = Store(hass, STORAGE_VERSION, _shard_filename(other))
+            if await shard.async_load() is None:
+                await shard.async_save(records)
+        data = supplies.get(supply, {})
+        await store.async_save(data)
+        for old in old_stores:
+            await old.async_remove()
+    return data
+
+
+def _shard_filename(supply: str) -> str:
+    return f"{DOMAIN}_{STATE_STORE}_{supply}.json"
+
+
+def _shard_store(hass, supply: str) -> _CachedStore:
+    return _get_store(
+        hass,
+        f"{STATE_STORE}_{supply}",
+        STORAGE_VERSION,
+        partial(_async_migrate_shard, supply=supply),
+    )
+
+
+async def _async_record(hass, supply: str, key: str) -> dict:
+    """Επιστρέφει (μόνο για ανάγνωση) την εγγραφή της παροχής και κλάσης."""
+    data = await _shard_store(hass, supply).async_load()
+    return data.get(key, {})
+
+
+async def _async_update_record(
+    hass, supply: str, key: str, delay: bool = True, **fields
+) -> None:
+    """
+    Ενημερώνει πεδία της εγγραφής της παροχής και κλάσης (τιμή None
+    διαγράφει το πεδίο). Με delay=True η εγγραφή αρχείου συγχωνεύεται.
+    Γράφεται μόνο το shard της παροχής.
+    """
+    store = _shard_store(hass, supply)
+    data = await store.async_load()
+    record = data.setdefault(key, {})
+    for field, value in fields.items():
+        if value is None:
+            record.pop(field, None)
+        else:
+            record[field] = value
+    if delay:
+        store.async_delay_save(data)
+    else:
+        await store.async_save(data)
+
+
+@_instrumented
 async def load_last_total(hass, supply: str, key: str = ATTR_CONSUMPTION):
     """
     Φορτώνει το τελευταίο συσσωρευμένο σύνολο (last_total) της
     κατανάλωσης/παραγωγής/έγχυσης από το persistent store για
     την συγκεκριμένη παροχή.
     """
-    store = Store(hass, 1, f"{DOMAIN}_last_total.json")
-    data = await store.async_load()
-    if not data:
-        return None
-    # Περίπτωση fallback για consumption
-    if key == ATTR_CONSUMPTION:
-        return data.get(f"{key}_total_{supply}") or data.get(f"total_{supply}")
-    # Υπόλοιπα keys, production & injection
-    return data.get(f"{key}_total_{supply}")
+    return (await _async_record(hass, supply, key)).get("total")
 
 
-async def save_last_total(hass, supply: str, total: float, key: str = "active"):
+@_instrumented
+async def save_last_total(
+    hass, supply: str, total: float, key: str = "active", delay: bool = True
+):
     """
     Αποθηκεύει το τελευταίο συσσωρευμένο σύνολο (last_total) της
     κατανάλωσης/παραγωγής/έγχυσης στο persistent store για την
-    συγκεκριμένη παροχή.
+    συγκεκριμένη παροχή. Με delay=False η εγγραφή αρχείου γίνεται άμεσα,
+    όταν το last_total πρέπει να μείνει συνεπές με ήδη δεσμευμένες
+    αλλαγές στον πίνακα statistics.
     """
-    store = Store(hass, 1, f"{DOMAIN}_last_total.json")
-    data = await store.async_load() or {}
-    data[f"{key}_total_{supply}"] = total
-    await store.async_save(data)
+    await _async_update_record(hass, supply, key, delay=delay, total=total)
 
 
+@_instrumented
 async def load_last_update(hass, supply: str, key: str = ATTR_CONSUMPTION):
     """
     Φορτώνει το timestamp της τελευταίας επιτυχημένης ενημέρωσης (last_update)
     της κατανάλωσης/παραγωγής/έγχυσης, καθώς και του τελευταίου ελέγχου
     φωτοβολταϊκών από το persistent store για την συγκεκριμένη παροχή.
     """
-    store = Store(hass, 1, f"{DOMAIN}_last_update.json")
-    data = await store.async_load()
-    if not data:
-        return None
-    field = f"last_update_{key}_{supply}"
-    # Περίπτωση fallback για consumption
-    if key == ATTR_CONSUMPTION:
-        raw = data.get(field) or data.get(f"last_update_{supply}")
-    else:
-        raw = data.get(field)
-    # Υπόλοιπα keys, production & injection
+    raw = (await _async_record(hass, supply, key)).get("last_update")
     return dt_util.parse_datetime(raw) if raw else None
 
 
+@_instrumented
 async def save_last_update(hass, supply: str, update_dt, key: str = "active"):
     """
     Αποθηκεύει το timestamp της τελευταίας ενημέρωσης (last_update)
     της κατανάλωσης/παραγωγής/έγχυσης στο persistent store για την
     συγκεκριμένη παροχή.
     """
-    store = Store(hass, 1, f"{DOMAIN}_last_update.json")
-    data = await store.async_load() or {}
-    data[f"last_update_{key}_{supply}"] = update_dt.isoformat()
-    await store.async_save(data)
+    await _async_update_record(hass, supply, key, last_update=update_dt.isoformat())
 
 
+@_instrumented
 async def load_initial_jump_flag(hass, supply: str, key: str = ATTR_CONSUMPTION):
     """
     Φορτώνει το flag που δείχνει εάν έχει ήδη πραγματοποιηθεί
     η πρώτη "jump" ενημέρωση της κατανάλωσης/παραγωγής/έγχυσης
     για την παροχή.
     """
-    store = Store(hass, 1, f"{DOMAIN}_initial_jump.json")
-    data = await store.async_load()
-    if not data:
-        return False
-    field = f"jump_{key}_{supply}"
-    # Περίπτωση fallback για consumption
-    if key == ATTR_CONSUMPTION:
-        return data.get(field) or data.get(f"jump_{supply}", False)
-    # Υπόλοιπα keys, production & injection
-    return data.get(field, False)
+    return (await _async_record(hass, supply, key)).get("jump", False)
 
 
+@_instrumented
 async def save_initial_jump_flag(hass, supply: str, flag: bool, key: str = "active"):
     """
     Αποθηκεύει το flag που δείχνει εάν έχει ήδη πραγματοποιηθεί
     η πρώτη "jump" ενημέρωση της κατανάλωσης/παραγωγής/έγχυσης
     για την παροχή.
     """
-    store = Store(hass, 1, f"{DOMAIN}_initial_jump.json")
-    data = await store.async_load() or {}
-    data[f"jump_{key}_{supply}"] = flag
-    await store.async_save(data)
+    await _async_update_record(hass, supply, key, jump=flag)
+
+
+@_instrumented
+async def load_checkpoint(hass, supply: str, key: str = ATTR_CONSUMPTION):
+    """
+    Φορτώνει το checkpoint του τελευταίου batch processing (αρχή backfill,
+    δείκτης παραθύρου, τελευταία εισαχθείσα ώρα και συσσωρευμένο σύνολο)
+    της κατανάλωσης/παραγωγής/έγχυσης για την παροχή.
+    """
+    return (await _async_record(hass, supply, key)).get("checkpoint")
+
+
+def _checkpoint(start_dt, cursor_dt, last_update_dt, total: float) -> dict:
+    return {
+        "start": start_dt.isoformat(),
+        "cursor": cursor_dt.isoformat(),
+        "last_update": last_update_dt.isoformat(),
+        "total": total,
+    }
+
+
+@_instrumented
+async def commit_progress(
+    hass,
+    supply: str,
+    total: float,
+    update_dt,
+    key: str = "active",
+    start_dt=None,
+    cursor_dt=None,
+):
+    """
+    Αποθηκεύει ατομικά, σε μία ενημέρωση της εγγραφής και μία εγγραφή
+    αρχείου, το last_total και το last_update της κατανάλωσης/παραγωγής/
+    έγχυσης, ώστε να μην μένουν ποτέ ασυνεπή μεταξύ τους. Με start_dt και
+    cursor_dt αποθηκεύεται μαζί και το checkpoint του batch processing και
+    η εγγραφή γίνεται άμεσα· διαφορετικά συγχωνεύεται με τις υπόλοιπες.
+    """
+    fields = {"total": total, "last_update": update_dt.isoformat()}
+    if start_dt is None:
+        await _async_update_record(hass, supply, key, **fields)
+        return
+    checkpoint = _checkpoint(start_dt, cursor_dt, update_dt, total)
+    await _async_update_record(
+        hass, supply, key, delay=False, checkpoint=checkpoint, **fields
+    )
+
+
+@_instrumented
+async def clear_checkpoint(hass, supply: str, key: str = "active"):
+    """
+    Διαγράφει το checkpoint του batch processing της
+    κατανάλωσης/παραγωγής/έγχυσης για την παροχή.
+    """
+    if "checkpoint" in await _async_record(hass, supply, key):
+        await _async_update_record(hass, supply, key, delay=False, checkpoint=None)
+
+
+@_instrumented
+async def load_confirmed_until(hass, supply: str, key: str = ATTR_CONSUMPTION):
+    """
+    Φορτώνει την τελευταία ώρα (meterDate) έως την οποία τα δεδομένα της
+    κατανάλωσης/παραγωγής/έγχυσης έχουν επιβεβαιωθεί από τον ΔΕΔΔΗΕ.
+    """
+    raw = (await _async_record(hass, supply, key)).get("confirmed")
+    return dt_util.parse_datetime(raw) if raw else None
+
+
+@_instrumented
+async def save_confirmed_until(hass, supply: str, confirmed_dt, key: str = "active"):
+    """
+    Αποθηκεύει την τελευταία επιβεβαιωμένη ώρα (meterDate) της
+    κατανάλωσης/παραγωγής/έγχυσης. Με confirmed_dt=None διαγράφεται,
+    ώστε όλα τα δεδομένα να θεωρούνται ξανά μη επιβεβαιωμένα.
+    """
+    if confirmed_dt is None:
+        if "confirmed" not in await _async_record(hass, supply, key):
+            return
+        await _async_update_record(hass, supply, key, confirmed=None)
+    else:
+        await _async_update_record(
+            hass, supply, key, confirmed=confirmed_dt.isoformat()
+        )
+
+
+@_instrumented
+async def load_revision_scan(hass, supply: str, key: str = ATTR_CONSUMPTION):
+    """
+    Φορτώνει το timestamp του τελευταίου επανελέγχου αναθεωρήσεων της
+    κατανάλωσης/παραγωγής/έγχυσης για την παροχή.
+    """
+    raw = (await _async_record(hass, supply, key)).get("revision_scan")
+    return dt_util.parse_datetime(raw) if raw else None
+
+
+@_instrumented
+async def save_revision_scan(hass, supply: str, scan_dt, key: str = "active"):
+    """
+    Αποθηκεύει το timestamp του τελευταίου επανελέγχου αναθεωρήσεων της
+    κατανάλωσης/παραγωγής/έγχυσης για την παροχή.
+    """
+    await _async_update_record(hass, supply, key, revision_scan=scan_dt.isoformat())
@@ -1,6 +1,11 @@
+import asyncio
 import logging
-from collections import defaultdict
-from datetime import datetime, timedelta
+import multiprocessing
+import os
+import re
+import runpy
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta, timezone
 import homeassistant.util.dt as dt_util
 from homeassistant.components.recorder.statistics import (
     async_import_statistics,
@@ -12,94 +17,306 @@ from homeassistant.const import UnitOfEnergy
 from homeassistant.components.sensor import SensorDeviceClass
 from .storage import (
     load_last_total,
+    load_last_update,
+    load_confirmed_until,
+    save_confirmed_until,
     save_last_total,
-    save_last_update,
+    load_checkpoint,
+    commit_progress,
 )
 
-from .statistics import run_update_future_statistics
+from .parsing import (
+    accumulate_records,
+    iter_accumulate,
+    decode_and_accumulate,
+    decode_curves,
+    meter_dt_from_seconds,
+)
+from .validation import DEFAULT_VALIDATION_POLICY, resolve_policy
+from . import worker
+from .archive import (
+    async_archive_hours,
+    async_compact_archive,
+    async_read_hours,
+    hourly_values,
+)
+from .watchdog import LoopLagWatchdog, get_loop_lag_watchdog
+from .statistics import (
+    schedule_future_statistics_update,
+    shift_statistics,
+    load_statistic_sums,
+    patch_statistics,
+)
 from ..api.client import get_data_from_api
-from ..const import ATTR_PRODUCTION, ATTR_INJECTION, ATTR_CONSUMPTION
+from ..const import (
+    ATTR_PRODUCTION,
+    ATTR_INJECTION,
+    ATTR_CONSUMPTION,
+    CONF_PROCESS_OFFLOAD,
+    CONF_OFFLOAD_MIN_BYTES,
+    DEFAULT_OFFLOAD_MIN_BYTES,
+    CONF_COOPERATIVE,
+    CONF_MAX_SLICE_MS,
+    DEFAULT_MAX_SLICE_MS,
+    CONF_BACKFILL_MEMORY_TARGET,
+    ESTIMATED_RECORD_BYTES,
+    ESTIMATED_STATISTIC_BYTES,
+    CONF_VALIDATION_POLICY,
+    CONF_REVISION_WINDOW_DAYS,
+    DEFAULT_REVISION_WINDOW_DAYS,
+    CONF_CONFIRMED_TRACKING,
+    CONF_RAW_ARCHIVE,
+    CONF_ARCHIVE_BACKEND,
+    DEFAULT_ARCHIVE_BACKEND,
+    ARCHIVE_BACKEND_MMAP,
+    CONF_ARCHIVE_COLD_AFTER_YEARS,
+)
 
 
 _LOGGER = logging.getLogger("deddie_metering")
 
+# Εντοπισμός της πρώτης meterDate στην ακατέργαστη απόκριση του API,
+# χωρίς αποκωδικοποίηση ολόκληρου του JSON.
+_METER_DATE_RE = re.compile(rb'"meterDate"\s*:\s*"([^"]*)"')
+
+_PROCESS_POOL = None
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    """
+    Επιστρέφει (δημιουργώντας την πρώτη φορά) το κοινό process pool για
+    την επεξεργασία μεγάλων αποκρίσεων του API εκτός event loop. Ο worker
+    εκκινεί με το helpers.worker, ώστε να φορτώνει μόνο τα helpers.parsing
+    και helpers.validation και όχι την ενσωμάτωση ή το Home Assistant.
+    """
+    global _PROCESS_POOL
+    if _PROCESS_POOL is None:
+        package = __package__.rsplit(".", 1)[0]
+        _PROCESS_POOL = ProcessPoolExecutor(
+            max_workers=1,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=runpy.run_path,
+            initargs=(
+                worker.__file__,
+                {
+                    "PACKAGE": package,
+                    "PACKAGE_PATH": os.path.dirname(os.path.dirname(__file__)),
+                },
+            ),
+        )
+    return _PROCESS_POOL
+
+
+def shutdown_process_pool() -> None:
+    """Τερματίζει το κοινό process pool, εφόσον έχει δημιουργηθεί."""
+    global _PROCESS_POOL
+    if _PROCESS_POOL is not None:
+        _PROCESS_POOL.shutdown(wait=False, cancel_futures=True)
+        _PROCESS_POOL = None
+
+
+def _first_meter_date(records):
+    """
+    Επιστρέφει το meterDate της πρώτης εγγραφής, είτε τα records είναι λίστα
+    είτε ακατέργαστη απόκριση (bytes) του API, ή None αν δεν υπάρχουν εγγραφές.
+    """
+    if isinstance(records, (bytes, bytearray)):
+        match = _METER_DATE_RE.search(records)
+        if match:
+            return match.group(1).decode()
+        # Απόκριση χωρίς εγγραφές (μικρή): έλεγχος για σφάλμα του API
+        decode_curves(records)
+        return None
+    return records[0].get("meterDate", "") if records else None
+
+
+def backfill_window_days(options: dict | None) -> int:
+    """
+    Επιστρέφει το μήκος (ημέρες) κάθε παραθύρου του batch_fetch. Με ορισμένο
+    backfill_memory_target το παράθυρο περιορίζεται ώστε τα records του
+    (24 ανά ημέρα) να χωρούν στον στόχο μνήμης, με όριο τις 364 ημέρες.
+    """
+    target = (options or {}).get(CONF_BACKFILL_MEMORY_TARGET)
+    if not target:
+        return 364
+    return max(1, min(364, target // (24 * ESTIMATED_RECORD_BYTES)))
+
+
+def _statistics_chunk_size(target: int) -> int:
+    """
+    Πλήθος StatisticData ανά κλήση εισαγωγής σε memory-bounded mode:
+    έως το 1/4 του στόχου μνήμης, σε ακέραιες ημέρες (τουλάχιστον μία).
+    """
+    per_day = 24 * ESTIMATED_STATISTIC_BYTES
+    return max(1, (target // 4) // per_day) * 24
+
+
+async def _run_steps(steps, options: dict, watchdog: LoopLagWatchdog, after_step=None):
+    """
+    Εκτελεί έναν generator επεξεργασίας. Σε cooperative mode, μόλις το
+    τρέχον slice ξεπεράσει το max_slice_ms, παραχωρεί τον έλεγχο στο
+    event loop (asyncio.sleep(0)) πριν συνεχίσει. Το προαιρετικό
+    after_step (coroutine function) καλείται μετά από κάθε βήμα.
+    Επιστρέφει το αποτέλεσμα του generator.
+    """
+    cooperative = options.get(CONF_COOPERATIVE, False)
+    max_slice = options.get(CONF_MAX_SLICE_MS, DEFAULT_MAX_SLICE_MS) / 1000
+    while True:
+        try:
+            next(steps)
+        except StopIteration as stop:
+            return stop.value
+        if after_step is not None:
+            await after_step()
+        if cooperative and watchdog.elapsed() >= max_slice:
+            watchdog.end_slice()
+            await asyncio.sleep(0)
+            watchdog.start_slice()
+
+
+# Αντιστοίχιση type_key στατιστικών -> classType του API
+_CLASS_TYPES = {
+    "consumption": ATTR_CONSUMPTION,
+    "production": ATTR_PRODUCTION,
+    "injection": ATTR_INJECTION,
+}
+_TYPE_KEYS = {class_type: type_key for type_key, class_type in _CLASS_TYPES.items()}
+
+
+def validation_policy(type_key: str, options: dict | None = None) -> tuple:
+    """
+    Επιστρέφει την πολιτική επικύρωσης (βλ. resolve_policy) για το classType
+    του type_key, με τις παρακάμψεις του validation_policy των options.
+    """
+    class_type = _CLASS_TYPES.get(type_key, type_key)
+    defaults = DEFAULT_VALIDATION_POLICY.get(
+        class_type, DEFAULT_VALIDATION_POLICY[ATTR_CONSUMPTION]
+    )
+    overrides = (options or {}).get(CONF_VALIDATION_POLICY, {}).get(class_type)
+    return resolve_policy(defaults, overrides)
+
+
+def _local_tz_name() -> str | None:
+    """
+    Επιστρέφει το όνομα της τοπικής ζώνης ώρας του Home Assistant, για τον
+    υπολογισμό των ωρών κάθε ημέρας στις αλλαγές ώρας, ή None αν δεν είναι
+    διαθέσιμο.
+    """
+    return getattr(getattr(dt_util, "DEFAULT_TIME_ZONE", None), "key", None)
+
+
+def _iter_build_statistics(
+    meter_seconds, sums, all_stats: list, tz_name: str | None = None
+):
+    """
+    Δημιουργεί τα StatisticData από τους συμπαγείς πίνακες της επεξεργασίας,
+    με yield ανά ημέρα (24 εγγραφές). Επιστρέφει την τελευταία έγκυρη meterDate.
+    """
+    last_valid_meter_dt = None
+    for index, (seconds, total_sum) in enumerate(zip(meter_seconds, sums), 1):
+        meter_dt = dt_util.as_local(meter_dt_from_seconds(seconds, tz_name))
+        # Ενημέρωση της τελευταίας έγκυρης meterDate.
+        last_valid_meter_dt = meter_dt
+        # Υπολογισμός του start_dt με offset -1 ώρα (σε απόλυτο χρόνο, ώστε
+        # να είναι σωστό και στις αλλαγές ώρας).
+        start_dt = dt_util.as_local(meter_dt_from_seconds(seconds - 3600, tz_name))
+        all_stats.append(StatisticData(start=start_dt, state=total_sum, sum=total_sum))
+        if index % 24 == 0:
+            yield
+    return last_valid_meter_dt
+
 
 async def process_and_insert(
     hass,
-    records: list,
+    records,
     supply: str,
     total_consumption: float,
     type_key: str,
+    options: dict | None = None,
 ) -> tuple:
     """
     Επεξεργάζεται τα records που λήφθηκαν από το API και εισάγει στατιστικές
     εγγραφές, συνενώνοντας (merging) τις πλήρεις ημέρες (δηλαδή, ημέρες με 24
     έγκυρα records που περιέχουν το πεδίο 'consumption'). Διενεργεί τον έλεγχο
-    ότι, για κάθε ημέρα, υπάρχουν 24 έγκυρες εγγραφές. Αν κάποια ημέρα είναι
-    ελλιπής, απορρίπτεται ολόκληρη. Δημιουργεί μια ενιαία λίστα αντικειμένων
-    StatisticData και καλεί async_import_statistics μία φορά.
+    ότι, για κάθε ημέρα, υπάρχουν 24 έγκυρες εγγραφές (23 ή 25 στις ημέρες
+    αλλαγής ώρας της τοπικής ζώνης ώρας). Αν κάποια ημέρα είναι
+    ελλιπής, απορρίπτεται ολόκληρη. Η εγκυρότητα κάθε record (μηδενική,
+    κενή, ελλείπουσα ή αρνητική τιμή) κρίνεται από την πολιτική επικύρωσης
+    του classType (validation_policy). Δημιουργεί μια ενιαία λίστα αντικειμένων
+    StatisticData και καλεί async_import_statistics μία φορά (ή ανά τμήμα
+    ακέραιων ημερών, με ορισμένο backfill_memory_target).
+    Τα records μπορεί να είναι και η ακατέργαστη απόκριση (bytes) του API:
+    με ενεργό το process_offload και μέγεθος τουλάχιστον offload_min_bytes,
+    η αποκωδικοποίηση, ο έλεγχος και ο υπολογισμός των συνόλων εκτελούνται
+    σε worker process, εκτός event loop. Με ενεργό το cooperative_processing,
+    η επεξεργασία στο event loop γίνεται σε slices έως max_slice_ms.
+    Με ενεργό το raw_archive, οι ωριαίες τιμές των πλήρων ημερών
+    αποθηκεύονται και στο τοπικό αρχείο (βλ. archive, μορφή κατά το
+    archive_backend), στο ίδιο πέρασμα· με archive_cold_after_years τα
+    παλαιότερα έτη των αρχείων έτους συμπιέζονται.
     """
-    skipped_count = 0
-    overall_count = 0
-    last_valid_meter_dt = None
+    options = options or {}
+    start_total = total_consumption
     all_stats = []
+    memory_target = options.get(CONF_BACKFILL_MEMORY_TARGET)
+    tz_name = _local_tz_name()
+    policy = validation_policy(type_key, options)
+    # Μέτρηση της συνεχούς (χωρίς yield) εκτέλεσης στο event loop
+    watchdog = get_loop_lag_watchdog(supply)
+    watchdog.start_slice()
 
-    # Ομαδοποίηση των records, λαμβάνοντας υπόψη το offset -1 ώρα για το start_dt.
-    records_by_day = defaultdict(list)
-    for rec in records:
-        try:
-            meter_dt = datetime.strptime(rec["meterDate"], "%d/%m/%Y %H:%M")
-            day_key = (meter_dt - timedelta(hours=1)).date()
-            records_by_day[day_key].append(rec)
-        except Exception as e:
-            _LOGGER.info("Παροχή %s: Αδυναμία ομαδοποίησης record: %s", supply, e)
-            skipped_count += 1
-
-    # Επεξεργασία των ομάδων (ημέρες)
-    for day, day_records in records_by_day.items():
-        # Έλεγχος ότι υπάρχουν ακριβώς 24 εγγραφές και ότι κάθε
-        # εγγραφή έχει το πεδίο "consumption" με έγκυρη τιμή.
-        if len(day_records) != 24 or any(
-            "consumption" not in r or not r["consumption"] for r in day_records
-        ):
-            _LOGGER.debug(
-                "Παροχή %s: Ημέρα %s απορρίπτεται λόγω ελλιπών ή μη έγκυρων εγγραφών.",
+    min_bytes = options.get(CONF_OFFLOAD_MIN_BYTES, DEFAULT_OFFLOAD_MIN_BYTES)
+    if (
+        isinstance(records, (bytes, bytearray))
+        and options.get(CONF_PROCESS_OFFLOAD, False)
+        and len(records) >= min_bytes
+    ):
+        watchdog.end_slice()
+        series = await hass.loop.run_in_executor(
+            get_process_pool(),
+            decode_and_accumulate,
+            records,
+            supply,
+            total_consumption,
+            tz_name,
+            policy,
+        )
+        watchdog.start_slice()
+    else:
+        if isinstance(records, (bytes, bytearray)):
+            records = decode_curves(records)
+        series = await _run_steps(
+            iter_accumulate(
+                records,
                 supply,
-                day.strftime("%d/%m/%Y"),
-            )
-            skipped_count += len(day_records)
-            continue
+                total_consumption,
+                drop_records=bool(memory_target),
+                tz_name=tz_name,
+                policy=policy,
+            ),
+            options,
+            watchdog,
+        )
+    meter_seconds, sums, overall_count, skipped_count, total_consumption = series
 
-        # Επεξεργασία της πλήρους ημέρας:
-        # Τα records της ημέρας ταξινομούνται βάσει της meterDate.
-        day_records.sort(
-            key=lambda r: datetime.strptime(r["meterDate"], "%d/%m/%Y %H:%M")
+    if options.get(CONF_RAW_ARCHIVE, False):
+        class_type = _CLASS_TYPES.get(type_key, type_key)
+        backend = options.get(CONF_ARCHIVE_BACKEND, DEFAULT_ARCHIVE_BACKEND)
+        await async_archive_hours(
+            hass,
+            supply,
+            class_type,
+            hourly_values(meter_seconds, sums, start_total, tz_name),
+            backend,
         )
-        for rec in day_records:
-            try:
-                meter_dt = datetime.strptime(rec["meterDate"], "%d/%m/%Y %H:%M")
-                meter_dt = dt_util.as_local(meter_dt)
-                # Ενημέρωση της τελευταίας έγκυρης meterDate.
-                last_valid_meter_dt = meter_dt
-                # Υπολογισμός του start_dt με offset -1 ώρα.
-                start_dt = meter_dt - timedelta(hours=1)
-                consumption = float(rec["consumption"])
-                total_consumption += consumption
-                stat = StatisticData(
-                    start=start_dt, state=total_consumption, sum=total_consumption
-                )
-                all_stats.append(stat)
-            except Exception as e:
-                _LOGGER.info(
-                    "Παροχή %s: Παράβλεψη εγγραφής για την ημέρα %s λόγω σφάλματος: %s",
-                    supply,
-                    day,
-                    e,
-                )
-                skipped_count += 1
-        overall_count += len(day_records)
+        # Συμπίεση (cold storage) των παλαιότερων ετών του αρχείου
+        cold_years = options.get(CONF_ARCHIVE_COLD_AFTER_YEARS)
+        if cold_years and backend == ARCHIVE_BACKEND_MMAP:
+            await async_compact_archive(
+                hass, supply, class_type, dt_util.now().year - cold_years
+            )
 
-    if all_stats:
+    async def import_stats():
         # Ορίζουμε statistic_id & display name βάσει class_type
         statistic_id = f"sensor.deddie_{type_key}_{supply}"
         if type_key == "consumption":
@@ -119,11 +336,34 @@ async def process_and_insert(
             mean_type=StatisticMeanType.NONE,
             unit_class=SensorDeviceClass.ENERGY,
         )
+        chunk = all_stats[:]
+        all_stats.clear()
         # Εισαγωγή/ενημέρωση των στατιστικών εγγραφών μέσω async_import_statistics
         await hass.async_add_executor_job(
-            async_import_statistics, hass, metadata, all_stats
+            async_import_statistics, hass, metadata, chunk
         )
 
+    # Memory-bounded mode: εισαγωγή σε τμήματα ακέραιων ημερών, ώστε να
+    # μη διατηρούνται ταυτόχρονα όλα τα StatisticData του παραθύρου.
+    chunk_size = _statistics_chunk_size(memory_target) if memory_target else None
+
+    async def import_full_chunk():
+        if len(all_stats) >= chunk_size:
+            watchdog.end_slice()
+            await import_stats()
+            watchdog.start_slice()
+
+    last_valid_meter_dt = await _run_steps(
+        _iter_build_statistics(meter_seconds, sums, all_stats, tz_name),
+        options,
+        watchdog,
+        import_full_chunk if chunk_size else None,
+    )
+    watchdog.end_slice()
+
+    if all_stats:
+        await import_stats()
+
     if skipped_count:
         _LOGGER.info(
             "Παροχή %s: Απορρίφθηκαν %d εγγραφές λόγω ελλιπών δεδομένων.",
@@ -137,10 +377,18 @@ async def process_and_insert(
 
 
 async def run_initial_batches(
-    hass, token, supply, tax, initial_time, has_pv: bool, inc_con: bool
+    hass,
+    token,
+    supply,
+    tax,
+    initial_time,
+    has_pv: bool,
+    inc_con: bool,
+    options: dict | None = None,
 ):
     """
-    Αρχική λήψη για κατανάλωση, παραγωγή και έγχυση
+    Αρχική λήψη για κατανάλωση, παραγωγή και έγχυση.
+    Τα options (config entry options) μεταφέρονται στην επεξεργασία.
     """
     end_time = dt_util.now()
 
@@ -156,6 +404,7 @@ async def run_initial_batches(
             "Αρχική λήψη κατανάλωσης",
             60,
             ATTR_CONSUMPTION,
+            options=options,
         )
     # Αν έχει PV, batch-fetch για παραγωγή/έγχυση
     if has_pv:
@@ -169,6 +418,7 @@ async def run_initial_batches(
             "Αρχική λήψη παραγωγής",
             60,
             ATTR_PRODUCTION,
+            options=options,
         )
         await batch_fetch(
             hass,
@@ -180,7 +430,295 @@ async def run_initial_batches(
             "Αρχική λήψη έγχυσης",
             60,
             ATTR_INJECTION,
+            options=options,
+        )
+
+
+async def fetch_prefix_total(
+    hass,
+    token,
+    supply,
+    tax,
+    start_dt,
+    end_dt,
+    class_type: str,
+    options: dict | None = None,
+):
+    """
+    Λήψη και εισαγωγή του διαστήματος [start_dt, end_dt) με συσσωρευμένο
+    σύνολο από 0.0, χωρίς ενημέρωση του persistent store (last_total,
+    last_update, checkpoint). Επιστρέφει το σύνολο του διαστήματος ή None
+    αν κάποια κλήση στο API απέτυχε.
+    """
+    offload = bool((options or {}).get(CONF_PROCESS_OFFLOAD, False))
+    window_days = backfill_window_days(options)
+    type_key = _TYPE_KEYS[class_type]
+    last_day = end_dt - timedelta(days=1)
+    total = 0.0
+    current_start = start_dt
+    while current_start <= last_day:
+        batch_end = min(current_start + timedelta(days=window_days), last_day)
+        try:
+            records = await get_data_from_api(
+                hass,
+                token,
+                supply,
+                tax,
+                current_start,
+                batch_end,
+                class_type,
+                raw=offload,
+            )
+            if _first_meter_date(records) is not None:
+                _, total, _ = await process_and_insert(
+                    hass, records, supply, total, type_key, options
+                )
+        except Exception as e:
+            _LOGGER.error(
+                "Παροχή %s: Σφάλμα λήψης δεδομένων από %s έως %s: %s",
+                supply,
+                current_start.strftime("%d/%m/%Y"),
+                batch_end.strftime("%d/%m/%Y"),
+                e,
+            )
+            return None
+        current_start = batch_end + timedelta(days=1)
+    return total
+
+
+async def rebase_initial_batches(
+    hass,
+    token,
+    supply,
+    tax,
+    new_initial,
+    old_initial,
+    has_pv: bool,
+    options: dict | None = None,
+) -> bool:
+    """
+    Incremental re-basing όταν η αρχική ημερομηνία μετακινείται νωρίτερα:
+    λαμβάνεται μόνο το νέο διάστημα [new_initial, old_initial), ενώ οι ήδη
+    εισαχθείσες στατιστικές εγγραφές (από old_initial και μετά)
+    μετατοπίζονται κατά το σύνολο του νέου διαστήματος με ένα ενιαίο UPDATE
+    και το last_total αυξάνεται αντίστοιχα.
+    Επιστρέφει False (χωρίς αλλαγές στα ήδη εισαχθέντα δεδομένα) όταν το
+    re-basing δεν είναι εφικτό: κατηγορία χωρίς προηγούμενη λήψη, διακοπείσα
+    αρχική λήψη (checkpoint) ή αποτυχία λήψης του νέου διαστήματος.
+    """
+    class_types = [ATTR_CONSUMPTION]
+    if has_pv:
+        class_types += [ATTR_PRODUCTION, ATTR_INJECTION]
+    for class_type in class_types:
+        if await load_last_update(hass, supply, key=class_type) is None:
+            return False
+        if await load_checkpoint(hass, supply, key=class_type):
+            return False
+
+    _LOGGER.info(
+        "Παροχή %s: Incremental re-basing: λήψη μόνο του διαστήματος " "από %s έως %s.",
+        supply,
+        new_initial.strftime("%d/%m/%Y"),
+        old_initial.strftime("%d/%m/%Y"),
+    )
+    # 1) Λήψη όλων των νέων διαστημάτων, πριν από οποιαδήποτε μετατόπιση
+    offsets = {}
+    for class_type in class_types:
+        offset = await fetch_prefix_total(
+            hass, token, supply, tax, new_initial, old_initial, class_type, options
+        )
+        if offset is None:
+            return False
+        offsets[class_type] = offset
+
+    # 2) Μετατόπιση των υπαρχουσών εγγραφών και του last_total
+    for class_type, offset in offsets.items():
+        if not offset:
+            continue
+        try:
+            await shift_statistics(
+                hass, supply, old_initial, offset, _TYPE_KEYS[class_type]
+            )
+        except Exception as e:
+            _LOGGER.error(
+                "Παροχή %s: Σφάλμα μετατόπισης των στατιστικών εγγραφών: %s",
+                supply,
+                e,
+            )
+            return False
+        # Άμεση εγγραφή: οι εγγραφές statistics έχουν ήδη μετατοπιστεί
+        last_total = await load_last_total(hass, supply, key=class_type) or 0.0
+        await save_last_total(
+            hass, supply, last_total + offset, key=class_type, delay=False
         )
+    return True
+
+
+# Ανοχή σύγκρισης με το τοπικό αρχείο (το mmap backend αποθηκεύει float32)
+_ARCHIVE_TOLERANCE = 1e-4
+
+
+async def _archive_candidates(
+    hass, supply, class_type: str, fetched: dict, backend: str
+) -> list:
+    """
+    Επιστρέφει, με χρονολογική σειρά, τις ώρες (start_ts) της νέας λήψης
+    που λείπουν από το τοπικό αρχείο ή έχουν διαφορετική τιμή από την
+    αρχειοθετημένη. Μόνο αυτές ελέγχονται στον πίνακα statistics.
+    """
+    archived = dict(
+        await async_read_hours(
+            hass,
+            supply,
+            class_type,
+            datetime.fromtimestamp(min(fetched), timezone.utc),
+            datetime.fromtimestamp(max(fetched), timezone.utc),
+            backend,
+        )
+    )
+    return [
+        start_ts
+        for start_ts in sorted(fetched)
+        if start_ts not in archived
+        or abs(fetched[start_ts] - archived[start_ts]) > _ARCHIVE_TOLERANCE
+    ]
+
+
+async def _apply_revisions(
+    hass, supply, records, class_type: str, options: dict
+) -> tuple:
+    """
+    Συγκρίνει τις ωριαίες τιμές των records με τις ήδη εισαχθείσες (διαφορές
+    διαδοχικών sum στον πίνακα statistics). Οι αναθεωρημένες ώρες
+    διορθώνονται και τα επόμενα sum μετατοπίζονται σε μία συναλλαγή
+    (patch_statistics), ενώ το last_total αυξάνεται κατά τη συνολική
+    διαφορά. Με ενεργό το raw_archive, ο πίνακας statistics διαβάζεται μόνο
+    για τις ώρες που διαφέρουν από το τοπικό αρχείο (ή λείπουν από αυτό),
+    οι οποίες στη συνέχεια αρχειοθετούνται με τις νέες τιμές.
+    Επιστρέφει (συνολική διαφορά, τελευταία meterDate των records).
+    """
+    type_key = _TYPE_KEYS[class_type]
+    tz_name = _local_tz_name()
+    meter_seconds, sums, _, _, _ = accumulate_records(
+        records, supply, 0.0, tz_name, validation_policy(type_key, options)
+    )
+    if not meter_seconds:
+        return 0.0, None
+    last_meter_dt = dt_util.as_local(meter_dt_from_seconds(meter_seconds[-1], tz_name))
+
+    # Ωριαίες τιμές της νέας λήψης, ανά start_ts
+    fetched = {}
+    previous = 0.0
+    for seconds, total in zip(meter_seconds, sums):
+        start_dt = dt_util.as_local(meter_dt_from_seconds(seconds - 3600, tz_name))
+        fetched[start_dt.timestamp()] = total - previous
+        previous = total
+    candidates = sorted(fetched)
+    archive = options.get(CONF_RAW_ARCHIVE, False)
+    if archive:
+        backend = options.get(CONF_ARCHIVE_BACKEND, DEFAULT_ARCHIVE_BACKEND)
+        candidates = await _archive_candidates(
+            hass, supply, class_type, fetched, backend
+        )
+        if not candidates:
+            return 0.0, last_meter_dt
+    stored = await load_statistic_sums(
+        hass, supply, candidates[0] - 3600, candidates[-1], type_key
+    )
+    revisions = []
+    for start_ts in candidates:
+        if start_ts not in stored or start_ts - 3600 not in stored:
+            continue
+        delta = fetched[start_ts] - (stored[start_ts] - stored[start_ts - 3600])
+        if abs(delta) > 1e-6:
+            revisions.append((start_ts, delta))
+    if revisions:
+        await patch_statistics(hass, supply, revisions, type_key)
+    if archive:
+        await async_archive_hours(
+            hass,
+            supply,
+            class_type,
+            [(int(ts), round(fetched[ts], 6)) for ts in candidates],
+            backend,
+        )
+    if not revisions:
+        return 0.0, last_meter_dt
+
+    total_delta = sum(delta for _, delta in revisions)
+    # Άμεση εγγραφή: τα sum έχουν ήδη διορθωθεί στον πίνακα statistics
+    last_total = await load_last_total(hass, supply, key=class_type) or 0.0
+    await save_last_total(
+        hass, supply, last_total + total_delta, key=class_type, delay=False
+    )
+    _LOGGER.info(
+        "Παροχή %s: Εντοπίστηκαν %d αναθεωρημένες ωριαίες τιμές %s "
+        "(συνολική διαφορά %.3f KWh).",
+        supply,
+        len(revisions),
+        class_type,
+        total_delta,
+    )
+    return total_delta, last_meter_dt
+
+
+async def scan_revisions(
+    hass,
+    token,
+    supply,
+    tax,
+    class_type: str,
+    options: dict | None = None,
+) -> float:
+    """
+    Επανέλεγχος αναθεωρήσεων: λαμβάνει ξανά τις τελευταίες revision_window_days
+    ημέρες έως το last_update και διορθώνει τις αναθεωρημένες ώρες
+    (βλ. _apply_revisions). Με ενεργό το confirmed_tracking ζητούνται, με μία
+    κλήση όπως και χωρίς αυτό, μόνο τα επιβεβαιωμένα δεδομένα μετά το
+    confirmed_until, το οποίο στη συνέχεια προχωρά. Οι μη επιβεβαιωμένες ώρες
+    ελέγχονται μία φορά, μόλις επιβεβαιωθούν. Η λήψη δεν ξεκινά ποτέ πριν από
+    την αρχή του παραθύρου, ώστε να μένει εντός του ορίου των 365 ημερών του
+    API· όταν το confirmed_until έχει μείνει πίσω περισσότερο από το παράθυρο,
+    οι ενδιάμεσες ώρες δεν ελέγχονται. Η περιοδική λήψη (fetch_since) δεν
+    επηρεάζεται.
+    Επιστρέφει τη συνολική διαφορά.
+    """
+    last_update = await load_last_update(hass, supply, key=class_type)
+    if last_update is None:
+        return 0.0
+    options = options or {}
+    window_days = options.get(CONF_REVISION_WINDOW_DAYS, DEFAULT_REVISION_WINDOW_DAYS)
+    window_start = last_update - timedelta(days=window_days)
+    if not options.get(CONF_CONFIRMED_TRACKING, False):
+        records = await get_data_from_api(
+            hass, token, supply, tax, window_start, last_update, class_type
+        )
+        total_delta, _ = await _apply_revisions(
+            hass, supply, records, class_type, options
+        )
+        return total_delta
+
+    # Μόνο τα επιβεβαιωμένα δεδομένα μετά το confirmed_until
+    confirmed_until = await load_confirmed_until(hass, supply, key=class_type)
+    confirmed_start = window_start
+    if confirmed_until is not None and confirmed_until > window_start:
+        confirmed_start = confirmed_until
+    records = await get_data_from_api(
+        hass,
+        token,
+        supply,
+        tax,
+        confirmed_start,
+        last_update,
+        class_type,
+        confirmed=True,
+    )
+    total_delta, last_confirmed = await _apply_revisions(
+        hass, supply, records, class_type, options
+    )
+    if last_confirmed and (confirmed_until is None or last_confirmed > confirmed_until):
+        await save_confirmed_until(hass, supply, last_confirmed, key=class_type)
+    return total_delta
 
 
 async def batch_fetch(
@@ -193,6 +731,7 @@ async def batch_fetch(
     context_label: str,
     stats_delay: int,
     class_type: str = ATTR_CONSUMPTION,
+    options: dict | None = None,
 ):
     """
     Εκτελεί λήψη δεδομένων σε batches από start_dt έως end_dt, ώστε
@@ -201,10 +740,12 @@ async def batch_fetch(
       - Ενημερώνει τα συσσωρευμένα σύνολα (total_consumption/production/injection).
       - Την τελευταία έγκυρη ημερομηνία (last_update) μέσω της
         process_and_insert.
-      - Αποθηκεύει τα αποτελέσματα στο persistent store (μέσω save_last_total
-        και save_last_update).
-      - Χρησιμοποιεί context_label για logging και stats_delay για deferred
-        future stats update.
+      - Αποθηκεύει τα αποτελέσματα στο persistent store μετά από κάθε
+        παράθυρο, ατομικά μαζί με checkpoint (commit_progress), ώστε μετά
+        από επανεκκίνηση η ίδια διαδικασία (ίδιο start_dt) να συνεχίζει
+        από το τελευταίο ολοκληρωμένο παράθυρο.
+      - Χρησιμοποιεί context_label για logging και stats_delay ως μέγιστη
+        αναμονή του commit των στατιστικών πριν το future stats update.
     """
     _LOGGER.info(
         "Παροχή %s: %s από %s έως %s.",
@@ -213,12 +754,27 @@ async def batch_fetch(
         start_dt.strftime("%d/%m/%Y"),
         end_dt.strftime("%d/%m/%Y"),
     )
+    # Με ενεργό το process_offload ζητείται η ακατέργαστη απόκριση του API
+    offload = bool((options or {}).get(CONF_PROCESS_OFFLOAD, False))
+    window_days = backfill_window_days(options)
     current_start = start_dt
     total_consumption = await load_last_total(hass, supply, key=class_type) or 0.0
     # Μεταβλητές για αποθήκευση της πρώτης και της τελευταίας έγκυρης
     # meterDate που επεξεργάστηκε επιτυχώς.
     first_meter_dt = None
     last_meter_dt = None
+    # Συνέχιση από checkpoint, εφόσον αφορά την ίδια διαδικασία batch
+    checkpoint = await load_checkpoint(hass, supply, key=class_type)
+    if checkpoint and checkpoint.get("start") == start_dt.isoformat():
+        current_start = dt_util.parse_datetime(checkpoint["cursor"])
+        last_meter_dt = dt_util.parse_datetime(checkpoint["last_update"])
+        total_consumption = checkpoint["total"]
+        _LOGGER.info(
+            "Παροχή %s: <%s> Συνέχιση από το checkpoint της %s.",
+            supply,
+            context_label,
+            current_start.strftime("%d/%m/%Y"),
+        )
     total_count = 0
     if class_type == ATTR_CONSUMPTION:
         type_key = "consumption"
@@ -228,17 +784,26 @@ async def batch_fetch(
         type_key = "injection"
     while current_start < end_dt:
         # Xρησιμοποιούμε timedelta(days=364) ώστε το effective διάστημα
-        # (με το -1 day στο fromDate) να είναι 365 ημέρες.
-        batch_end = min(current_start + timedelta(days=364), end_dt)
+        # (με το -1 day στο fromDate) να είναι 365 ημέρες (ή μικρότερο
+        # παράθυρο σε memory-bounded mode).
+        batch_end = min(current_start + timedelta(days=window_days), end_dt)
         try:
             records = await get_data_from_api(
-                hass, token, supply, tax, current_start, batch_end, class_type
+                hass,
+                token,
+                supply,
+                tax,
+                current_start,
+                batch_end,
+                class_type,
+                raw=offload,
             )
-            if records:
+            first_date = _first_meter_date(records)
+            if first_date is not None:
                 if first_meter_dt is None:
                     try:
                         first_meter_dt = dt_util.as_local(
-                            datetime.strptime(records[0]["meterDate"], "%d/%m/%Y %H:%M")
+                            datetime.strptime(first_date, "%d/%m/%Y %H:%M")
                         )
                         _LOGGER.info(
                             "Παροχή %s: <%s> Βρέθηκαν εγγραφές στο batch "
@@ -259,11 +824,22 @@ async def batch_fetch(
                 # Χρησιμοποιούμε το αποτέλεσμα της process_and_insert για να
                 # πάρουμε την τελευταία έγκυρη meterDate
                 count, total_consumption, last_valid = await process_and_insert(
-                    hass, records, supply, total_consumption, type_key
+                    hass, records, supply, total_consumption, type_key, options
                 )
                 total_count += count
                 if last_valid:
                     last_meter_dt = last_valid
+                    # Checkpoint ανά παράθυρο: last_update, last_total και
+                    # δείκτης του επόμενου παραθύρου σε μία ατομική εγγραφή
+                    await commit_progress(
+                        hass,
+                        supply,
+                        total_consumption,
+                        last_valid,
+                        key=class_type,
+                        start_dt=start_dt,
+                        cursor_dt=batch_end + timedelta(days=1),
+                    )
             else:
                 _LOGGER.info(
                     "Παροχή %s: <%s> Δεν βρέθηκαν εγγραφές από %s έως %s.",
@@ -283,11 +859,9 @@ async def batch_fetch(
             )
         current_start = batch_end + timedelta(days=1)
 
-    # Αν βρέθηκαν έγκυρες εγγραφές, ενημερώνουμε τα last_update
-    # και last_total με τις τελευταίες έγκυρες τιμές.
+    # Τα last_update και last_total έχουν ήδη αποθηκευτεί ανά παράθυρο
+    # με τις τελευταίες έγκυρες τιμές.
     if last_meter_dt is not None:
-        await save_last_update(hass, supply, last_meter_dt, key=class_type)
-        await save_last_total(hass, supply, total_consumption, key=class_type)
         _LOGGER.info(
             "Παροχή %s: <%s> Αποθηκεύτηκαν επιτυχώς %d εγγραφές "
             "για το χρονικό διάστημα από %s έως %s.",
@@ -299,18 +873,14 @@ async def batch_fetch(
         )
 
         # Κλήση run_update_future_statistics αν υπάρχουν ασυνεπείς εγγραφές
-        # στο statistics με καθυστέρηση 60΄΄ για ασφαλή πρόσβαση στη βάση δεδομένων
+        # στο statistics, μόλις ο recorder επικυρώσει τις εισαγωγές (έως
+        # stats_delay δευτερόλεπτα αναμονής)
         if total_count > 0:
             # Χρησιμοποιούμε το start_dt της τελευταίας εγγραφής,
             # δηλαδή, last_meter_dt - 1 ώρα
             last_start_dt = last_meter_dt - timedelta(hours=1)
-            hass.loop.call_later(
-                stats_delay,
-                lambda: hass.async_create_task(
-                    run_update_future_statistics(
-                        hass, supply, last_start_dt, total_consumption, type_key
-                    )
-                ),
+            schedule_future_statistics_update(
+                hass, supply, last_start_dt, total_consumption, type_key, stats_delay
             )
     else:
         _LOGGER.info(
@@ -331,6 +901,7 @@ async def fetch_since(
     context_label: str,
     stats_delay: int,
     class_type: str = ATTR_CONSUMPTION,
+    options: dict | None = None,
 ):
     """
     Single-fetch: κατεβάζει μία φορά δεδομένα από from_dt έως to_dt,
@@ -339,6 +910,8 @@ async def fetch_since(
     """
     # Μεταβλητή για αποθήκευση της πρώτης έγκυρης meterDate που επεξεργάστηκε επιτυχώς.
     first_meter_dt = None
+    # Με ενεργό το process_offload ζητείται η ακατέργαστη απόκριση του API
+    offload = bool((options or {}).get(CONF_PROCESS_OFFLOAD, False))
     if class_type == ATTR_CONSUMPTION:
         type_key = "consumption"
     elif class_type == ATTR_PRODUCTION:
@@ -347,13 +920,14 @@ async def fetch_since(
         type_key = "injection"
     try:
         records = await get_data_from_api(
-            hass, token, supply, tax, from_dt, to_dt, class_type
+            hass, token, supply, tax, from_dt, to_dt, class_type, raw=offload
         )
-        if records:
+        first_date = _first_meter_date(records)
+        if first_date is not None:
             if first_meter_dt is None:
                 try:
                     first_meter_dt = dt_util.as_local(
-                        datetime.strptime(records[0]["meterDate"], "%d/%m/%Y %H:%M")
+                        datetime.strptime(first_date, "%d/%m/%Y %H:%M")
                     )
                     _LOGGER.info(
                         "Παροχή %s: <%s> Βρέθηκαν εγγραφές από %s έως %s.",
@@ -375,15 +949,14 @@ async def fetch_since(
                 await load_last_total(hass, supply, key=class_type) or 0.0
             )
             count, total_consumption, last_valid = await process_and_insert(
-                hass, records, supply, total_consumption, type_key
+                hass, records, supply, total_consumption, type_key, options
             )
             # Αν βρέθηκαν έγκυρες εγγραφές, ενημερώνουμε τα last_update
             # και last_total με τις τελευταίες έγκυρες τιμές.
             if count > 0:
                 if last_valid:
-                    await save_last_update(hass, supply, last_valid, key=class_type)
-                    await save_last_total(
-                        hass, supply, total_consumption, key=class_type
+                    await commit_progress(
+                        hass, supply, total_consumption, last_valid, key=class_type
                     )
                     _LOGGER.info(
                         "Παροχή %s: <%s> Αποθηκεύτηκαν επιτυχώς %d εγγραφές "
@@ -399,20 +972,16 @@ async def fetch_since(
                         (last_valid - timedelta(days=1)).strftime("%d/%m/%Y"),
                     )
                     # Κλήση run_update_future_statistics αν υπάρχουν ασυνεπείς
-                    # εγγραφές στο statistics με καθυστέρηση 60΄΄ για ασφαλή πρόσβαση
-                    # στη βάση δεδομένων
+                    # εγγραφές στο statistics, μόλις ο recorder επικυρώσει τις
+                    # εισαγωγές (έως stats_delay δευτερόλεπτα αναμονής)
                     last_start_dt = last_valid - timedelta(hours=1)
-                    hass.loop.call_later(
+                    schedule_future_statistics_update(
+                        hass,
+                        supply,
+                        last_start_dt,
+                        total_consumption,
+                        type_key,
                         stats_delay,
-                        lambda: hass.async_create_task(
-                            run_update_future_statistics(
-                                hass,
-                                supply,
-                                last_start_dt,
-                                total_consumption,
-                                type_key,
-                            )
-                        ),
                     )
         else:
             _LOGGER.info(
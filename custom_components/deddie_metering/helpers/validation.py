@@ -0,0 +1,86 @@
+import logging
+from functools import lru_cache
+
+# Το module δεν εξαρτάται από το Home Assistant, ώστε οι επικυρωτές του
+# να μπορούν να εκτελεστούν και σε worker process (process pool).
+
+_LOGGER = logging.getLogger("deddie_metering")
+
+ACTION_ACCEPT = "accept"
+ACTION_REJECT = "reject"
+
+# Σειρά των κανόνων στη "μεταγλωττισμένη" (tuple) πολιτική
+RULES = ("zero", "null", "missing", "negative")
+
+# Προεπιλεγμένη πολιτική ανά classType (ATTR_CONSUMPTION, ATTR_PRODUCTION,
+# ATTR_INJECTION του const): ενέργεια ("accept"/"reject") για μηδενική, κενή
+# (null), ελλείπουσα και αρνητική τιμή. Οι αρνητικές τιμές γίνονται δεκτές,
+# όπως και πριν την εισαγωγή της πολιτικής.
+DEFAULT_CLASS_TYPE = "active"
+DEFAULT_VALIDATION_POLICY = {
+    "active": {
+        "zero": ACTION_ACCEPT,
+        "null": ACTION_REJECT,
+        "missing": ACTION_REJECT,
+        "negative": ACTION_ACCEPT,
+    },
+    # Μηδενική παραγωγή/έγχυση είναι φυσιολογική (π.χ. τη νύχτα)
+    "produced": {
+        "zero": ACTION_ACCEPT,
+        "null": ACTION_REJECT,
+        "missing": ACTION_REJECT,
+        "negative": ACTION_ACCEPT,
+    },
+    "injected": {
+        "zero": ACTION_ACCEPT,
+        "null": ACTION_REJECT,
+        "missing": ACTION_REJECT,
+        "negative": ACTION_ACCEPT,
+    },
+}
+
+
+def resolve_policy(defaults: dict, overrides: dict | None = None) -> tuple:
+    """
+    Συνδυάζει την προεπιλεγμένη πολιτική ενός classType με τις παρακάμψεις
+    των options και επιστρέφει tuple από bool (αποδοχή ανά κανόνα, με τη
+    σειρά των RULES). Μη έγκυρες ενέργειες αγνοούνται με προειδοποίηση.
+    """
+    policy = dict(defaults)
+    for rule, action in (overrides or {}).items():
+        if rule not in RULES or action not in (ACTION_ACCEPT, ACTION_REJECT):
+            _LOGGER.warning(
+                "Μη έγκυρος κανόνας επικύρωσης %s: %s. Αγνοείται.", rule, action
+            )
+            continue
+        policy[rule] = action
+    return tuple(policy.get(rule) == ACTION_ACCEPT for rule in RULES)
+
+
+@lru_cache(maxsize=None)
+def compile_validator(policy: tuple):
+    """
+    Επιστρέφει συνάρτηση ελέγχου ενός record για την πολιτική (tuple της
+    resolve_policy). Η συνάρτηση δημιουργείται μία φορά ανά πολιτική.
+    Μη αριθμητικές τιμές δεν απορρίπτουν την ημέρα: παραλείπονται κατά την
+    επεξεργασία της εγγραφής.
+    """
+    accept_zero, accept_null, accept_missing, accept_negative = policy
+
+    def is_valid(rec: dict) -> bool:
+        if "consumption" not in rec:
+            return accept_missing
+        value = rec["consumption"]
+        if value is None or value == "":
+            return accept_null
+        try:
+            number = float(value)
+        except (TypeError, ValueError):
+            return True
+        if number == 0:
+            return accept_zero
+        if number < 0:
+            return accept_negative
+        return True
+
+    return is_valid
@@ -0,0 +1,49 @@
+import time
+
+# Μετρητές καθυστέρησης event loop ανά παροχή (process-wide)
+_WATCHDOGS: dict = {}
+
+
+class LoopLagWatchdog:
+    """
+    Καταγράφει τη μεγαλύτερη διάρκεια συνεχούς εκτέλεσης (slice) της
+    επεξεργασίας στο event loop, δηλαδή χωρίς παραχώρηση (yield) του
+    ελέγχου, ανά ανανέωση της παροχής.
+    """
+
+    def __init__(self) -> None:
+        self.max_slice = 0.0
+        self.slices = 0
+        self._slice_start = None
+
+    def reset(self) -> None:
+        """Μηδενισμός των μετρήσεων στην αρχή κάθε ανανέωσης."""
+        self.max_slice = 0.0
+        self.slices = 0
+        self._slice_start = None
+
+    def start_slice(self) -> None:
+        """Έναρξη μέτρησης ενός slice."""
+        self._slice_start = time.perf_counter()
+
+    def elapsed(self) -> float:
+        """Διάρκεια (δευτερόλεπτα) του τρέχοντος slice."""
+        if self._slice_start is None:
+            return 0.0
+        return time.perf_counter() - self._slice_start
+
+    def end_slice(self) -> None:
+        """Ολοκλήρωση του τρέχοντος slice και ενημέρωση του μέγιστου."""
+        if self._slice_start is None:
+            return
+        self.max_slice = max(self.max_slice, self.elapsed())
+        self.slices += 1
+        self._slice_start = None
+
+
+def get_loop_lag_watchdog(supply: str) -> LoopLagWatchdog:
+    """Επιστρέφει (δημιουργώντας την πρώτη φορά) τον watchdog της παροχής."""
+    watchdog = _WATCHDOGS.get(supply)
+    if watchdog is None:
+        watchdog = _WATCHDOGS[supply] = LoopLagWatchdog()
+    return watchdog
@@ -0,0 +1,25 @@
+# Εκκίνηση των worker processes (spawn) του process pool. Το αρχείο
+# εκτελείται ως script (runpy.run_path) από τον initializer του pool, πριν
+# από οποιαδήποτε εργασία, και καταχωρεί το πακέτο της ενσωμάτωσης ως απλό
+# namespace. Έτσι η εισαγωγή των helpers.parsing/helpers.validation στο
+# worker δεν εκτελεί το __init__ της ενσωμάτωσης (και μαζί τον coordinator,
+# τον recorder και το Home Assistant). Το module δεν εισάγει τίποτα από την
+# ενσωμάτωση.
+import sys
+import types
+
+
+def register_package(name: str, path: str) -> None:
+    """
+    Καταχωρεί στο sys.modules το πακέτο name (φάκελος path) χωρίς εκτέλεση
+    του __init__ του, εφόσον δεν έχει ήδη εισαχθεί.
+    """
+    if name in sys.modules:
+        return
+    package = types.ModuleType(name)
+    package.__path__ = [path]
+    sys.modules[name] = package
+
+
+if __name__ == "<run_path>":
+    register_package(PACKAGE, PACKAGE_PATH)  # noqa: F821
@@ -9,11 +9,46 @@ from homeassistant.config_entries import ConfigEntry
 from homeassistant.data_entry_flow import FlowResult
 from typing import Any, Dict
 
-from .const import DEFAULT_INTERVAL_HOURS, DEFAULT_INITIAL_DAYS, CONF_HAS_PV
+from .const import (
+    DEFAULT_INTERVAL_HOURS,
+    DEFAULT_INITIAL_DAYS,
+    CONF_HAS_PV,
+    CONF_INCREMENTAL_REBASE,
+    CONF_PROCESS_OFFLOAD,
+    CONF_OFFLOAD_MIN_BYTES,
+    DEFAULT_OFFLOAD_MIN_BYTES,
+    CONF_COOPERATIVE,
+    CONF_MAX_SLICE_MS,
+    DEFAULT_MAX_SLICE_MS,
+    CONF_BACKFILL_MEMORY_TARGET,
+    CONF_VALIDATION_POLICY,
+    CONF_REVISION_SCAN,
+    CONF_REVISION_WINDOW_DAYS,
+    DEFAULT_REVISION_WINDOW_DAYS,
+    CONF_CONFIRMED_TRACKING,
+    CONF_RAW_ARCHIVE,
+    CONF_ARCHIVE_BACKEND,
+    ARCHIVE_BACKEND_SQLITE,
+    ARCHIVE_BACKEND_MMAP,
+    DEFAULT_ARCHIVE_BACKEND,
+    CONF_ARCHIVE_COLD_AFTER_YEARS,
+)
 from .api.client import validate_credentials
 from .helpers.translate import translate
-from .helpers.utils import run_initial_batches
-from .helpers.storage import save_last_total, save_initial_jump_flag
+from .helpers.validation import (
+    RULES,
+    ACTION_ACCEPT,
+    ACTION_REJECT,
+    DEFAULT_VALIDATION_POLICY,
+)
+from .helpers.utils import run_initial_batches, rebase_initial_batches
+from .helpers.statistics import forget_metadata_ids
+from .helpers.storage import (
+    save_last_total,
+    save_initial_jump_flag,
+    clear_checkpoint,
+    save_confirmed_until,
+)
 
 _LOGGER = logging.getLogger("deddie_metering")
 
@@ -56,9 +91,89 @@ class DeddieOptionsFlowHandler(config_entries.OptionsFlow):
                         ),
                     ),
                 ): str,
+                vol.Optional(
+                    CONF_PROCESS_OFFLOAD,
+                    default=self._default(defaults, CONF_PROCESS_OFFLOAD, False),
+                ): bool,
+                vol.Optional(
+                    CONF_OFFLOAD_MIN_BYTES,
+                    default=self._default(
+                        defaults, CONF_OFFLOAD_MIN_BYTES, DEFAULT_OFFLOAD_MIN_BYTES
+                    ),
+                ): vol.All(int, vol.Range(min=0)),
+                vol.Optional(
+                    CONF_COOPERATIVE,
+                    default=self._default(defaults, CONF_COOPERATIVE, False),
+                ): bool,
+                vol.Optional(
+                    CONF_MAX_SLICE_MS,
+                    default=self._default(
+                        defaults, CONF_MAX_SLICE_MS, DEFAULT_MAX_SLICE_MS
+                    ),
+                ): vol.All(int, vol.Range(min=1, max=1000)),
+                vol.Optional(
+                    CONF_BACKFILL_MEMORY_TARGET,
+                    default=self._default(defaults, CONF_BACKFILL_MEMORY_TARGET, 0),
+                ): vol.All(int, vol.Range(min=0)),
+                **self._validation_schema(defaults),
+                vol.Optional(
+                    CONF_REVISION_SCAN,
+                    default=self._default(defaults, CONF_REVISION_SCAN, False),
+                ): bool,
+                vol.Optional(
+                    CONF_REVISION_WINDOW_DAYS,
+                    default=self._default(
+                        defaults,
+                        CONF_REVISION_WINDOW_DAYS,
+                        DEFAULT_REVISION_WINDOW_DAYS,
+                    ),
+                ): vol.All(int, vol.Range(min=1, max=31)),
+                vol.Optional(
+                    CONF_CONFIRMED_TRACKING,
+                    default=self._default(defaults, CONF_CONFIRMED_TRACKING, False),
+                ): bool,
+                vol.Optional(
+                    CONF_INCREMENTAL_REBASE,
+                    default=self._default(defaults, CONF_INCREMENTAL_REBASE, False),
+                ): bool,
+                vol.Optional(
+                    CONF_RAW_ARCHIVE,
+                    default=self._default(defaults, CONF_RAW_ARCHIVE, False),
+                ): bool,
+                vol.Optional(
+                    CONF_ARCHIVE_BACKEND,
+                    default=self._default(
+                        defaults, CONF_ARCHIVE_BACKEND, DEFAULT_ARCHIVE_BACKEND
+                    ),
+                ): vol.In([ARCHIVE_BACKEND_SQLITE, ARCHIVE_BACKEND_MMAP]),
+                vol.Optional(
+                    CONF_ARCHIVE_COLD_AFTER_YEARS,
+                    default=self._default(defaults, CONF_ARCHIVE_COLD_AFTER_YEARS, 0),
+                ): vol.All(int, vol.Range(min=0)),
             }
         )
 
+    def _validation_schema(self, defaults: Dict[str, Any]) -> Dict[Any, Any]:
+        """
+        Πεδία της πολιτικής επικύρωσης ανά κατηγορία και κανόνα
+        (validation_policy_<κατηγορία>_<κανόνας>), με προεπιλογή την
+        αποθηκευμένη πολιτική της κατηγορίας.
+        """
+        stored = self._config_entry.options.get(CONF_VALIDATION_POLICY, {})
+        fields = {}
+        for class_type, class_defaults in DEFAULT_VALIDATION_POLICY.items():
+            rules = {**class_defaults, **stored.get(class_type, {})}
+            for rule in RULES:
+                field = f"{CONF_VALIDATION_POLICY}_{class_type}_{rule}"
+                fields[
+                    vol.Optional(field, default=defaults.get(field, rules[rule]))
+                ] = vol.In([ACTION_ACCEPT, ACTION_REJECT])
+        return fields
+
+    def _default(self, defaults: Dict[str, Any], key: str, fallback: Any) -> Any:
+        """Προεπιλογή πεδίου: τιμή της φόρμας, αποθηκευμένο option ή fallback."""
+        return defaults.get(key, self._config_entry.options.get(key, fallback))
+
     async def async_step_init(
         self, user_input: dict[str, Any] | None = None
     ) -> FlowResult:
@@ -110,6 +225,13 @@ class DeddieOptionsFlowHandler(config_entries.OptionsFlow):
         if new_token and new_token != old_token:
             await self._update_notification(supply)
 
+        # Τα νέα options (με τις αλλαγές αυτής της υποβολής), ώστε μια νέα
+        # λήψη να εφαρμόζει ήδη τις νέες ρυθμίσεις
+        new_options = {
+            **self._config_entry.options,
+            **self._apply_validation_policy(user_input),
+        }
+
         # 3) Έλεγχος αλλαγής initial_time για πρόσθετες ενέργειες
         await self._async_check_initial_time(
             new_initial,
@@ -117,6 +239,7 @@ class DeddieOptionsFlowHandler(config_entries.OptionsFlow):
             supply,
             tax,
             new_token,
+            new_options,
         )
 
         _LOGGER.info(
@@ -130,15 +253,31 @@ class DeddieOptionsFlowHandler(config_entries.OptionsFlow):
         )
 
         # 4) Create entry (options)
-        new_options = {
-            **self._config_entry.options,
-            **user_input,
-        }
         return self.async_create_entry(
             title=f"Παροχή {supply}",
             data=new_options,
         )
 
+    def _apply_validation_policy(self, user_input: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Μετατρέπει τα πεδία validation_policy_<κατηγορία>_<κανόνας> της φόρμας
+        στο validation_policy των options: ξεχωριστοί κανόνες ανά κατηγορία
+        (κατανάλωση, παραγωγή, έγχυση), πάνω στην αποθηκευμένη πολιτική.
+        """
+        options = dict(user_input)
+        stored = self._config_entry.options.get(CONF_VALIDATION_POLICY, {})
+        policy = {class_type: dict(rules) for class_type, rules in stored.items()}
+        changed = False
+        for class_type in DEFAULT_VALIDATION_POLICY:
+            for rule in RULES:
+                field = f"{CONF_VALIDATION_POLICY}_{class_type}_{rule}"
+                if field in options:
+                    policy.setdefault(class_type, {})[rule] = options.pop(field)
+                    changed = True
+        if changed:
+            options[CONF_VALIDATION_POLICY] = policy
+        return options
+
     def _validate_user_input(self, user_input: Dict[str, Any]) -> Dict[str, str]:
         """
         Ελέγχει format και τιμές πεδίων.
@@ -175,6 +314,15 @@ class DeddieOptionsFlowHandler(config_entries.OptionsFlow):
         if interval_hours is None or not (1 <= interval_hours <= 24):
             errors["interval_hours"] = "invalid_interval_hours"
 
+        # Η συμπίεση ετών αφορά μόνο το ενεργό αρχείο με αρχεία έτους (mmap)
+        options = {**self._config_entry.options, **user_input}
+        if options.get(CONF_ARCHIVE_COLD_AFTER_YEARS) and (
+            not options.get(CONF_RAW_ARCHIVE, False)
+            or options.get(CONF_ARCHIVE_BACKEND, DEFAULT_ARCHIVE_BACKEND)
+            != ARCHIVE_BACKEND_MMAP
+        ):
+            errors[CONF_ARCHIVE_COLD_AFTER_YEARS] = "cold_archive_needs_mmap"
+
         return errors
 
     async def _async_validate_token(
@@ -214,10 +362,14 @@ class DeddieOptionsFlowHandler(config_entries.OptionsFlow):
         supply: str,
         tax: str,
         new_token: str,
+        options: Dict[str, Any],
     ) -> Dict[str, str]:
         """
         Ελέγχος αλλαγής αρχικής ημερομηνίας.
-        Reset το persisted total και έναρξη initial batches
+        Με ενεργό το incremental_rebase λαμβάνεται μόνο το νέο διάστημα και
+        μετατοπίζονται οι υπάρχουσες εγγραφές. Διαφορετικά (ή αν αυτό δεν
+        είναι εφικτό), reset το persisted total και έναρξη initial batches.
+        Η λήψη χρησιμοποιεί τα νέα options της υποβολής.
         Επιστρέφει λεξικό πεδίων -> κωδικοί σφάλματος κενό.
         """
         errors: Dict[str, str] = {}
@@ -227,11 +379,20 @@ class DeddieOptionsFlowHandler(config_entries.OptionsFlow):
             token = new_token or self._config_entry.options.get("token")
             has_pv = self._config_entry.options.get(CONF_HAS_PV, False)
 
+            if await self._async_rebase(
+                dt_obj, old_initial, supply, tax, token, has_pv, options
+            ):
+                return errors
+
             # Reset όλων των last_totals ώστε το batch να ξεκινήσει
-            # από 0.0 και όλων των jump flags
+            # από 0.0, όλων των jump flags, των checkpoints και των
+            # επιβεβαιωμένων ωρών, καθώς και της cache των metadata_id
             for key in ("active", "produced", "injected"):
                 await save_last_total(self.hass, supply, 0.0, key=key)
                 await save_initial_jump_flag(self.hass, supply, False, key=key)
+                await clear_checkpoint(self.hass, supply, key=key)
+                await save_confirmed_until(self.hass, supply, None, key=key)
+            forget_metadata_ids(supply)
 
             _LOGGER.info(
                 "Παροχή %s: Δόθηκε νέα αρχική ημερομηνία. "
@@ -247,10 +408,49 @@ class DeddieOptionsFlowHandler(config_entries.OptionsFlow):
                 dt_obj,
                 has_pv,
                 inc_con=True,
+                options=options,
             )
+            # Η λήψη ολοκληρώθηκε: χωρίς checkpoint, ώστε ένα επόμενο
+            # re-basing να μη τη θεωρεί διακοπείσα
+            for key in ("active", "produced", "injected"):
+                await clear_checkpoint(self.hass, supply, key=key)
 
         return errors
 
+    async def _async_rebase(
+        self,
+        new_dt: datetime,
+        old_initial: str,
+        supply: str,
+        tax: str,
+        token: str,
+        has_pv: bool,
+        options: Dict[str, Any],
+    ) -> bool:
+        """
+        Incremental re-basing (opt-in) για νωρίτερη αρχική ημερομηνία.
+        Επιστρέφει True αν ολοκληρώθηκε, ώστε να παραλειφθεί η πλήρης λήψη.
+        """
+        if not options.get(CONF_INCREMENTAL_REBASE, False):
+            return False
+        try:
+            old_dt = dt_util.as_local(datetime.strptime(old_initial, "%d/%m/%Y"))
+        except (TypeError, ValueError):
+            return False
+        if not await rebase_initial_batches(
+            self.hass, token, supply, tax, new_dt, old_dt, has_pv, options=options
+        ):
+            _LOGGER.info(
+                "Παροχή %s: Το incremental re-basing δεν είναι εφικτό. "
+                "Εκτελείται πλήρης αρχική ενημέρωση.",
+                supply,
+            )
+            return False
+        # Reset των jump flags ώστε οι αισθητήρες να λάβουν το νέο σύνολο
+        for key in ("active", "produced", "injected"):
+            await save_initial_jump_flag(self.hass, supply, False, key=key)
+        return True
+
     async def _update_notification(self, supply: str) -> bool:
         # Ειδοποίηση επιτυχούς setup
         from homeassistant.components.persistent_notification import (
@@ -7,7 +7,7 @@ from homeassistant.helpers.entity import DeviceInfo
 
 from .const import DOMAIN, ATTR_CONSUMPTION, ATTR_PRODUCTION, ATTR_INJECTION
 from .helpers.storage import load_initial_jump_flag, save_initial_jump_flag
-from .helpers.statistics import purge_flat_states
+from .helpers.statistics import schedule_purge
 from .helpers.translate import translate
 
 
@@ -62,7 +62,6 @@ class _DeddieSensorBase(SensorEntity, RestoreEntity):
         self._total = 0.0
         self._fresh_install = False
         self._initial_jump_done_flag = False
-        self._purge_unsub = None
 
     @property
     def available(self) -> bool:
@@ -151,17 +150,11 @@ class _DeddieSensorBase(SensorEntity, RestoreEntity):
         await save_initial_jump_flag(self.hass, self._supply, True, key=self._attr_key)
 
     def _schedule_purge(self) -> None:
-        """Προγραμματίζει καθαρισμό flat states μετά από 5 λεπτά,
-        μόνο αν δεν υπάρχει ήδη προγραμματισμένο."""
-        if not self.available or self._purge_unsub is not None:
+        """Προσθέτει τον αισθητήρα στο κοινό purge flat states όλων των
+        παροχών (εκτελείται μία φορά ανά παράθυρο 5 λεπτών)."""
+        if not self.available:
             return
-        self._purge_unsub = async_call_later(self.hass, 300, self._async_purge)
-
-    async def _async_purge(self, _now) -> None:
-        """Ασύγχρονος callback που καλεί το purge_flat_states στο event loop
-        και reset του handle."""
-        self._purge_unsub = None
-        await purge_flat_states(self.hass, self.entity_id, self._supply)
+        schedule_purge(self.hass, self.entity_id, self._supply, self._total)
 
     @property
     def native_value(self) -> float:
@@ -6,6 +6,7 @@ from typing import Any, Dict
 from homeassistant.core import HomeAssistant, callback
 from homeassistant.components import system_health
 from .helpers.storage import load_last_update
+from .helpers.watchdog import get_loop_lag_watchdog
 from .api.client import validate_credentials
 from .const import DOMAIN, API_URL, CONF_HAS_PV
 
@@ -53,4 +54,7 @@ async def system_health_info(hass: HomeAssistant) -> Dict[str, Any]:
         # Eνημερωμένο μέχρι
         last = await load_last_update(hass, supply, key="active")
         info["last_update"] = last.strftime("%d/%m/%Y %H:%M") if last else "–"
+        # Μέγιστη καθυστέρηση event loop από την επεξεργασία (τελευταία ανανέωση)
+        watchdog = get_loop_lag_watchdog(supply)
+        info["loop_lag"] = f"{watchdog.max_slice * 1000:.1f} ms"
     return info
@@ -46,6 +46,16 @@ def hass():
     return MagicMock()
 
 
+@pytest.fixture(autouse=True)
+def reset_store_cache():
+    # Κάθε test ξεκινά με κενή cache των stores
+    from deddie_metering.helpers.storage import reset_store_cache
+
+    reset_store_cache()
+    yield
+    reset_store_cache()
+
+
 # 1) Dummy package homeassistant
 homeassistant_mod = sys.modules.setdefault(
     "homeassistant", types.ModuleType("homeassistant")
@@ -182,6 +192,8 @@ class _Range:
 
 
 vol.Range = _Range
+# In stub: identity validator
+vol.In = lambda container: (lambda v: v)
 # All stub: returns last validator or identity
 vol.All = lambda *args: (args[-1] if args else (lambda v: v))
 # Register stub module
@@ -268,6 +280,15 @@ class DummyStore:
     async def async_load(self):
         return None
 
+    async def async_save(self, data):
+        pass
+
+    def async_delay_save(self, data_func, delay):
+        pass
+
+    async def async_remove(self):
+        pass
+
 
 storage_module = ModuleType("homeassistant.helpers.storage")
 storage_module.Store = DummyStore
@@ -301,7 +322,12 @@ event_mod.async_call_later = lambda hass, delay, callback: callback
 aiohttp_mod = types.ModuleType("homeassistant.helpers.aiohttp_client")
 aiohttp_mod.async_get_clientsession = lambda hass: None
 
+# config_validation submodule for CONFIG_SCHEMA
+config_validation_mod = types.ModuleType("homeassistant.helpers.config_validation")
+config_validation_mod.config_entry_only_config_schema = lambda domain: None
+
 # Attach submodules to helpers_pkg
+helpers_pkg.config_validation = config_validation_mod
 helpers_pkg.entity = entity_mod
 helpers_pkg.event = event_mod
 helpers_pkg.aiohttp_client = aiohttp_mod
@@ -311,9 +337,26 @@ sys.modules["homeassistant.helpers"] = helpers_pkg
 sys.modules["homeassistant.helpers.entity"] = entity_mod
 sys.modules["homeassistant.helpers.event"] = event_mod
 sys.modules["homeassistant.helpers.aiohttp_client"] = aiohttp_mod
+sys.modules["homeassistant.helpers.config_validation"] = config_validation_mod
 
 sys.modules["homeassistant.components.recorder"] = MagicMock()
 sys.modules["homeassistant.components.recorder.statistics"] = MagicMock()
+# Stub homeassistant.core (callback για συναρτήσεις του event loop)
+core_mod = types.ModuleType("homeassistant.core")
+core_mod.HomeAssistant = object
+core_mod.callback = lambda func: func
+sys.modules.setdefault("homeassistant.core", core_mod)
+
+# Stub του RecorderTask (εργασίες που εκτελούνται στο thread του recorder)
+recorder_tasks_mod = types.ModuleType("homeassistant.components.recorder.tasks")
+
+
+class RecorderTask:
+    commit_before = True
+
+
+recorder_tasks_mod.RecorderTask = RecorderTask
+sys.modules["homeassistant.components.recorder.tasks"] = recorder_tasks_mod
 
 # 19) Stub persistent_notification component για config_flow και options_flow
 persistent_notification_mod = types.ModuleType(
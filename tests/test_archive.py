@@ -0,0 +1,262 @@
+import sqlite3
+import pytest
+from array import array
+from datetime import datetime, timezone
+from unittest.mock import MagicMock
+
+from deddie_metering.helpers import archive as archive_mod
+
+
+@pytest.fixture
+def archive_hass(tmp_path):
+    hass = MagicMock()
+    hass.config.path = lambda name: str(tmp_path / name)
+
+    async def add_executor_job(func, *args):
+        return func(*args)
+
+    hass.async_add_executor_job = add_executor_job
+    return hass
+
+
+def test_hourly_values_from_cumulative_sums():
+    # meterDate 01:00 και 02:00 UTC της 1/4/2025 (αρχή ώρας 00:00 και 01:00)
+    base = int(datetime(2025, 4, 1, 1, 0, tzinfo=timezone.utc).timestamp())
+    rows = archive_mod.hourly_values(
+        array("q", [base, base + 3600]), array("d", [10.3, 10.6]), 10.0, "UTC"
+    )
+    assert rows == [(base - 3600, 0.3), (base, 0.3)]
+
+
+@pytest.mark.asyncio
+async def test_archive_write_and_read_range(archive_hass, tmp_path):
+    start = datetime(2025, 4, 1, 0, 0, tzinfo=timezone.utc)
+    base = int(start.timestamp())
+    rows = [(base + hour * 3600, float(hour)) for hour in range(24)]
+    assert (
+        await archive_mod.async_archive_hours(archive_hass, "111", "active", rows) == 24
+    )
+    # Επανεγγραφή της ίδιας ώρας αντικαθιστά την τιμή
+    await archive_mod.async_archive_hours(
+        archive_hass, "111", "active", [(base + 3600, 9.5)]
+    )
+    await archive_mod.async_archive_hours(archive_hass, "222", "active", rows)
+    assert await archive_mod.async_archive_hours(archive_hass, "111", "active", []) == 0
+
+    result = await archive_mod.async_read_hours(
+        archive_hass,
+        "111",
+        "active",
+        start,
+        datetime(2025, 4, 1, 2, 0, tzinfo=timezone.utc),
+    )
+    assert result == [(base, 0.0), (base + 3600, 9.5), (base + 7200, 2.0)]
+    assert (
+        await archive_mod.async_read_hours(
+            archive_hass, "111", "produced", start, start
+        )
+        == []
+    )
+    assert (tmp_path / archive_mod.ARCHIVE_FILENAME).exists()
+    # Το ερώτημα εξυπηρετείται από το πρωτεύον κλειδί (ευρετήριο)
+    conn = sqlite3.connect(str(tmp_path / archive_mod.ARCHIVE_FILENAME))
+    plan = conn.execute(
+        "EXPLAIN QUERY PLAN SELECT hour_ts, value FROM curves "
+        "WHERE supply = ? AND class_type = ? AND hour_ts BETWEEN ? AND ?",
+        ("111", "active", 0, 1),
+    ).fetchall()
+    conn.close()
+    assert "PRIMARY KEY" in plan[0][-1]
+
+
+@pytest.mark.asyncio
+async def test_archive_errors_are_logged(archive_hass, tmp_path, caplog):
+    # Μη εγγράψιμη διαδρομή: το σφάλμα καταγράφεται χωρίς εξαίρεση
+    archive_hass.config.path = lambda name: str(tmp_path / "missing" / name)
+    assert (
+        await archive_mod.async_archive_hours(archive_hass, "111", "active", [(0, 1.0)])
+        == 0
+    )
+    assert "τοπικό αρχείο" in caplog.text
+
+
+@pytest.mark.asyncio
+async def test_mmap_year_files_write_and_read(archive_hass, tmp_path):
+    mmap_backend = archive_mod.ARCHIVE_BACKEND_MMAP
+    # Ώρες γύρω από την αλλαγή έτους (UTC): δύο αρχεία έτους
+    new_year = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    base = int(new_year.timestamp())
+    rows = [(base + hour * 3600, hour + 0.5) for hour in range(-2, 3)]
+    assert (
+        await archive_mod.async_archive_hours(
+            archive_hass, "111", "active", rows, mmap_backend
+        )
+        == 5
+    )
+    directory = tmp_path / archive_mod.ARCHIVE_DIRNAME
+    files = sorted(path.name for path in directory.iterdir())
+    assert files == ["111_active_2024.bin", "111_active_2025.bin"]
+    assert (directory / files[0]).stat().st_size == archive_mod.YEAR_FILE_BYTES
+    # Ανάγνωση εύρους με κενές (μη αποθηκευμένες) ώρες στα άκρα
+    result = await archive_mod.async_read_hours(
+        archive_hass,
+        "111",
+        "active",
+        datetime(2024, 12, 31, 20, 0, tzinfo=timezone.utc),
+        datetime(2025, 1, 1, 5, 0, tzinfo=timezone.utc),
+        mmap_backend,
+    )
+    assert result == rows
+    # Μηδενική τιμή διακρίνεται από απουσία τιμής μέσω του bitmap
+    await archive_mod.async_archive_hours(
+        archive_hass, "111", "active", [(base + 5 * 3600, 0.0)], mmap_backend
+    )
+    assert archive_mod.read_year_hours(
+        str(directory), "111", "active", base + 3 * 3600, base + 5 * 3600
+    ) == [(base + 5 * 3600, 0.0)]
+    # Παροχή ή έτος χωρίς αρχείο
+    assert archive_mod.read_year_hours(str(directory), "222", "active", 0, base) == []
+
+
+@pytest.mark.asyncio
+async def test_mmap_archive_errors_are_logged(archive_hass, tmp_path, caplog):
+    # Ο φάκελος δεν μπορεί να δημιουργηθεί (υπάρχει αρχείο με το ίδιο όνομα)
+    (tmp_path / archive_mod.ARCHIVE_DIRNAME).write_text("")
+    assert (
+        await archive_mod.async_archive_hours(
+            archive_hass, "111", "active", [(0, 1.0)], archive_mod.ARCHIVE_BACKEND_MMAP
+        )
+        == 0
+    )
+    assert "τοπικό αρχείο" in caplog.text
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("size", [0, archive_mod.YEAR_FILE_BYTES // 2])
+async def test_truncated_year_file_is_logged(archive_hass, tmp_path, caplog, size):
+    # Αρχείο έτους μηδενικού ή μικρότερου μεγέθους: ValueError του mmap
+    directory = tmp_path / archive_mod.ARCHIVE_DIRNAME
+    directory.mkdir()
+    (directory / "111_active_2025.bin").write_bytes(b"\0" * size)
+    start_2025 = int(datetime(2025, 1, 1, tzinfo=timezone.utc).timestamp())
+    assert (
+        await archive_mod.async_archive_hours(
+            archive_hass,
+            "111",
+            "active",
+            [(start_2025, 1.0)],
+            archive_mod.ARCHIVE_BACKEND_MMAP,
+        )
+        == 0
+    )
+    assert "τοπικό αρχείο" in caplog.text
+    assert (
+        await archive_mod.async_compact_archive(archive_hass, "111", "active", 2026)
+        == 0
+    )
+    assert "συμπίεσης" in caplog.text
+
+
+@pytest.mark.asyncio
+async def test_year_file_is_created_atomically(archive_hass, tmp_path):
+    start_2025 = int(datetime(2025, 1, 1, tzinfo=timezone.utc).timestamp())
+    await archive_mod.async_archive_hours(
+        archive_hass,
+        "111",
+        "active",
+        [(start_2025, 1.0)],
+        archive_mod.ARCHIVE_BACKEND_MMAP,
+    )
+    directory = tmp_path / archive_mod.ARCHIVE_DIRNAME
+    assert [path.name for path in directory.iterdir()] == ["111_active_2025.bin"]
+
+
+@pytest.mark.asyncio
+async def test_cold_storage_compaction_and_rehydration(archive_hass, tmp_path):
+    mmap_backend = archive_mod.ARCHIVE_BACKEND_MMAP
+    start_2023 = int(datetime(2023, 1, 1, tzinfo=timezone.utc).timestamp())
+    start_2025 = int(datetime(2025, 1, 1, tzinfo=timezone.utc).timestamp())
+    old_rows = [(start_2023 + hour * 3600, (hour % 5) * 0.25) for hour in range(8760)]
+    new_rows = [(start_2025, 1.5)]
+    await archive_mod.async_archive_hours(
+        archive_hass, "111", "active", old_rows + new_rows, mmap_backend
+    )
+    directory = tmp_path / archive_mod.ARCHIVE_DIRNAME
+    (directory / "notes.txt").write_text("")
+    (directory / "111_active_old.bin").write_text("")
+    assert (
+        await archive_mod.async_compact_archive(archive_hass, "111", "active", 2025)
+        == 1
+    )
+    names = sorted(path.name for path in directory.iterdir())
+    assert names == [
+        "111_active_2023.vz",
+        "111_active_2025.bin",
+        "111_active_old.bin",
+        "notes.txt",
+    ]
+    # Περίπου 2 bytes ανά ώρα έναντι 4 (float32) του αρχείου έτους
+    assert (directory / "111_active_2023.vz").stat().st_size * 2 < (
+        archive_mod.YEAR_FILE_BYTES
+    )
+    # Ανάγνωση εύρους που καλύπτει συμπιεσμένο και μη έτος
+    span = (start_2023 + 8750 * 3600, start_2025)
+    assert archive_mod.read_year_hours(str(directory), "111", "active", *span) == (
+        old_rows[8750:] + new_rows
+    )
+    # Νέα εγγραφή σε συμπιεσμένο έτος: επαναφορά σε αρχείο έτους
+    await archive_mod.async_archive_hours(
+        archive_hass, "111", "active", [(start_2023, 9.0)], mmap_backend
+    )
+    assert not (directory / "111_active_2023.vz").exists()
+    restored = archive_mod.read_year_hours(
+        str(directory), "111", "active", start_2023, start_2023 + 3 * 3600
+    )
+    assert restored == [(start_2023, 9.0)] + old_rows[1:4]
+    # Χωρίς φάκελο αρχείου δεν υπάρχει τίποτα προς συμπίεση
+    assert archive_mod.compact_year_files(str(tmp_path / "none"), "1", "a", 2025) == 0
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("corrupt", ["garbage", "truncated"])
+async def test_corrupt_cold_file_is_logged(archive_hass, tmp_path, caplog, corrupt):
+    mmap_backend = archive_mod.ARCHIVE_BACKEND_MMAP
+    start_2023 = int(datetime(2023, 1, 1, tzinfo=timezone.utc).timestamp())
+    rows = [(start_2023 + hour * 3600, 1.0) for hour in range(48)]
+    await archive_mod.async_archive_hours(
+        archive_hass, "111", "active", rows, mmap_backend
+    )
+    await archive_mod.async_compact_archive(archive_hass, "111", "active", 2025)
+    cold = tmp_path / archive_mod.ARCHIVE_DIRNAME / "111_active_2023.vz"
+    data = cold.read_bytes()
+    # Μη έγκυρη κεφαλίδα (ValueError) ή αποκομμένο αρχείο (IndexError)
+    cold.write_bytes(b"XXXX" + data[4:] if corrupt == "garbage" else data[:10])
+    span = (
+        datetime(2023, 1, 1, tzinfo=timezone.utc),
+        datetime(2023, 1, 2, tzinfo=timezone.utc),
+    )
+    assert (
+        await archive_mod.async_read_hours(
+            archive_hass, "111", "active", *span, mmap_backend
+        )
+        == []
+    )
+    assert "Σφάλμα ανάγνωσης" in caplog.text
+    assert "111_active_2023.vz" in caplog.text
+    assert (
+        await archive_mod.async_archive_hours(
+            archive_hass, "111", "active", rows[:1], mmap_backend
+        )
+        == 0
+    )
+    assert "Σφάλμα αποθήκευσης" in caplog.text
+
+
+@pytest.mark.asyncio
+async def test_compaction_errors_are_logged(archive_hass, monkeypatch, caplog):
+    def failing(*args):
+        raise OSError("disk")
+
+    monkeypatch.setattr(archive_mod, "compact_year_files", failing)
+    assert await archive_mod.async_compact_archive(archive_hass, "1", "a", 2025) == 0
+    assert "disk" in caplog.text
@@ -2,6 +2,7 @@ import sys
 import types
 import pytest
 import asyncio
+import json as json_module
 from typing import List
 from datetime import datetime, timedelta
 from unittest.mock import MagicMock, patch
@@ -25,6 +26,9 @@ class DummyResponse:
     async def json(self):
         return self._json
 
+    async def read(self):
+        return json_module.dumps(self._json).encode()
+
     async def __aenter__(self):
         return self
 
@@ -253,3 +257,46 @@ async def test_get_data_injection_success(mock_get, hass, caplog):
     sess = mock_get.return_value
     assert sess.last_json["classType"] == client.ATTR_INJECTION
     assert "έγχυσης ενέργειας" in caplog.text
+
+
+@patch.object(client, "async_get_clientsession")
+@pytest.mark.asyncio
+async def test_get_data_from_api_raw_returns_bytes(mock_get, hass):
+    """Με raw=True επιστρέφεται η ακατέργαστη απόκριση χωρίς αποκωδικοποίηση."""
+    curves = [{"meterDate": "01/04/2025 01:00", "consumption": "1"}]
+    response = DummyResponse(200, {"curves": curves})
+    mock_get.return_value = DummySession(response)
+    result = await client.get_data_from_api(
+        hass,
+        "token",
+        "supply",
+        "tax",
+        datetime(2025, 4, 1),
+        datetime(2025, 4, 2),
+        client.ATTR_CONSUMPTION,
+        raw=True,
+    )
+    assert isinstance(result, bytes)
+    assert json_module.loads(result) == {"curves": curves}
+
+
+@patch.object(client, "async_get_clientsession")
+@pytest.mark.asyncio
+async def test_get_data_from_api_confirmed_flag(mock_get, hass):
+    """Το confirmed ορίζει το confirmedDataFlag (προεπιλογή False)."""
+    response = DummyResponse(200, {"curves": []})
+    session = DummySession(response)
+    mock_get.return_value = session
+    args = (
+        hass,
+        "token",
+        "supply",
+        "tax",
+        datetime(2025, 4, 1),
+        datetime(2025, 4, 2),
+        client.ATTR_CONSUMPTION,
+    )
+    await client.get_data_from_api(*args)
+    assert session.last_json["confirmedDataFlag"] is False
+    await client.get_data_from_api(*args, confirmed=True)
+    assert session.last_json["confirmedDataFlag"] is True
@@ -0,0 +1,39 @@
+import pytest
+
+from deddie_metering.helpers import codec
+
+
+def make_series(hours, start=1_704_067_200):
+    # Τιμές σε kWh με ακρίβεια Wh, με κενά (ελλείπουσες ώρες) ανά 50 ώρες
+    return [
+        (start + hour * 3600, round((hour % 17) * 0.137, 3))
+        for hour in range(hours)
+        if hour % 50 != 49
+    ]
+
+
+def test_encode_decode_roundtrip_and_size():
+    rows = make_series(24 * 365)
+    encoded = codec.encode_series(rows)
+    assert list(codec.iter_decode(encoded)) == rows
+    # Περίπου 2 bytes ανά ώρα έναντι 16 (8 bytes ts + 8 bytes τιμή)
+    assert len(encoded) * 6 < len(rows) * 16
+
+
+def test_decode_range_reads_only_overlapping_blocks():
+    rows = make_series(24 * 30)
+    encoded = codec.encode_series(rows, block_hours=24)
+    from_ts, to_ts = rows[100][0], rows[130][0]
+    assert list(codec.iter_decode(encoded, from_ts, to_ts)) == rows[100:131]
+    # Τα μπλοκ εκτός εύρους παρακάμπτονται χωρίς αποκωδικοποίηση: ένα
+    # αλλοιωμένο μπλοκ μετά το εύρος δεν επηρεάζει την ανάγνωση
+    corrupted = encoded[:-5] + b"\xff" * 5
+    assert list(codec.iter_decode(corrupted, from_ts, to_ts)) == rows[100:131]
+
+
+def test_negative_deltas_and_invalid_data():
+    rows = [(0, 5.0), (3600, 0.0), (7200, 12.345), (3 * 3600, 0.001)]
+    assert list(codec.iter_decode(codec.encode_series(rows))) == rows
+    assert list(codec.iter_decode(codec.encode_series([]))) == []
+    with pytest.raises(ValueError):
+        list(codec.iter_decode(b"XXXX"))
@@ -343,3 +343,54 @@ async def test_pv_threshold_notification(hass, monkeypatch, fixed_now):
     # Το μήνυμα πρέπει να περιέχει warning για έλλειψη παραγωγής
     assert "Δεν ανιχνεύθηκε παραγωγή" in msg
     assert nid == f"deddie_metering_pv_warning_{coord._supply}"
+
+
+@pytest.mark.asyncio
+async def test_revision_scan_runs_at_low_frequency(hass, monkeypatch, fixed_now):
+    """
+    Ο επανέλεγχος αναθεωρήσεων εκτελείται μόνο με ενεργό το revision_scan,
+    το πολύ μία φορά ανά DEFAULT_REVISION_INTERVAL και για κάθε κατηγορία.
+    """
+    entry = types.SimpleNamespace(options={coordinator_module.CONF_REVISION_SCAN: True})
+    coord = DeddieDataUpdateCoordinator(
+        hass, "tok", "S1", "tax", timedelta(hours=1), "D", True, entry
+    )
+    last_scan = {}
+
+    async def fake_load_revision_scan(_hass, _supply, key):
+        return last_scan.get(key)
+
+    monkeypatch.setattr(
+        coordinator_module, "load_revision_scan", fake_load_revision_scan
+    )
+    save = AsyncMock()
+    monkeypatch.setattr(coordinator_module, "save_revision_scan", save)
+    scan = AsyncMock(side_effect=[0.0, Exception("api"), 0.0])
+    monkeypatch.setattr(coordinator_module, "scan_revisions", scan)
+
+    await coord._maybe_scan_revisions(fixed_now)
+    classes = [ATTR_CONSUMPTION, ATTR_PRODUCTION, ATTR_INJECTION]
+    assert [c.args for c in save.await_args_list] == [(hass, "S1", fixed_now)] * 3
+    assert [c.kwargs["key"] for c in save.await_args_list] == classes
+    assert [c.args[4] for c in scan.await_args_list] == classes
+
+    # Πρόσφατος έλεγχος: παράλειψη μόνο των κατηγοριών που ελέγχθηκαν
+    scan.reset_mock()
+    scan.side_effect = None
+    last_scan[ATTR_CONSUMPTION] = fixed_now - timedelta(hours=1)
+    last_scan[ATTR_PRODUCTION] = fixed_now - timedelta(hours=1)
+    await coord._maybe_scan_revisions(fixed_now)
+    assert [c.args[4] for c in scan.await_args_list] == [ATTR_INJECTION]
+
+    # Χωρίς το option: παράλειψη
+    scan.reset_mock()
+    last_scan.clear()
+    entry.options = {}
+    await coord._maybe_scan_revisions(fixed_now)
+    scan.assert_not_awaited()
+
+    # Χωρίς PV: μόνο η κατανάλωση
+    entry.options = {coordinator_module.CONF_REVISION_SCAN: True}
+    coord.has_pv = False
+    await coord._maybe_scan_revisions(fixed_now)
+    assert [c.args[4] for c in scan.await_args_list] == [ATTR_CONSUMPTION]
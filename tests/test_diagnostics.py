@@ -0,0 +1,39 @@
+import sys
+import types
+import pytest
+
+# Stub για τα homeassistant.core και homeassistant.components.diagnostics
+core_stub = sys.modules.setdefault(
+    "homeassistant.core", types.ModuleType("homeassistant.core")
+)
+core_stub.HomeAssistant = getattr(core_stub, "HomeAssistant", object)
+diagnostics_stub = types.ModuleType("homeassistant.components.diagnostics")
+diagnostics_stub.REDACTED = "**REDACTED**"
+diagnostics_stub.async_redact_data = lambda data, keys: {
+    key: "**REDACTED**" if key in keys else value for key, value in data.items()
+}
+sys.modules["homeassistant.components.diagnostics"] = diagnostics_stub
+
+from deddie_metering import diagnostics  # noqa: E402
+
+
+class DummyEntry:
+    title = "Παροχή 123456789"
+    data = {"supplyNumber": "123456789", "taxNumber": "999999999"}
+    options = {"token": "secret", "interval_hours": 8}
+
+
+@pytest.mark.asyncio
+async def test_config_entry_diagnostics(monkeypatch):
+    monkeypatch.setattr(diagnostics, "storage_stats", lambda: {"stores": 1})
+    result = await diagnostics.async_get_config_entry_diagnostics(None, DummyEntry())
+    assert result["entry"]["title"] == "**REDACTED**"
+    assert result["entry"]["data"] == {
+        "supplyNumber": "**REDACTED**",
+        "taxNumber": "**REDACTED**",
+    }
+    assert result["entry"]["options"] == {
+        "token": "**REDACTED**",
+        "interval_hours": 8,
+    }
+    assert result["storage"] == {"stores": 1}
@@ -18,6 +18,7 @@ from deddie_metering.const import (
     ATTR_PRODUCTION,
     ATTR_INJECTION,
 )
+from deddie_metering.helpers import statistics
 from deddie_metering.helpers.translate import translate
 
 
@@ -141,6 +142,7 @@ async def test_async_setup_entry_migrated_with_pv(monkeypatch, hass):
         initial_time_arg,
         has_pv,
         inc_con,
+        options=None,
     ):
         called["run_initial"] = {
             "has_pv": has_pv,
@@ -277,6 +279,13 @@ async def test_async_setup_entry_fresh_setup_with_pv(monkeypatch, hass):
         datetime.datetime(2020, 1, 1),
         True,
         inc_con=True,
+        options={
+            "token": "tokpv",
+            "initial_time": "01/01/2020",
+            "interval_hours": 4,
+            "has_pv": True,
+            "inc_con": True,
+        },
     )
 
     # All three jump‐flags set to False
@@ -388,16 +397,111 @@ async def test_async_unload_and_remove_entry(monkeypatch, hass):
     hass.config_entries.async_forward_entry_unload = fake_unload
 
     # Test unload entry
+    metadata_ids = statistics._METADATA_IDS
+    metadata_ids["sensor.deddie_consumption_123456789"] = 1
+    cancel = MagicMock()
+    statistics._PENDING_CORRECTIONS["sensor.deddie_consumption_123456789"] = {
+        "supply": "123456789",
+        "cancel": cancel,
+    }
+    purge_cancel = MagicMock()
+    monkeypatch.setattr(statistics, "_PURGE_TIMER", {"cancel": purge_cancel})
+    last_purged = {"sensor.deddie_consumption_123456789": ("123456789", 1.0)}
+    monkeypatch.setattr(statistics, "_LAST_PURGED", last_purged)
     result_unload = await async_unload_entry(hass, entry)
     assert result_unload is True, "async_unload_entry should return True"
     fake_coordinator.async_shutdown.assert_awaited_once(),
     assert (
         entry.entry_id not in hass.data[DOMAIN]
     ), "Coordinator data was not removed after unload"
+    assert "sensor.deddie_consumption_123456789" not in metadata_ids
+    # Η εκκρεμής διόρθωση της παροχής και το κοινό purge ακυρώνονται
+    cancel.assert_called_once_with()
+    purge_cancel.assert_called_once_with()
+    assert statistics._PURGE_TIMER == {"cancel": None}
+    assert statistics._PENDING_CORRECTIONS == {}
+    assert last_purged == {}
 
     # Prepare for remove
     hass.data.setdefault(DOMAIN, {})[entry.entry_id] = {}
+    clear = AsyncMock()
+    monkeypatch.setattr(deddie_metering, "clear_checkpoint", clear)
 
     # Test remove entry
+    metadata_ids["sensor.deddie_production_123456789"] = 2
+    last_purged["sensor.deddie_production_123456789"] = ("123456789", 2.0)
+    last_purged["sensor.deddie_production_987654321"] = ("987654321", 2.0)
     result_remove = await async_remove_entry(hass, entry)
     assert result_remove is None
+    assert "sensor.deddie_production_123456789" not in metadata_ids
+    assert list(last_purged) == ["sensor.deddie_production_987654321"]
+    # Τα checkpoints όλων των αισθητήρων διαγράφονται
+    keys = {c.kwargs["key"] for c in clear.await_args_list}
+    assert {ATTR_CONSUMPTION, ATTR_PRODUCTION, ATTR_INJECTION} == keys
+
+
+@pytest.mark.asyncio
+async def test_async_setup_preloads_all_supplies(monkeypatch, hass):
+    preload = AsyncMock()
+    monkeypatch.setattr(deddie_metering, "async_preload_stores", preload)
+    entries = [MagicMock(data={"supplyNumber": s}) for s in ("111", "222", "")]
+    hass.config_entries.async_entries.return_value = entries
+    assert await deddie_metering.async_setup(hass, {}) is True
+    hass.config_entries.async_entries.assert_called_once_with(DOMAIN)
+    preload.assert_awaited_once_with(hass, ["111", "222"])
+
+
+@pytest.mark.asyncio
+async def test_async_setup_entry_clears_checkpoints_after_backfill(monkeypatch, hass):
+    """
+    Μετά την ολοκλήρωση της αρχικής λήψης δεν μένει checkpoint (ούτε το
+    συσσωρευμένο σύνολό του) για καμία κατηγορία.
+    """
+    from datetime import datetime
+    from deddie_metering.helpers.storage import commit_progress, load_checkpoint
+
+    hass.data = {}
+    entry = MagicMock()
+    entry.data = {"supplyNumber": "SUPCK", "taxNumber": "TAXCK"}
+    entry.options = {
+        "token": "tok",
+        "initial_time": "01/01/2020",
+        "interval_hours": 4,
+        CONF_HAS_PV: True,
+        "fresh_setup": True,
+    }
+    entry.entry_id = "eid_ck"
+
+    async def fake_run_initial_batches(hass_arg, token, supply, *args, **kwargs):
+        # Ένα checkpoint ανά παράθυρο, όπως στη batch_fetch
+        for key in (ATTR_CONSUMPTION, ATTR_PRODUCTION, ATTR_INJECTION):
+            await commit_progress(
+                hass_arg,
+                supply,
+                10.0,
+                datetime(2021, 1, 1),
+                key=key,
+                start_dt=datetime(2020, 1, 1),
+                cursor_dt=datetime(2021, 1, 1),
+            )
+
+    monkeypatch.setattr(
+        deddie_metering, "run_initial_batches", fake_run_initial_batches
+    )
+    monkeypatch.setattr(deddie_metering, "save_initial_jump_flag", AsyncMock())
+
+    class DummyCoord:
+        def __init__(self, *args, **kwargs):
+            pass
+
+        async def async_config_entry_first_refresh(self):
+            pass
+
+    monkeypatch.setattr(deddie_metering, "DeddieDataUpdateCoordinator", DummyCoord)
+    hass.config_entries.async_forward_entry_setups = AsyncMock()
+    hass.config_entries.async_update_entry = MagicMock()
+
+    assert await async_setup_entry(hass, entry) is True
+    hass.config_entries.async_update_entry.assert_called_once()
+    for key in (ATTR_CONSUMPTION, ATTR_PRODUCTION, ATTR_INJECTION):
+        assert await load_checkpoint(hass, "SUPCK", key=key) is None
@@ -1,6 +1,6 @@
 import pytest
 import asyncio
-from datetime import datetime
+from datetime import datetime, timedelta
 from unittest.mock import AsyncMock, MagicMock, patch
 import voluptuous
 from deddie_metering import options_flow
@@ -121,6 +121,39 @@ async def test_initial_time_validations(hass, dummy_config_entry):
     assert result["errors"]["initial_time"] == "date_not_earlier"
 
 
+@pytest.mark.asyncio
+async def test_archive_cold_years_need_mmap_archive(hass, dummy_config_entry):
+    """
+    Η συμπίεση παλαιότερων ετών γίνεται δεκτή μόνο με ενεργό τοπικό αρχείο
+    τύπου mmap (από την υποβολή ή τα αποθηκευμένα options).
+    """
+    handler = options_flow.DeddieOptionsFlowHandler(dummy_config_entry)
+    setup_options_flow(handler)
+    cold = {"interval_hours": 12, options_flow.CONF_ARCHIVE_COLD_AFTER_YEARS: 2}
+
+    for extra in (
+        {},
+        {options_flow.CONF_RAW_ARCHIVE: True},
+        {
+            options_flow.CONF_RAW_ARCHIVE: False,
+            options_flow.CONF_ARCHIVE_BACKEND: options_flow.ARCHIVE_BACKEND_MMAP,
+        },
+    ):
+        result = await handler.async_step_init({**cold, **extra})
+        if asyncio.iscoroutine(result):
+            result = await result
+        assert result["errors"] == {
+            options_flow.CONF_ARCHIVE_COLD_AFTER_YEARS: "cold_archive_needs_mmap"
+        }
+
+    dummy_config_entry.options[options_flow.CONF_RAW_ARCHIVE] = True
+    dummy_config_entry.options[options_flow.CONF_ARCHIVE_BACKEND] = "mmap"
+    result = await handler.async_step_init(dict(cold))
+    if asyncio.iscoroutine(result):
+        result = await result
+    assert result["data"][options_flow.CONF_ARCHIVE_COLD_AFTER_YEARS] == 2
+
+
 @pytest.mark.asyncio
 async def test_token_error_mapping(hass, dummy_config_entry):
     handler = options_flow.DeddieOptionsFlowHandler(dummy_config_entry)
@@ -181,9 +214,10 @@ async def test_old_initial_parse_exception_triggers_rebatch(hass, dummy_config_e
     setup_options_flow(handler)
     mock_run = AsyncMock()
     mock_save = AsyncMock()
+    mock_forget = MagicMock()
     with patch.object(options_flow, "run_initial_batches", new=mock_run), patch.object(
         options_flow, "save_initial_jump_flag", new=mock_save
-    ):
+    ), patch.object(options_flow, "forget_metadata_ids", new=mock_forget):
         new_date = "01/01/2023"
         result = await handler.async_step_init(
             {
@@ -195,6 +229,8 @@ async def test_old_initial_parse_exception_triggers_rebatch(hass, dummy_config_e
         if asyncio.iscoroutine(result):
             result = await result
     assert mock_run.await_count == 1
+    # Η επαναφορά αφαιρεί και τα metadata_id της παροχής από την cache
+    mock_forget.assert_called_once_with("123456789")
     assert result["type"] == "create_entry"
 
 
@@ -207,3 +243,269 @@ def test_options_flow_build_token_link_en():
     handler.hass.config.language = "en"
     link = handler._build_token_link()
     assert link == '<a href="https://apps.deddie.gr/mdp/intro.html">HEDNO</a>'
+
+
+@pytest.mark.asyncio
+async def test_incremental_rebase_skips_full_rebatch(hass, dummy_config_entry):
+    """
+    Με ενεργό το incremental_rebase, επιτυχές re-basing παραλείπει το reset
+    και την πλήρη λήψη, ενώ σε αποτυχία εκτελείται η πλήρης λήψη.
+    """
+    dummy_config_entry.options[options_flow.CONF_INCREMENTAL_REBASE] = True
+    user_input = {
+        "token": dummy_config_entry.options["token"],
+        "initial_time": "01/01/2023",
+        "interval_hours": 12,
+    }
+    for rebased, expected_runs in ((True, 0), (False, 1)):
+        handler = options_flow.DeddieOptionsFlowHandler(dummy_config_entry)
+        setup_options_flow(handler)
+        mock_run = AsyncMock()
+        mock_rebase = AsyncMock(return_value=rebased)
+        with patch.object(
+            options_flow, "run_initial_batches", new=mock_run
+        ), patch.object(
+            options_flow, "rebase_initial_batches", new=mock_rebase
+        ), patch.object(
+            options_flow, "save_initial_jump_flag", new=AsyncMock()
+        ), patch.object(
+            options_flow, "clear_checkpoint", new=AsyncMock()
+        ):
+            result = await handler.async_step_init(user_input)
+            if asyncio.iscoroutine(result):
+                result = await result
+        assert result["type"] == "create_entry"
+        assert mock_rebase.await_args.args[4:6] == (
+            datetime(2023, 1, 1),
+            datetime(2024, 1, 1),
+        )
+        assert mock_run.await_count == expected_runs
+
+    # Μη αναγνώσιμη παλιά ημερομηνία: πλήρης λήψη χωρίς re-basing
+    dummy_config_entry.options["initial_time"] = "invalid_old"
+    handler = options_flow.DeddieOptionsFlowHandler(dummy_config_entry)
+    setup_options_flow(handler)
+    mock_rebase = AsyncMock()
+    with patch.object(
+        options_flow, "run_initial_batches", new=AsyncMock()
+    ), patch.object(
+        options_flow, "rebase_initial_batches", new=mock_rebase
+    ), patch.object(
+        options_flow, "clear_checkpoint", new=AsyncMock()
+    ), patch.object(
+        options_flow, "save_initial_jump_flag", new=AsyncMock()
+    ):
+        result = await handler.async_step_init(user_input)
+        if asyncio.iscoroutine(result):
+            await result
+    mock_rebase.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_redownload_uses_the_submitted_options(hass, dummy_config_entry):
+    """
+    Η λήψη που ξεκινά η αλλαγή της αρχικής ημερομηνίας (πλήρης ή re-basing)
+    εφαρμόζει τις ρυθμίσεις της ίδιας υποβολής.
+    """
+    user_input = {
+        "token": dummy_config_entry.options["token"],
+        "initial_time": "01/01/2023",
+        "interval_hours": 12,
+        options_flow.CONF_BACKFILL_MEMORY_TARGET: 2**20,
+        options_flow.CONF_PROCESS_OFFLOAD: True,
+    }
+    for incremental in (False, True):
+        user_input[options_flow.CONF_INCREMENTAL_REBASE] = incremental
+        handler = options_flow.DeddieOptionsFlowHandler(dummy_config_entry)
+        setup_options_flow(handler)
+        mock_run = AsyncMock()
+        mock_rebase = AsyncMock(return_value=True)
+        with patch.object(
+            options_flow, "run_initial_batches", new=mock_run
+        ), patch.object(
+            options_flow, "rebase_initial_batches", new=mock_rebase
+        ), patch.object(
+            options_flow, "save_initial_jump_flag", new=AsyncMock()
+        ), patch.object(
+            options_flow, "clear_checkpoint", new=AsyncMock()
+        ):
+            result = await handler.async_step_init(dict(user_input))
+            if asyncio.iscoroutine(result):
+                result = await result
+        assert result["type"] == "create_entry"
+        used = mock_rebase if incremental else mock_run
+        options = used.await_args.kwargs["options"]
+        assert options[options_flow.CONF_BACKFILL_MEMORY_TARGET] == 2**20
+        assert options[options_flow.CONF_PROCESS_OFFLOAD] is True
+        assert options["token"] == dummy_config_entry.options["token"]
+
+
+def _schema_defaults(handler, defaults=None, monkeypatch=None):
+    """Επιστρέφει {πεδίο: προεπιλογή} του schema της φόρμας επιλογών."""
+    monkeypatch.setattr(
+        options_flow.vol, "Optional", lambda key, default=None: (key, default)
+    )
+    monkeypatch.setattr(
+        options_flow.vol, "Required", lambda key, default=None: (key, default)
+    )
+    return dict(handler._get_schema(defaults or {}).keys())
+
+
+@pytest.mark.parametrize(
+    "key, default, stored",
+    [
+        (options_flow.CONF_PROCESS_OFFLOAD, False, True),
+        (
+            options_flow.CONF_OFFLOAD_MIN_BYTES,
+            options_flow.DEFAULT_OFFLOAD_MIN_BYTES,
+            1024,
+        ),
+        (options_flow.CONF_COOPERATIVE, False, True),
+        (options_flow.CONF_MAX_SLICE_MS, options_flow.DEFAULT_MAX_SLICE_MS, 50),
+        (options_flow.CONF_BACKFILL_MEMORY_TARGET, 0, 2**20),
+        (options_flow.CONF_REVISION_SCAN, False, True),
+        (
+            options_flow.CONF_REVISION_WINDOW_DAYS,
+            options_flow.DEFAULT_REVISION_WINDOW_DAYS,
+            3,
+        ),
+        (options_flow.CONF_CONFIRMED_TRACKING, False, True),
+        (options_flow.CONF_INCREMENTAL_REBASE, False, True),
+        (options_flow.CONF_RAW_ARCHIVE, False, True),
+        (
+            options_flow.CONF_ARCHIVE_BACKEND,
+            options_flow.DEFAULT_ARCHIVE_BACKEND,
+            options_flow.ARCHIVE_BACKEND_MMAP,
+        ),
+        (options_flow.CONF_ARCHIVE_COLD_AFTER_YEARS, 0, 2),
+    ],
+)
+def test_schema_exposes_option(
+    hass, dummy_config_entry, monkeypatch, key, default, stored
+):
+    """
+    Κάθε ρύθμιση εμφανίζεται στη φόρμα επιλογών με την προεπιλογή της ή την
+    αποθηκευμένη τιμή· οι τιμές της φόρμας (π.χ. μετά από σφάλμα) έχουν
+    προτεραιότητα.
+    """
+    handler = options_flow.DeddieOptionsFlowHandler(dummy_config_entry)
+    assert _schema_defaults(handler, monkeypatch=monkeypatch)[key] == default
+    dummy_config_entry.options[key] = stored
+    assert _schema_defaults(handler, monkeypatch=monkeypatch)[key] == stored
+    assert _schema_defaults(handler, {key: default}, monkeypatch)[key] == default
+
+
+@pytest.mark.asyncio
+async def test_validation_policy_from_options_form(
+    hass, dummy_config_entry, monkeypatch
+):
+    """
+    Η πολιτική επικύρωσης ρυθμίζεται από τη φόρμα ανά κατηγορία και κανόνα
+    και αποθηκεύεται ως validation_policy, χωρίς να χάνονται οι κανόνες
+    των άλλων κατηγοριών.
+    """
+    handler = options_flow.DeddieOptionsFlowHandler(dummy_config_entry)
+    schema = _schema_defaults(handler, monkeypatch=monkeypatch)
+    for class_type in ("active", "produced", "injected"):
+        assert schema[f"validation_policy_{class_type}_zero"] == "accept"
+        assert schema[f"validation_policy_{class_type}_null"] == "reject"
+        assert schema[f"validation_policy_{class_type}_negative"] == "accept"
+
+    dummy_config_entry.options[options_flow.CONF_VALIDATION_POLICY] = {
+        "active": {"negative": "reject"},
+        "injected": {"null": "accept"},
+    }
+    schema = _schema_defaults(handler, monkeypatch=monkeypatch)
+    assert schema["validation_policy_active_negative"] == "reject"
+    assert schema["validation_policy_produced_negative"] == "accept"
+    assert schema["validation_policy_injected_null"] == "accept"
+
+    setup_options_flow(handler)
+    result = await handler.async_step_init(
+        {
+            "token": dummy_config_entry.options["token"],
+            "interval_hours": 12,
+            "validation_policy_active_zero": "reject",
+            "validation_policy_produced_zero": "accept",
+            "validation_policy_produced_negative": "reject",
+        }
+    )
+    if asyncio.iscoroutine(result):
+        result = await result
+    data = result["data"]
+    assert not [key for key in data if key.startswith("validation_policy_")]
+    assert data[options_flow.CONF_VALIDATION_POLICY] == {
+        "active": {"negative": "reject", "zero": "reject"},
+        "produced": {"zero": "accept", "negative": "reject"},
+        "injected": {"null": "accept"},
+    }
+    # Η αποθηκευμένη πολιτική δεν τροποποιείται επιτόπου
+    assert dummy_config_entry.options[options_flow.CONF_VALIDATION_POLICY] == {
+        "active": {"negative": "reject"},
+        "injected": {"null": "accept"},
+    }
+    # Χωρίς πεδία πολιτικής στην υποβολή, η αποθηκευμένη παραμένει ως έχει
+    result = await handler.async_step_init({"interval_hours": 12})
+    if asyncio.iscoroutine(result):
+        result = await result
+    assert result["data"][options_flow.CONF_VALIDATION_POLICY] == {
+        "active": {"negative": "reject"},
+        "injected": {"null": "accept"},
+    }
+
+
+@pytest.mark.asyncio
+async def test_rebase_after_completed_backfill(hass, dummy_config_entry, monkeypatch):
+    """
+    Μετά από μια ολοκληρωμένη αρχική λήψη δεν μένει checkpoint, οπότε μια
+    επόμενη νωρίτερη αρχική ημερομηνία εκτελεί incremental re-basing αντί
+    για πλήρη λήψη.
+    """
+    from deddie_metering.helpers import storage, utils
+
+    dummy_config_entry.options[options_flow.CONF_INCREMENTAL_REBASE] = True
+    monkeypatch.setattr(options_flow, "save_last_total", storage.save_last_total)
+
+    async def fake_api(hass_arg, token, supply, tax, start, end, class_type, **kw):
+        return [
+            {"meterDate": start.strftime("%d/%m/%Y %H:%M")},
+            {"meterDate": (end + timedelta(days=1)).strftime("%d/%m/%Y %H:%M")},
+        ]
+
+    async def fake_process(hass_arg, records, supply, total, type_key, options):
+        last = datetime.strptime(records[-1]["meterDate"], "%d/%m/%Y %H:%M")
+        return 2, total + 10.0, last
+
+    shift = AsyncMock(return_value=1)
+    monkeypatch.setattr(utils, "get_data_from_api", fake_api)
+    monkeypatch.setattr(utils, "process_and_insert", fake_process)
+    monkeypatch.setattr(utils, "schedule_future_statistics_update", MagicMock())
+    monkeypatch.setattr(utils, "shift_statistics", shift)
+    run = AsyncMock(side_effect=utils.run_initial_batches)
+    monkeypatch.setattr(options_flow, "run_initial_batches", run)
+
+    async def change_initial(initial_time):
+        handler = options_flow.DeddieOptionsFlowHandler(dummy_config_entry)
+        setup_options_flow(handler)
+        result = await handler.async_step_init(
+            {
+                "token": dummy_config_entry.options["token"],
+                "interval_hours": 12,
+                "initial_time": initial_time,
+            }
+        )
+        if asyncio.iscoroutine(result):
+            result = await result
+        dummy_config_entry.options = result["data"]
+
+    # 1) Πλήρης λήψη (καμία προηγούμενη λήψη): δύο παράθυρα
+    await change_initial("01/06/2023")
+    assert run.await_count == 1
+    assert await storage.load_checkpoint(hass, "123456789") is None
+    assert await storage.load_last_total(hass, "123456789") == 20.0
+
+    # 2) Νωρίτερη ημερομηνία: re-basing με ένα παράθυρο, χωρίς πλήρη λήψη
+    await change_initial("01/01/2023")
+    assert run.await_count == 1
+    assert shift.await_args.args[2:] == (datetime(2023, 6, 1), 10.0, "consumption")
+    assert await storage.load_last_total(hass, "123456789") == 30.0
@@ -0,0 +1,137 @@
+import json
+import pytest
+from datetime import datetime, timedelta
+from deddie_metering.helpers import parsing
+
+
+def _day_records(base, hours=24, value="1"):
+    return [
+        {
+            "meterDate": (base + timedelta(hours=i)).strftime("%d/%m/%Y %H:%M"),
+            "consumption": value,
+        }
+        for i in range(1, hours + 1)
+    ]
+
+
+def test_decode_curves_returns_curves_and_raises_on_error():
+    raw = json.dumps({"curves": [{"meterDate": "01/01/2025 01:00"}]}).encode()
+    assert parsing.decode_curves(raw) == [{"meterDate": "01/01/2025 01:00"}]
+    assert parsing.decode_curves(b"{}") == []
+    with pytest.raises(Exception, match="bad token"):
+        parsing.decode_curves(json.dumps({"error": "bad token"}).encode())
+
+
+def test_accumulate_records_compact_arrays():
+    """
+    Μία πλήρης ημέρα γίνεται δεκτή και επιστρέφονται συμπαγείς πίνακες
+    meterDate/συνόλων, ενώ μια ελλιπής ημέρα απορρίπτεται.
+    """
+    base = datetime(2025, 1, 1)
+    records = _day_records(base) + _day_records(base + timedelta(days=1), hours=5)
+    seconds, sums, overall, skipped, total = parsing.accumulate_records(
+        records, "SUP", 10.0
+    )
+    assert seconds.typecode == "q"
+    assert sums.typecode == "d"
+    assert len(seconds) == len(sums) == 24
+    assert overall == 24
+    assert skipped == 5
+    assert total == 34.0
+    assert sums[0] == 11.0
+    assert parsing.meter_dt_from_seconds(seconds[0]) == base + timedelta(hours=1)
+    assert parsing.meter_dt_from_seconds(seconds[-1]) == base + timedelta(days=1)
+
+
+def test_decode_and_accumulate_matches_inline():
+    """Η worker συνάρτηση δίνει ίδιο αποτέλεσμα με την inline επεξεργασία."""
+    records = _day_records(datetime(2025, 2, 1), value="0.5")
+    raw = json.dumps({"curves": records}).encode()
+    assert parsing.decode_and_accumulate(raw, "SUP", 0.0) == (
+        parsing.accumulate_records(records, "SUP", 0.0)
+    )
+
+
+def test_expected_hours_follow_dst_transitions():
+    tz = "Europe/Athens"
+    assert parsing.expected_hours(datetime(2025, 3, 30).date(), tz) == 23
+    assert parsing.expected_hours(datetime(2025, 10, 26).date(), tz) == 25
+    assert parsing.expected_hours(datetime(2025, 6, 1).date(), tz) == 24
+    assert parsing.expected_hours(datetime(2025, 3, 30).date(), None) == 24
+
+
+def test_accumulate_records_dst_days():
+    """
+    Με ζώνη ώρας, η ημέρα θερινής ώρας (23 εγγραφές) και η ημέρα επαναφοράς
+    (25 εγγραφές, με επαναλαμβανόμενη meterDate) γίνονται δεκτές και δίνουν
+    διαδοχικές, μοναδικές ώρες.
+    """
+    tz = "Europe/Athens"
+    spring = [
+        r
+        for r in _day_records(datetime(2025, 3, 30))
+        if not r["meterDate"].endswith("04:00")
+    ]
+    autumn = _day_records(datetime(2025, 10, 26))
+    autumn.insert(4, dict(autumn[3]))
+    seconds, sums, overall, skipped, total = parsing.accumulate_records(
+        spring + autumn, "SUP", 0.0, tz
+    )
+    assert overall == 48
+    assert skipped == 0
+    assert total == 48.0
+    assert len(set(seconds)) == 48
+    autumn_seconds = list(seconds[23:])
+    assert all(b - a == 3600 for a, b in zip(autumn_seconds, autumn_seconds[1:]))
+    first = parsing.meter_dt_from_seconds(autumn_seconds[0], tz)
+    assert first.utcoffset() == timedelta(hours=3)
+    last = parsing.meter_dt_from_seconds(autumn_seconds[-1], tz)
+    assert last.replace(tzinfo=None) == datetime(2025, 10, 27)
+    assert last.utcoffset() == timedelta(hours=2)
+
+    # Χωρίς ζώνη ώρας οι ημέρες αλλαγής ώρας απορρίπτονται
+    _, _, overall, skipped, _ = parsing.accumulate_records(spring + autumn, "SUP", 0.0)
+    assert overall == 0
+    assert skipped == 48
+
+
+def test_decode_and_accumulate_fall_back_day_requires_repeated_hour():
+    """
+    Απόκριση του API για την ημέρα επαναφοράς της χειμερινής ώρας: γίνεται
+    δεκτή μόνο όταν η διπλή meterDate είναι η επαναλαμβανόμενη ώρα (04:00),
+    ενώ 25 εγγραφές με διπλή άλλη ώρα ή ημέρα 24 εγγραφών με διπλή ώρα
+    απορρίπτονται.
+    """
+    tz = "Europe/Athens"
+
+    def response(curves):
+        return json.dumps({"curves": curves}).encode()
+
+    autumn = _day_records(datetime(2025, 10, 26), value="0.25")
+    repeated = autumn[:4] + [dict(autumn[3])] + autumn[4:]
+    assert [r["meterDate"][-5:] for r in repeated[2:6]] == [
+        "03:00",
+        "04:00",
+        "04:00",
+        "05:00",
+    ]
+    seconds, _, overall, skipped, total = parsing.decode_and_accumulate(
+        response(repeated), "SUP", 0.0, tz
+    )
+    assert (overall, skipped, total) == (25, 0, 6.25)
+    assert list(seconds) == [seconds[0] + 3600 * i for i in range(25)]
+
+    # 25 εγγραφές, αλλά η διπλή meterDate δεν είναι η επαναλαμβανόμενη ώρα
+    wrong = autumn[:10] + [dict(autumn[9])] + autumn[10:]
+    seconds, _, overall, skipped, _ = parsing.decode_and_accumulate(
+        response(wrong), "SUP", 0.0, tz
+    )
+    assert (len(seconds), overall, skipped) == (0, 0, 25)
+
+    # Συνηθισμένη ημέρα: διπλή ώρα στη θέση μιας ελλείπουσας
+    june = _day_records(datetime(2025, 6, 1))
+    june[5] = dict(june[4])
+    _, _, overall, skipped, _ = parsing.decode_and_accumulate(
+        response(june), "SUP", 0.0, tz
+    )
+    assert (overall, skipped) == (0, 24)
@@ -43,6 +43,14 @@ def stub_homeassistant_modules():
         sys.modules.pop(mod, None)
 
 
+@pytest.fixture(autouse=True)
+def schedule_purge(monkeypatch):
+    # Το κοινό purge scheduler αντικαθίσταται με mock
+    mock = MagicMock()
+    monkeypatch.setattr("deddie_metering.sensor.schedule_purge", mock)
+    return mock
+
+
 @pytest.mark.asyncio
 async def test_fresh_install_sensor(monkeypatch, hass):
     coord = MagicMock()
@@ -61,6 +69,7 @@ async def test_fresh_install_sensor(monkeypatch, hass):
 
     sensor = DeddieConsumptionSensor(coord, "123456789", "en")
     sensor.hass = hass
+    sensor.entity_id = "sensor.test"
     sensor._supply = "123456789"
 
     await sensor.async_added_to_hass()
@@ -72,7 +81,7 @@ async def test_fresh_install_sensor(monkeypatch, hass):
 
 
 @pytest.mark.asyncio
-async def test_restore_state_sensor(monkeypatch, hass):
+async def test_restore_state_sensor(monkeypatch, hass, schedule_purge):
     coord = MagicMock()
     coord.data = {
         ATTR_CONSUMPTION: 7.7,
@@ -93,10 +102,11 @@ async def test_restore_state_sensor(monkeypatch, hass):
 
     sensor = DeddieConsumptionSensor(coord, "987654321", "en")
     sensor.hass = hass
+    sensor.entity_id = "sensor.test"
 
     await sensor.async_added_to_hass()
     assert sensor.native_value == 7.7
-    assert sensor._purge_unsub is not None
+    schedule_purge.assert_called_once_with(hass, "sensor.test", "987654321", 7.7)
     attrs = sensor.extra_state_attributes
     assert attrs[translate("sensor.attr_until", "en")] == "19/04/2025 24:00"
     assert attrs[translate("sensor.attr_last_fetch", "en")] == "21/04/2025 15:30:00"
@@ -176,32 +186,27 @@ async def test_extra_state_attributes_formatting():
 
 
 @pytest.mark.asyncio
-async def test_async_purge_calls_helper(monkeypatch, hass):
+async def test_schedule_purge_uses_shared_scheduler(hass, schedule_purge):
     coord = MagicMock(data={ATTR_CONSUMPTION: 4.4})
     sensor = DeddieConsumptionSensor(coord, "321", "en")
     sensor.hass = hass
     sensor.entity_id = "sensor.test"
-
-    called = AsyncMock()
-    monkeypatch.setattr("deddie_metering.sensor.purge_flat_states", called)
-    sensor._purge_unsub = None
+    sensor._total = 4.4
     sensor._schedule_purge()
-    await sensor._async_purge(None)
-    called.assert_awaited_once_with(hass, "sensor.test", "321")
+    schedule_purge.assert_called_once_with(hass, "sensor.test", "321", 4.4)
 
 
 @pytest.mark.asyncio
-async def test_handle_coordinator_update_with_none_data(hass):
+async def test_handle_coordinator_update_with_none_data(hass, schedule_purge):
     coord = MagicMock(data=None, async_add_listener=MagicMock())
     sensor = DeddieConsumptionSensor(coord, "111111111", "en")
     sensor.hass = hass
     sensor._total = 5.5
     sensor.entity_id = "sensor.test"
-    sensor._purge_unsub = None
 
     sensor._handle_coordinator_update()
     assert sensor.native_value == 0.0
-    assert sensor._purge_unsub is not None
+    schedule_purge.assert_called_once_with(hass, "sensor.test", "111111111", 0.0)
 
 
 @pytest.mark.asyncio
@@ -218,13 +223,11 @@ async def test_available_property(monkeypatch, hass):
     assert inj.available is True
 
 
-def test_schedule_purge_idempotent():
-    coord = MagicMock()
-    sensor = DeddieConsumptionSensor(coord, "supply", "en")
-    sentinel = object()
-    sensor._purge_unsub = sentinel
+def test_schedule_purge_skips_unavailable_sensor(schedule_purge):
+    coord = MagicMock(has_pv=False)
+    sensor = DeddieProductionSensor(coord, "supply", "en")
     sensor._schedule_purge()
-    assert sensor._purge_unsub is sentinel
+    schedule_purge.assert_not_called()
 
 
 @pytest.mark.asyncio
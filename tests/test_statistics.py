@@ -1,21 +1,13 @@
 import asyncio
+import sqlite3
+import threading
 import pytest
 import types
+from contextlib import contextmanager
 from datetime import datetime
 import deddie_metering.helpers.statistics as statistics
 
 
-# Override StatisticMetaData to preserve passed values in tests
-class DummyMetaData:
-    def __init__(self, **kwargs):
-        self.statistic_id = kwargs.get("statistic_id")
-        self.name = kwargs.get("name")
-
-
-# Apply override
-statistics.StatisticMetaData = DummyMetaData
-
-
 @pytest.mark.asyncio
 async def test_run_update_future_statistics_logs(monkeypatch, hass, caplog):
     """
@@ -38,78 +30,65 @@ async def test_run_update_future_statistics_logs(monkeypatch, hass, caplog):
     assert "Ενημερώθηκαν στη βάση δεδομένων HA 2 ασυνεπείς εγγραφές" in caplog.text
 
 
+@pytest.fixture(autouse=True)
+def clear_metadata_ids():
+    # Κάθε test ξεκινά χωρίς αποθηκευμένα metadata_id και εκκρεμείς διορθώσεις
+    statistics._METADATA_IDS.clear()
+    statistics._PENDING_CORRECTIONS.clear()
+    yield
+    statistics._METADATA_IDS.clear()
+    statistics._PENDING_CORRECTIONS.clear()
+
+
 @pytest.mark.asyncio
-async def test_update_future_statistics_production_and_injection(monkeypatch, hass):
+async def test_update_future_statistics_production_and_injection(
+    monkeypatch, hass, sqlite_engine
+):
     """
-    Should return correct count and correct metadata for production and injection.
+    Ενημερώνει με ένα UPDATE μόνο τις εγγραφές του αισθητήρα μετά το
+    last_meter_dt και επιστρέφει το πλήθος τους.
     """
-    hass.async_add_executor_job = lambda fn, *args: asyncio.sleep(0, fn(*args))
-    # Prepare fake timestamps
-    base_ts = datetime.now().timestamp()
-    rows = [(base_ts + 3600,), (base_ts + 7200,)]
-
-    fake_instance = types.SimpleNamespace()
-    fake_engine = types.SimpleNamespace()
-
-    class FakeConnection:
-        def __init__(self, rows):
-            self._rows = rows
-            self.closed = False
-
-        def execute(self, stmt, params):
-            class Result:
-                def __init__(self, rows):
-                    self._rows = rows
-
-                def fetchall(self):
-                    return self._rows
-
-            return Result(self._rows)
-
-        def close(self):
-            self.closed = True
-
-    fake_engine.connect = lambda: FakeConnection(rows)
-    fake_instance.engine = fake_engine
-    fake_instance.async_add_executor_job = lambda fn, *args: asyncio.sleep(0, fn(*args))
-    monkeypatch.setattr(statistics, "get_instance", lambda hass_arg: fake_instance)
-
-    calls = []
-
-    def fake_import(hass_arg, metadata, data_list):
-        calls.append((metadata.statistic_id, metadata.name, len(data_list)))
-
-    monkeypatch.setattr(statistics, "async_import_statistics", fake_import)
-
-    last_dt = datetime.fromtimestamp(base_ts)
-    # Test production
-    type_key = "production"
+    sqlite_engine.db.executescript(
+        "INSERT INTO statistics_meta VALUES "
+        "(3, 'sensor.deddie_production_prod1'), (4, 'sensor.deddie_injection_inj2');"
+        "INSERT INTO statistics VALUES (3, 100, 0, 0), (3, 3700, 0, 0), "
+        "(3, 7300, 0, 0), (4, 3700, 0, 0), (4, 7300, 0, 0);"
+    )
+    last_dt = datetime.fromtimestamp(100)
     result_prod = await statistics.update_future_statistics(
-        hass,
-        "prod1",
-        last_dt,
-        1.0,
-        type_key,
+        hass, "prod1", last_dt, 1.0, "production"
     )
     assert result_prod == 2
-    stat_id, name, count_list = calls[-1]
-    assert stat_id == f"sensor.deddie_{type_key}_prod1"
-    assert "Παραγωγή ΔΕΔΔΗΕ" in name
-    assert count_list == 2
-    # Test injection
-    type_key = "injection"
     result_inj = await statistics.update_future_statistics(
-        hass,
-        "inj2",
-        last_dt,
-        2.0,
-        type_key,
+        hass, "inj2", last_dt, 2.0, "injection"
     )
     assert result_inj == 2
-    stat_id, name, count_list = calls[-1]
-    assert stat_id == f"sensor.deddie_{type_key}_inj2"
-    assert "Έγχυση ΔΕΔΔΗΕ" in name
-    assert count_list == 2
+    rows = sqlite_engine.db.execute(
+        "SELECT metadata_id, start_ts, state, sum FROM statistics "
+        "WHERE metadata_id IN (3, 4)"
+    ).fetchall()
+    assert sorted(rows) == [
+        (3, 100, 0, 0),
+        (3, 3700, 1.0, 1.0),
+        (3, 7300, 1.0, 1.0),
+        (4, 3700, 2.0, 2.0),
+        (4, 7300, 2.0, 2.0),
+    ]
+    assert statistics._METADATA_IDS == {
+        "sensor.deddie_production_prod1": 3,
+        "sensor.deddie_injection_inj2": 4,
+    }
+    # Χωρίς εγγραφές μετά το last_meter_dt: καμία εργασία στην ουρά του recorder
+    queued = []
+    instance = statistics.get_instance(hass)
+    monkeypatch.setattr(instance, "queue_task", queued.append)
+    assert (
+        await statistics.update_future_statistics(
+            hass, "prod1", datetime.fromtimestamp(7300), 5.0, "production"
+        )
+        == 0
+    )
+    assert queued == []
 
 
 @pytest.mark.asyncio
@@ -155,10 +134,15 @@ async def test_purge_flat_states_success(monkeypatch, hass, caplog):
 
     monkeypatch.setattr(hass.services, "async_call", fake_call)
     caplog.set_level("INFO")
-    await statistics.purge_flat_states(hass, "ent.id", "supplyA", keep_days=5)
+    assert await statistics.purge_flat_states(
+        hass, ["ent.id", "ent.other"], "supplyA", keep_days=5
+    )
     assert call_args["domain"] == "recorder"
     assert call_args["service"] == "purge_entities"
-    assert call_args["service_data"] == {"entity_id": ["ent.id"], "keep_days": 5}
+    assert call_args["service_data"] == {
+        "entity_id": ["ent.id", "ent.other"],
+        "keep_days": 5,
+    }
     assert call_args["blocking"] is True
     assert "Επιτυχής διαγραφή των flat state εγγραφών" in caplog.text
 
@@ -174,66 +158,479 @@ async def test_purge_flat_states_error(monkeypatch, hass, caplog):
 
     monkeypatch.setattr(hass.services, "async_call", fake_call)
     caplog.set_level("ERROR")
-    await statistics.purge_flat_states(hass, "ent2", "supplyB")
+    assert not await statistics.purge_flat_states(hass, ["ent2"], "supplyB")
     assert "Σφάλμα κατά τη διαγραφή των flat state εγγραφών" in caplog.text
 
 
 @pytest.mark.asyncio
-async def test_update_future_statistics_conn_close_warning(monkeypatch, hass, caplog):
+async def test_update_future_statistics_query_runs_in_recorder_executor(
+    monkeypatch, hass, caplog
+):
     """
-    update_future_statistics should log a warning when closing the DB connection fails.
+    Η αναζήτηση του metadata_id εκτελείται στον executor του recorder μόνο
+    την πρώτη φορά και η ενημέρωση ως εργασία του recorder· σφάλματα και
+    λήξη χρόνου καταγράφονται χωρίς ενημέρωση εγγραφών.
     """
-    # Patch hass.async_add_executor_job to be awaitable
-    hass.async_add_executor_job = lambda fn, *args: asyncio.sleep(0, fn(*args))
+    jobs = []
 
-    # Setup fake connection with two timestamps and a close method
-    class FakeConn:
-        def __init__(self):
-            self.closed = False
+    async def fake_add_executor_job(fn, *args):
+        jobs.append(fn)
+        return fn(*args)
 
-        def execute(self, stmt, params):
-            class Result:
-                def fetchall(self_inner):
-                    return [(10,), (20,)]
+    def fake_queue_task(task):
+        jobs.append(task.job)
+        task.run(fake_instance)
 
-            return Result()
+    fake_instance = types.SimpleNamespace(
+        engine=None,
+        async_add_executor_job=fake_add_executor_job,
+        queue_task=fake_queue_task,
+    )
+    monkeypatch.setattr(statistics, "get_instance", lambda hass_arg: fake_instance)
+    monkeypatch.setattr(statistics, "_fetch_metadata_id", lambda engine, sid: 7)
+    monkeypatch.setattr(statistics, "_has_future_rows", lambda engine, mid, ts: True)
+    monkeypatch.setattr(
+        statistics, "_update_future_rows", lambda engine, mid, ts, total: 2
+    )
+    result = await statistics.update_future_statistics(
+        hass, "S1", datetime.now(), 0.0, "consumption"
+    )
+    assert result == 2
+    assert jobs == [
+        statistics._fetch_metadata_id,
+        statistics._has_future_rows,
+        statistics._update_future_rows,
+    ]
+    result = await statistics.update_future_statistics(
+        hass, "S1", datetime.now(), 0.0, "consumption"
+    )
+    # Το metadata_id εξυπηρετείται από την cache
+    assert result == 2
+    assert jobs[3:] == [statistics._has_future_rows, statistics._update_future_rows]
+    # Μετά την αφαίρεση της παροχής από την cache το metadata_id αναζητείται ξανά
+    statistics._METADATA_IDS["sensor.deddie_consumption_S10"] = 9
+    statistics.forget_metadata_ids("S1")
+    assert "sensor.deddie_consumption_S1" not in statistics._METADATA_IDS
+    assert statistics._METADATA_IDS["sensor.deddie_consumption_S10"] == 9
+    await statistics.update_future_statistics(
+        hass, "S1", datetime.now(), 0.0, "consumption"
+    )
+    assert jobs[5] == statistics._fetch_metadata_id
+    del jobs[5:]
+
+    def failing_update(engine, mid, ts, total):
+        raise RuntimeError("db down")
+
+    monkeypatch.setattr(statistics, "_update_future_rows", failing_update)
+    caplog.set_level("WARNING", logger="deddie_metering")
+    result = await statistics.update_future_statistics(
+        hass, "S1", datetime.now(), 0.0, "consumption"
+    )
+    assert result == 0
+    assert "Σφάλμα σύνδεσης στη βάση HA" in caplog.text
+
+    async def slow_add_executor_job(fn, *args):
+        await asyncio.sleep(1)
 
-        def close(self):
-            self.closed = True
-            raise Exception("close failed")
+    fake_instance.async_add_executor_job = slow_add_executor_job
+    monkeypatch.setattr(statistics, "STATISTICS_QUERY_TIMEOUT", 0.01)
+    result = await statistics.update_future_statistics(
+        hass, "S2", datetime.now(), 0.0, "consumption"
+    )
+    assert result == 0
+    assert "Λήξη χρόνου" in caplog.text
 
-    fake_conn = FakeConn()
 
-    # Stub _connect to return fake_conn
-    async def fake_connect(instance, engine):
-        return fake_conn
+@pytest.mark.asyncio
+async def test_writes_run_as_recorder_tasks(hass):
+    """
+    Οι εγγραφές εκτελούνται στο thread του recorder, μετά το commit των
+    εκκρεμών εγγραφών του, και το αποτέλεσμα ή το σφάλμα τους επιστρέφει
+    στο event loop· μια ακυρωμένη αναμονή (λήξη χρόνου) δεν επηρεάζεται.
+    """
+    tasks = []
+    instance = types.SimpleNamespace(engine="engine", queue_task=tasks.append)
 
-    monkeypatch.setattr(statistics, "_connect", fake_connect)
+    def job(engine, value):
+        if value is None:
+            raise RuntimeError("database is locked")
+        return engine, value
 
-    # Stub get_instance to return fake instance
-    fake_instance = type("FakeInstance", (), {})()
-    fake_instance.engine = None
+    async def write_in_recorder_thread(value, cancel=False):
+        pending = asyncio.ensure_future(
+            statistics._async_recorder_write(instance, job, value)
+        )
+        await asyncio.sleep(0)
+        assert tasks[-1].commit_before is True
+        if cancel:
+            pending.cancel()
+        thread = threading.Thread(target=tasks[-1].run, args=(instance,))
+        thread.start()
+        thread.join()
+        return pending
+
+    assert await (await write_in_recorder_thread(1)) == ("engine", 1)
+    with pytest.raises(RuntimeError, match="locked"):
+        await (await write_in_recorder_thread(None))
+    cancelled = await write_in_recorder_thread(2, cancel=True)
+    await asyncio.sleep(0)
+    assert cancelled.cancelled()
 
-    # Flag to confirm close was called
-    called_close = {"called": False}
+
+@pytest.mark.asyncio
+async def test_future_rows_update_uses_metadata_index(hass, sqlite_engine):
+    """
+    Χωρίς metadata_id (ο αισθητήρας δεν έχει ακόμη statistics) δεν εκτελείται
+    ερώτημα· τα ερωτήματα του statistics χρησιμοποιούν το ευρετήριο
+    (metadata_id, start_ts) και ο έλεγχος LIMIT 1 επιστρέφει άμεσα.
+    """
+    assert (
+        await statistics.update_future_statistics(
+            hass, "S9", datetime.fromtimestamp(0), 0.0, "consumption"
+        )
+        == 0
+    )
+    assert statistics._METADATA_IDS == {}
+    assert statistics._has_future_rows(sqlite_engine, 1, 300) is False
+    assert statistics._has_future_rows(sqlite_engine, 1, 100) is True
+    assert statistics._update_future_rows(sqlite_engine, 1, 100, 9.0) == 2
+    plan = sqlite_engine.db.execute(
+        "EXPLAIN QUERY PLAN SELECT 1 FROM statistics WHERE metadata_id = 1 "
+        "AND start_ts > 100 LIMIT 1"
+    ).fetchall()
+    assert "ix_statistics_statistic_id_start_ts" in plan[0][-1]
+
+
+class SqliteEngine:
+    """Engine με begin()/connect() πάνω σε sqlite3 (η text() είναι stub)."""
+
+    def __init__(self):
+        self.db = sqlite3.connect(":memory:")
+
+    @contextmanager
+    def begin(self):
+        with self.db:
+            yield self.db
+
+    @contextmanager
+    def connect(self):
+        yield self.db
+
+
+@pytest.fixture
+def sqlite_engine(monkeypatch):
+    """
+    Βάση sqlite με τους πίνακες statistics_meta/statistics, συνδεδεμένη στο
+    get_instance του statistics.
+    """
+    engine = SqliteEngine()
+    engine.db.executescript(
+        "CREATE TABLE statistics_meta (id INTEGER, statistic_id TEXT);"
+        "CREATE TABLE statistics "
+        "(metadata_id INTEGER, start_ts REAL, state REAL, sum REAL);"
+        "INSERT INTO statistics_meta VALUES "
+        "(1, 'sensor.deddie_consumption_S1'), (2, 'sensor.deddie_other_S1');"
+        "INSERT INTO statistics VALUES "
+        "(1, 100, 1, 1), (1, 200, 2, 2), (1, 300, 3, 3), (2, 300, 3, 3);"
+        # Το σύνθετο ευρετήριο του recorder
+        "CREATE UNIQUE INDEX ix_statistics_statistic_id_start_ts "
+        "ON statistics (metadata_id, start_ts);"
+    )
 
     async def fake_add_executor_job(fn, *args):
-        if getattr(fn, "__name__", "") == "close":
-            called_close["called"] = True
         return fn(*args)
 
-    fake_instance.async_add_executor_job = fake_add_executor_job
+    fake_instance = types.SimpleNamespace(
+        engine=engine,
+        async_add_executor_job=fake_add_executor_job,
+        queue_task=lambda task: task.run(fake_instance),
+    )
+    monkeypatch.setattr(statistics, "get_instance", lambda hass_arg: fake_instance)
+    return engine
+
+
+@pytest.mark.asyncio
+async def test_shift_statistics_updates_rows_in_one_statement(hass, sqlite_engine):
+    """
+    shift_statistics μετατοπίζει state/sum μόνο των εγγραφών του αισθητήρα
+    με start_ts >= from_dt.
+    """
+    engine = sqlite_engine
+    updated = await statistics.shift_statistics(
+        hass, "S1", datetime.fromtimestamp(200), 10.0, "consumption"
+    )
+    assert updated == 2
+    rows = engine.db.execute(
+        "SELECT metadata_id, start_ts, state, sum FROM statistics"
+    ).fetchall()
+    assert sorted(rows) == [
+        (1, 100, 1, 1),
+        (1, 200, 12, 12),
+        (1, 300, 13, 13),
+        (2, 300, 3, 3),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_load_and_patch_statistics(hass, sqlite_engine):
+    """
+    load_statistic_sums επιστρέφει τα sum ανά start_ts και patch_statistics
+    εφαρμόζει σωρευτικά τις διαφορές των αναθεωρημένων ωρών, με ένα UPDATE
+    σταθερών παραμέτρων ανά διάστημα.
+    """
+    engine = sqlite_engine
+    sums = await statistics.load_statistic_sums(hass, "S1", 100, 200, "consumption")
+    assert sums == {100: 1, 200: 2}
+
+    # Οι αναθεωρήσεις εφαρμόζονται με χρονολογική σειρά, ανά διάστημα
+    engine.db.execute("INSERT INTO statistics VALUES (1, 400, 4, 4)")
+    statements = []
+    engine.db.set_trace_callback(statements.append)
+    updated = await statistics.patch_statistics(
+        hass, "S1", [(300, -2.0), (200, 0.5)], "consumption"
+    )
+    engine.db.set_trace_callback(None)
+    assert updated == 3
+    updates = [sql for sql in statements if sql.startswith("UPDATE")]
+    assert len(updates) == 2
+    assert all("CASE" not in sql for sql in updates)
+    # Το metadata_id της cache, χωρίς υποερώτημα στο statistics_meta
+    assert not [sql for sql in statements if "statistics_meta" in sql]
+    rows = engine.db.execute(
+        "SELECT metadata_id, start_ts, state, sum FROM statistics"
+    ).fetchall()
+    assert sorted(rows) == [
+        (1, 100, 1, 1),
+        (1, 200, 2.5, 2.5),
+        (1, 300, 1.5, 1.5),
+        (1, 400, 2.5, 2.5),
+        (2, 300, 3, 3),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_statistics_helpers_without_metadata_id(hass, sqlite_engine):
+    """
+    Χωρίς metadata_id (ο αισθητήρας δεν έχει ακόμη statistics) δεν
+    εκτελείται κανένα ερώτημα στον πίνακα statistics.
+    """
+    statements = []
+    sqlite_engine.db.set_trace_callback(statements.append)
+    moment = datetime.fromtimestamp(0)
+    assert await statistics.shift_statistics(hass, "S9", moment, 1.0, "x") == 0
+    assert await statistics.load_statistic_sums(hass, "S9", 0, 1, "x") == {}
+    assert await statistics.patch_statistics(hass, "S9", [(0, 1.0)], "x") == 0
+    sqlite_engine.db.set_trace_callback(None)
+    assert statements and all("statistics_meta" in sql for sql in statements)
+
+
+@pytest.mark.asyncio
+async def test_future_statistics_update_runs_after_recorder_commit(
+    monkeypatch, hass, caplog
+):
+    """
+    Η διόρθωση εκτελείται αμέσως μόλις ο recorder επικυρώσει τις εισαγωγές
+    (async_block_till_done)· αν η αναμονή υπερβεί το όριο, εκτελείται με
+    προειδοποίηση.
+    """
+    order = []
+
+    async def block_till_done():
+        order.append("commit")
+
+    fake_instance = types.SimpleNamespace(async_block_till_done=block_till_done)
     monkeypatch.setattr(statistics, "get_instance", lambda hass_arg: fake_instance)
 
-    caplog.set_level("WARNING", logger="deddie_metering")
-    result = await statistics.update_future_statistics(
-        hass, "connfail", datetime.now(), 0.0, "consumption"
+    async def fake_run(h, supply, last_dt, total, type_key):
+        order.append((supply, total, type_key))
+
+    monkeypatch.setattr(statistics, "run_update_future_statistics", fake_run)
+    tasks = []
+    hass.async_create_task = lambda coro: tasks.append(asyncio.ensure_future(coro))
+    monkeypatch.setattr(statistics, "STATISTICS_CORRECTION_DEBOUNCE", 0)
+    loop = asyncio.get_running_loop()
+    monkeypatch.setattr(
+        statistics,
+        "async_call_later",
+        lambda h, delay, action: loop.call_later(delay, action, None).cancel,
     )
-    assert result == 2
-    assert called_close["called"] is True
-    # Verify warning logged for failed close
-    assert any(
-        record.levelname == "WARNING"
-        and "Σφάλμα στο κλείσιμο της σύνδεσης" in record.message
-        for record in caplog.records
+    statistics.schedule_future_statistics_update(
+        hass, "S1", datetime.now(), 5.0, "consumption", 60
     )
+    await asyncio.sleep(0.01)
+    await asyncio.gather(*tasks)
+    assert order == ["commit", ("S1", 5.0, "consumption")]
+
+    async def slow_block_till_done():
+        await asyncio.sleep(1)
+
+    fake_instance.async_block_till_done = slow_block_till_done
+    assert await statistics.async_wait_for_commit(hass, 0.01) is False
+
+    async def timed_out(h, timeout):
+        return False
+
+    monkeypatch.setattr(statistics, "async_wait_for_commit", timed_out)
+    statistics.schedule_future_statistics_update(
+        hass, "S1", datetime.now(), 6.0, "consumption", 0.01
+    )
+    await asyncio.sleep(0.01)
+    await asyncio.gather(*tasks)
+    assert order[-1] == ("S1", 6.0, "consumption")
+    assert "δεν ολοκλήρωσε την εισαγωγή" in caplog.text
+
+
+@pytest.mark.asyncio
+async def test_pending_corrections_are_coalesced_per_statistic_id(monkeypatch, hass):
+    """
+    Πολλαπλοί προγραμματισμοί για τον ίδιο αισθητήρα μέσα στο παράθυρο
+    debounce εκτελούν μία διόρθωση, με τον νεότερο στόχο.
+    """
+    timers = []
+
+    class Handle:
+        def __init__(self, delay, callback, args):
+            self.delay, self.callback, self.args = delay, callback, args
+            self.cancelled = False
+
+        def cancel(self):
+            self.cancelled = True
+
+    def call_later(hass_arg, delay, action):
+        timers.append(Handle(delay, action, (None,)))
+        return timers[-1].cancel
+
+    monkeypatch.setattr(statistics, "async_call_later", call_later)
+    runs = []
+
+    async def fake_update(h, supply, last_dt, total, type_key, timeout):
+        runs.append((supply, type_key, last_dt, total, timeout))
+
+    monkeypatch.setattr(statistics, "_async_update_after_commit", fake_update)
+    tasks = []
+    hass.async_create_task = lambda coro: tasks.append(asyncio.ensure_future(coro))
+    for hour in range(3):
+        statistics.schedule_future_statistics_update(
+            hass, "S1", datetime(2025, 4, 1, hour), float(hour), "consumption", 60
+        )
+    statistics.schedule_future_statistics_update(
+        hass, "S1", datetime(2025, 4, 1), 9.0, "production", 60
+    )
+    assert [timer.cancelled for timer in timers] == [True, True, False, False]
+    assert {timer.delay for timer in timers} == {
+        statistics.STATISTICS_CORRECTION_DEBOUNCE
+    }
+    for timer in timers:
+        if not timer.cancelled:
+            timer.callback(*timer.args)
+    await asyncio.gather(*tasks)
+    assert runs == [
+        ("S1", "consumption", datetime(2025, 4, 1, 2), 2.0, 60),
+        ("S1", "production", datetime(2025, 4, 1), 9.0, 60),
+    ]
+    assert statistics._PENDING_CORRECTIONS == {}
+
+    # Η απενεργοποίηση της παροχής ακυρώνει μόνο τις δικές της διορθώσεις
+    for supply in ("S1", "S2"):
+        statistics.schedule_future_statistics_update(
+            hass, supply, datetime(2025, 4, 2), 1.0, "consumption", 60
+        )
+    statistics.cancel_pending_corrections("S1")
+    assert [timer.cancelled for timer in timers[-2:]] == [True, False]
+    assert list(statistics._PENDING_CORRECTIONS) == ["sensor.deddie_consumption_S2"]
+    statistics.cancel_pending_corrections("S2")
+    assert statistics._PENDING_CORRECTIONS == {}
+
+
+@pytest.mark.asyncio
+async def test_batched_purge_across_supplies(monkeypatch, hass, caplog):
+    """
+    Οι αισθητήρες όλων των παροχών καθαρίζονται με μία κλήση purge_entities
+    ανά παράθυρο· όσοι δεν άλλαξαν από το τελευταίο purge παραλείπονται.
+    """
+    monkeypatch.setattr(statistics, "_PURGE_QUEUE", {})
+    monkeypatch.setattr(statistics, "_LAST_PURGED", {})
+    monkeypatch.setattr(statistics, "_PURGE_TIMER", {"cancel": None})
+    timers = []
+
+    def call_later(hass_arg, delay, action):
+        timers.append((delay, action, (None,)))
+        return lambda: timers.remove((delay, action, (None,)))
+
+    monkeypatch.setattr(statistics, "async_call_later", call_later)
+    tasks = []
+    hass.async_create_task = lambda coro: tasks.append(asyncio.ensure_future(coro))
+    service_calls = []
+
+    async def fake_call(domain, service, service_data, blocking):
+        service_calls.append((domain, service, service_data, blocking))
+
+    hass.services.async_call = fake_call
+    caplog.set_level("INFO")
+
+    async def run_window():
+        delay, callback, args = timers.pop()
+        assert delay == statistics.PURGE_COALESCE_WINDOW
+        callback(*args)
+        await asyncio.gather(*tasks)
+
+    for supply in ("111", "222"):
+        for kind in ("consumption", "production"):
+            statistics.schedule_purge(hass, f"sensor.{kind}_{supply}", supply, 1.0)
+    # Ένας timer για όλο το παράθυρο
+    assert len(timers) == 1
+    await run_window()
+    assert service_calls == [
+        (
+            "recorder",
+            "purge_entities",
+            {
+                "entity_id": [
+                    "sensor.consumption_111",
+                    "sensor.consumption_222",
+                    "sensor.production_111",
+                    "sensor.production_222",
+                ],
+                "keep_days": 0,
+            },
+            True,
+        )
+    ]
+    assert "Παροχές 111, 222: Επιτυχής διαγραφή" in caplog.text
+    # Αμετάβλητα states παραλείπονται· μόνο ο αισθητήρας που άλλαξε
+    statistics.schedule_purge(hass, "sensor.consumption_111", "111", 1.0)
+    assert timers == []
+    statistics.schedule_purge(hass, "sensor.consumption_222", "222", 2.0)
+    await run_window()
+    assert service_calls[-1][2]["entity_id"] == ["sensor.consumption_222"]
+    # Κενό παράθυρο: καμία κλήση
+    await statistics.async_purge_pending(hass)
+    assert len(service_calls) == 2
+
+    # Σε σφάλμα, οι αισθητήρες δεν σημειώνονται ως καθαρισμένοι
+    async def failing_call(domain, service, service_data, blocking):
+        raise Exception("fail")
+
+    hass.services.async_call = failing_call
+    statistics.schedule_purge(hass, "sensor.consumption_111", "111", 3.0)
+    await run_window()
+    assert "Σφάλμα κατά τη διαγραφή των flat state" in caplog.text
+    assert statistics._LAST_PURGED["sensor.consumption_111"] == ("111", 1.0)
+
+    # Με την απενεργοποίηση της παροχής ξεχνιούνται τα states του purge της
+    statistics.forget_purged_states("111")
+    assert statistics._LAST_PURGED == {
+        "sensor.consumption_222": ("222", 2.0),
+        "sensor.production_222": ("222", 1.0),
+    }
+    statistics.schedule_purge(hass, "sensor.production_111", "111", 1.0)
+    assert statistics._PURGE_QUEUE == {"sensor.production_111": ("111", 1.0)}
+    statistics.cancel_purge()
+
+    # Η απενεργοποίηση της τελευταίας καταχώρησης ακυρώνει το παράθυρο
+    statistics.schedule_purge(hass, "sensor.consumption_111", "111", 4.0)
+    assert len(timers) == 1
+    statistics.cancel_purge()
+    assert timers == [] and statistics._PURGE_QUEUE == {}
+    statistics.cancel_purge()
+    assert statistics._PURGE_TIMER == {"cancel": None}
@@ -1,3 +1,5 @@
+import asyncio
+import copy
 import pytest
 import datetime
 import deddie_metering.helpers.storage as storage_mod
@@ -15,11 +17,18 @@ def dummy_storage(monkeypatch):
             self.key = key
 
         async def async_load(self):
+            await asyncio.sleep(0)
             return storage.get(self.key)
 
         async def async_save(self, data):
             storage[self.key] = data
 
+        def async_delay_save(self, data_func, delay):
+            storage[self.key] = data_func()
+
+        async def async_remove(self):
+            storage.pop(self.key, None)
+
     # Patch the Store used in storage_mod
     monkeypatch.setattr(storage_mod, "Store", DummyStore)
     # Patch parse_datetime for load_last_update tests
@@ -31,14 +40,21 @@ def dummy_storage(monkeypatch):
     return storage
 
 
+def shard_file(supply):
+    return f"{storage_mod.DOMAIN}_state_{supply}.json"
+
+
+def state_record(storage, supply, key="active"):
+    return storage[shard_file(supply)][key]
+
+
 @pytest.mark.asyncio
 async def test_save_and_load_last_total(dummy_storage, hass):
     supply = "123456789"
     # Save a total value
     await storage_mod.save_last_total(hass, supply, 100.5)
-    key = f"{storage_mod.DOMAIN}_last_total.json"
     # Verify underlying storage
-    assert dummy_storage[key] == {f"active_total_{supply}": 100.5}
+    assert dummy_storage[shard_file(supply)] == {"active": {"total": 100.5}}
     # Load and verify
     result = await storage_mod.load_last_total(hass, supply)
     assert result == 100.5
@@ -59,9 +75,8 @@ async def test_save_and_load_last_update(dummy_storage, hass):
     now = datetime.datetime.now()
     # Save the timestamp
     await storage_mod.save_last_update(hass, supply, now)
-    key = f"{storage_mod.DOMAIN}_last_update.json"
     # Verify underlying storage
-    assert dummy_storage[key] == {f"last_update_active_{supply}": now.isoformat()}
+    assert state_record(dummy_storage, supply) == {"last_update": now.isoformat()}
     # Load and verify
     result = await storage_mod.load_last_update(hass, supply)
     assert result == now
@@ -81,11 +96,355 @@ async def test_save_and_load_initial_jump_flag(dummy_storage, hass):
     supply = "123456789"
     # Save the flag
     await storage_mod.save_initial_jump_flag(hass, supply, True)
-    key = f"{storage_mod.DOMAIN}_initial_jump.json"
     # Verify underlying storage
-    assert dummy_storage[key] == {f"jump_active_{supply}": True}
+    assert state_record(dummy_storage, supply) == {"jump": True}
     # Load and verify
     result = await storage_mod.load_initial_jump_flag(hass, supply)
     assert result is True
     result2 = await storage_mod.load_initial_jump_flag(hass, supply, key="injected")
     assert result2 is False
+
+
+@pytest.mark.asyncio
+async def test_commit_load_and_clear_checkpoint(dummy_storage, hass):
+    supply = "123456789"
+    start = datetime.datetime(2020, 1, 1)
+    cursor = datetime.datetime(2021, 1, 1)
+    last = datetime.datetime(2020, 12, 31, 1, 0)
+    # No checkpoint yet
+    assert await storage_mod.load_checkpoint(hass, supply) is None
+    await storage_mod.commit_progress(
+        hass, supply, 42.5, last, start_dt=start, cursor_dt=cursor
+    )
+    assert state_record(dummy_storage, supply)["checkpoint"] == {
+        "start": start.isoformat(),
+        "cursor": cursor.isoformat(),
+        "last_update": last.isoformat(),
+        "total": 42.5,
+    }
+    result = await storage_mod.load_checkpoint(hass, supply)
+    assert result["total"] == 42.5
+    assert await storage_mod.load_checkpoint(hass, supply, key="produced") is None
+    # Clear: μόνο το checkpoint αφαιρείται, ενώ clear χωρίς checkpoint δεν
+    # αποτυγχάνει
+    await storage_mod.clear_checkpoint(hass, supply)
+    assert state_record(dummy_storage, supply) == {
+        "total": 42.5,
+        "last_update": last.isoformat(),
+    }
+    await storage_mod.clear_checkpoint(hass, supply)
+    assert await storage_mod.load_checkpoint(hass, supply) is None
+
+
+@pytest.mark.asyncio
+async def test_save_load_and_clear_confirmed_until(dummy_storage, hass):
+    supply = "123456789"
+    confirmed = datetime.datetime(2025, 4, 10, 1, 0)
+    assert await storage_mod.load_confirmed_until(hass, supply) is None
+    # Διαγραφή χωρίς αποθηκευμένη τιμή δεν γράφει στο store
+    await storage_mod.save_confirmed_until(hass, supply, None)
+    assert dummy_storage[shard_file(supply)] == {}
+    await storage_mod.save_confirmed_until(hass, supply, confirmed)
+    assert state_record(dummy_storage, supply) == {"confirmed": confirmed.isoformat()}
+    assert await storage_mod.load_confirmed_until(hass, supply) == confirmed
+    assert await storage_mod.load_confirmed_until(hass, supply, key="produced") is None
+    await storage_mod.save_confirmed_until(hass, supply, None)
+    assert state_record(dummy_storage, supply) == {}
+
+
+@pytest.mark.asyncio
+async def test_save_and_load_revision_scan(dummy_storage, hass):
+    """Ο χρόνος επανελέγχου αναθεωρήσεων αποθηκεύεται στην εγγραφή της κλάσης."""
+    supply = "123456789"
+    scanned = datetime.datetime(2025, 4, 22, 12, 0)
+    assert await storage_mod.load_revision_scan(hass, supply) is None
+    await storage_mod.save_revision_scan(hass, supply, scanned)
+    assert state_record(dummy_storage, supply) == {"revision_scan": scanned.isoformat()}
+    assert await storage_mod.load_revision_scan(hass, supply) == scanned
+    assert await storage_mod.load_revision_scan(hass, supply, key="produced") is None
+
+
+@pytest.mark.asyncio
+async def test_store_cache_serves_reads_from_memory(monkeypatch, hass):
+    loads = []
+    saved = {}
+
+    class CountingStore:
+        def __init__(self, hass, version, key):
+            self.key = key
+
+        async def async_load(self):
+            loads.append(self.key)
+            return {"active": {"total": 5.0}}
+
+        async def async_save(self, data):
+            saved[self.key] = dict(data)
+
+        def async_delay_save(self, data_func, delay):
+            saved[self.key] = dict(data_func())
+
+    monkeypatch.setattr(storage_mod, "Store", CountingStore)
+    # Επαναλαμβανόμενες αναγνώσεις: μία μόνο φόρτωση του αρχείου
+    for _ in range(3):
+        assert await storage_mod.load_last_total(hass, "123") == 5.0
+    assert loads == [shard_file("123")]
+    # Η εγγραφή ενημερώνει μνήμη και αρχείο (write-through)
+    await storage_mod.save_last_total(hass, "123", 7.5)
+    assert await storage_mod.load_last_total(hass, "123") == 7.5
+    assert saved[shard_file("123")] == {"active": {"total": 7.5}}
+    assert len(loads) == 1
+    # Μετά το reset η ανάγνωση γίνεται ξανά από το αρχείο
+    storage_mod.reset_store_cache()
+    assert await storage_mod.load_last_total(hass, "123") == 5.0
+    assert len(loads) == 2
+
+
+@pytest.mark.asyncio
+async def test_delayed_saves_are_coalesced_and_flushed(monkeypatch, hass):
+    writes = []
+    scheduled = {}
+
+    class DelayStore:
+        def __init__(self, hass, version, key):
+            self.key = key
+
+        async def async_load(self):
+            return None
+
+        async def async_save(self, data):
+            scheduled.pop(self.key, None)
+            writes.append((self.key, dict(data)))
+
+        def async_delay_save(self, data_func, delay):
+            assert delay == storage_mod.STORAGE_SAVE_DELAY
+            scheduled[self.key] = data_func
+
+        async def async_remove(self):
+            pass
+
+    monkeypatch.setattr(storage_mod, "Store", DelayStore)
+    update = datetime.datetime(2025, 4, 21, 23, 0)
+    for key in ("active", "produced", "injected"):
+        await storage_mod.save_last_total(hass, "123", 1.0, key=key)
+        await storage_mod.save_last_update(hass, "123", update, key=key)
+    # Μόνο η αρχική εγγραφή της μετάπτωσης· οι υπόλοιπες συγχωνεύονται
+    shard = shard_file("123")
+    assert [name for name, _ in writes] == [shard]
+    assert list(scheduled) == [shard]
+    assert await storage_mod.load_last_total(hass, "123", key="injected") == 1.0
+    # Η καθυστερημένη εγγραφή γράφει τα τρέχοντα δεδομένα μία φορά
+    record = {"total": 1.0, "last_update": update.isoformat()}
+    assert scheduled.pop(shard)() == {
+        k: record for k in ("active", "produced", "injected")
+    }
+    # Το flush γράφει μόνο ό,τι εκκρεμεί
+    await storage_mod.async_flush_stores()
+    assert len(writes) == 1
+    await storage_mod.save_initial_jump_flag(hass, "123", True)
+    await storage_mod.async_flush_stores()
+    assert len(writes) == 2 and shard not in scheduled
+    # Με delay=False το last_total γράφεται άμεσα
+    await storage_mod.save_last_total(hass, "123", 4.0, delay=False)
+    assert len(writes) == 3 and shard not in scheduled
+    assert writes[-1][1]["active"]["total"] == 4.0
+
+
+@pytest.mark.asyncio
+async def test_each_supply_writes_only_its_shard(dummy_storage, hass):
+    await storage_mod.save_last_total(hass, "111", 1.0)
+    await storage_mod.save_last_total(hass, "222", 2.0)
+    assert dummy_storage == {
+        shard_file("111"): {"active": {"total": 1.0}},
+        shard_file("222"): {"active": {"total": 2.0}},
+    }
+    await storage_mod.save_last_total(hass, "222", 3.0)
+    assert dummy_storage[shard_file("111")] == {"active": {"total": 1.0}}
+    assert await storage_mod.load_last_total(hass, "222") == 3.0
+
+
+@pytest.mark.asyncio
+async def test_legacy_files_are_migrated_to_shards(dummy_storage, hass):
+    domain = storage_mod.DOMAIN
+    dummy_storage[f"{domain}_last_total.json"] = {
+        "total_111": 10.0,
+        "active_total_111": 12.0,
+        "produced_total_111": 3.0,
+        "total_222": 7.0,
+    }
+    dummy_storage[f"{domain}_last_update.json"] = {
+        "last_update_111": "2025-04-20T01:00:00",
+        "last_update_pv_detection_111": "2025-04-21T12:00:00",
+    }
+    dummy_storage[f"{domain}_initial_jump.json"] = {
+        "jump_active_111": True,
+        "jump_222": True,
+    }
+    dummy_storage[f"{domain}_checkpoint.json"] = {"checkpoint_111": {}}
+    assert await storage_mod.load_last_total(hass, "111") == 12.0
+    # Με το πρώτο shard δημιουργούνται τα shards όλων των παροχών
+    assert dummy_storage[shard_file("111")] == {
+        "active": {
+            "total": 12.0,
+            "last_update": "2025-04-20T01:00:00",
+            "jump": True,
+        },
+        "produced": {"total": 3.0},
+        "pv_detection": {"last_update": "2025-04-21T12:00:00"},
+    }
+    assert dummy_storage[shard_file("222")] == {"active": {"total": 7.0, "jump": True}}
+    # Τα παλιά αρχεία διαγράφονται· άλλα αρχεία δεν μεταπίπτουν ούτε αγγίζονται
+    assert sorted(dummy_storage) == [
+        f"{domain}_checkpoint.json",
+        shard_file("111"),
+        shard_file("222"),
+    ]
+    assert await storage_mod.load_last_update(
+        hass, "111", key="pv_detection"
+    ) == datetime.datetime(2025, 4, 21, 12, 0)
+    assert await storage_mod.load_initial_jump_flag(hass, "222") is True
+    # Μετά από επανεκκίνηση φορτώνονται απευθείας τα shards
+    storage_mod.reset_store_cache()
+    dummy_storage[f"{domain}_last_total.json"] = {"active_total_111": 99.0}
+    assert await storage_mod.load_last_total(hass, "111") == 12.0
+
+
+@pytest.mark.asyncio
+async def test_migration_keeps_existing_shards(dummy_storage, hass):
+    dummy_storage[f"{storage_mod.DOMAIN}_last_total.json"] = {
+        "active_total_111": 5.0,
+        "active_total_222": 6.0,
+    }
+    # Ένα shard που ήδη υπάρχει δεν αντικαθίσταται
+    dummy_storage[shard_file("222")] = {"active": {"total": 8.0}}
+    assert await storage_mod.load_last_total(hass, "333") is None
+    assert f"{storage_mod.DOMAIN}_last_total.json" not in dummy_storage
+    assert dummy_storage[shard_file("333")] == {}
+    assert await storage_mod.load_last_total(hass, "111") == 5.0
+    assert await storage_mod.load_last_total(hass, "222") == 8.0
+
+
+@pytest.mark.asyncio
+async def test_concurrent_shard_loads_migrate_once(dummy_storage, hass):
+    domain = storage_mod.DOMAIN
+    dummy_storage[f"{domain}_last_total.json"] = {
+        "active_total_111": 1.0,
+        "active_total_222": 2.0,
+    }
+    totals = await asyncio.gather(
+        storage_mod.load_last_total(hass, "111"),
+        storage_mod.load_last_total(hass, "222"),
+    )
+    assert totals == [1.0, 2.0]
+    assert sorted(dummy_storage) == [shard_file("111"), shard_file("222")]
+
+
+@pytest.mark.asyncio
+async def test_commit_progress_writes_total_update_and_checkpoint_together(
+    monkeypatch, hass
+):
+    writes = []
+    scheduled = {}
+
+    class RecordingStore:
+        def __init__(self, hass, version, key):
+            self.key = key
+
+        async def async_load(self):
+            return {} if self.key == shard_file("123") else None
+
+        async def async_save(self, data):
+            writes.append(copy.deepcopy(data))
+
+        def async_delay_save(self, data_func, delay):
+            scheduled[self.key] = data_func
+
+    monkeypatch.setattr(storage_mod, "Store", RecordingStore)
+    start = datetime.datetime(2024, 1, 1)
+    cursor = datetime.datetime(2025, 1, 1)
+    last = datetime.datetime(2024, 12, 31, 1, 0)
+    # Με checkpoint: μία άμεση εγγραφή με όλα τα πεδία
+    await storage_mod.commit_progress(
+        hass, "123", 42.5, last, start_dt=start, cursor_dt=cursor
+    )
+    assert writes == [
+        {
+            "active": {
+                "total": 42.5,
+                "last_update": last.isoformat(),
+                "checkpoint": {
+                    "start": start.isoformat(),
+                    "cursor": cursor.isoformat(),
+                    "last_update": last.isoformat(),
+                    "total": 42.5,
+                },
+            }
+        }
+    ]
+    # Χωρίς checkpoint: total και last_update σε μία συγχωνευμένη εγγραφή
+    later = datetime.datetime(2025, 1, 2, 1, 0)
+    await storage_mod.commit_progress(hass, "123", 50.0, later, key="produced")
+    assert len(writes) == 1
+    assert scheduled[shard_file("123")]()["produced"] == {
+        "total": 50.0,
+        "last_update": later.isoformat(),
+    }
+
+
+@pytest.mark.asyncio
+async def test_preload_reads_each_shard_once(monkeypatch, hass):
+    loads = []
+
+    class CountingStore:
+        def __init__(self, hass, version, key):
+            self.key = key
+
+        async def async_load(self):
+            loads.append(self.key)
+            return {"active": {"total": 1.0, "jump": True}}
+
+    monkeypatch.setattr(storage_mod, "Store", CountingStore)
+    await storage_mod.async_preload_stores(hass, ["111", "222"])
+    assert sorted(loads) == [shard_file("111"), shard_file("222")]
+    # Οι αναγνώσεις της εκκίνησης εξυπηρετούνται από τη μνήμη
+    for supply in ("111", "222"):
+        for key in ("active", "produced", "injected"):
+            await storage_mod.load_initial_jump_flag(hass, supply, key=key)
+        await storage_mod.load_last_total(hass, supply)
+    assert len(loads) == 2
+
+
+@pytest.mark.asyncio
+async def test_storage_stats_count_calls_bytes_and_cache_hits(dummy_storage, hass):
+    storage_mod.reset_storage_stats()
+    stats = storage_mod.storage_stats()
+    assert stats["operations"] == {}
+    assert stats["cache"] == {"hits": 0, "misses": 0, "hit_ratio": None}
+    dummy_storage[shard_file("111")] = {"active": {"total": 1.0}}
+    # Πολλές αναγνώσεις ανά παροχή: μία μόνο ανάγνωση αρχείου ανά shard
+    for supply in ("111", "222"):
+        for _ in range(5):
+            await storage_mod.load_last_total(hass, supply)
+    await storage_mod.save_last_total(hass, "111", 2.0)
+    day = datetime.datetime(2025, 4, 1)
+    await storage_mod.commit_progress(
+        hass, "111", 2.0, day, start_dt=day, cursor_dt=day
+    )
+    stats = storage_mod.storage_stats()
+    operations = stats["operations"]
+    assert operations["load_last_total"]["calls"] == 10
+    assert operations["load_last_total"]["p95_ms"] >= (
+        operations["load_last_total"]["p50_ms"]
+    )
+    assert operations["file_load"]["calls"] == 2
+    assert operations["file_load"]["bytes"] == len('{"active": {"total": 1.0}}')
+    # Η μετάπτωση του 222 και το checkpoint γράφονται άμεσα, το total με καθυστέρηση
+    assert operations["file_save"]["calls"] == 2
+    assert operations["file_delay_save"]["calls"] == 1
+    assert operations["file_delay_save"]["bytes"] > 0
+    assert operations["file_delay_save"]["p50_ms"] is None
+    assert stats["cache"] == {"hits": 10, "misses": 2, "hit_ratio": 0.8333}
+    assert stats["stores"] == 2
+    # Ταυτόχρονες αναγνώσεις νέου shard: μία ανάγνωση αρχείου, οι άλλες hits
+    await asyncio.gather(*(storage_mod.load_last_total(hass, "333") for _ in "ab"))
+    assert storage_mod.storage_stats()["cache"]["hits"] == 11
+    assert storage_mod.storage_stats()["operations"]["file_load"]["calls"] == 3
@@ -116,6 +116,7 @@ async def test_system_health_info_single_entry():
     assert info.get("token") is True
     assert info.get("has_pv") is False
     assert info.get("last_update") == "26/05/2025 00:00"
+    assert info.get("loop_lag").endswith(" ms")
 
     # Validate no unexpected keys are present
     expected_keys = {
@@ -126,5 +127,6 @@ async def test_system_health_info_single_entry():
         "token",
         "has_pv",
         "last_update",
+        "loop_lag",
     }
     assert set(info.keys()) == expected_keys
@@ -54,8 +54,7 @@ async def test_fetch_since_empty_curves(monkeypatch, fake_hass):
     monkeypatch.setattr(utils, "get_data_from_api", AsyncMock(return_value=[]))
     flags = {"update": False, "total": False}
 
-    monkeypatch.setattr(utils, "save_last_update", flags["update"] is True)
-    monkeypatch.setattr(utils, "save_last_total", flags["total"] is True)
+    monkeypatch.setattr(utils, "commit_progress", flags["update"] is True)
     await fetch_since(
         fake_hass,
         "tok",
@@ -76,10 +75,8 @@ async def test_fetch_since_exception_handled(monkeypatch, fake_hass):
         "get_data_from_api",
         AsyncMock(side_effect=Exception("err")),
     )
-    save_update = AsyncMock()
-    save_total = AsyncMock()
-    monkeypatch.setattr(utils, "save_last_update", save_update)
-    monkeypatch.setattr(utils, "save_last_total", save_total)
+    commit = AsyncMock()
+    monkeypatch.setattr(utils, "commit_progress", commit)
     await fetch_since(
         fake_hass,
         "tok",
@@ -90,8 +87,7 @@ async def test_fetch_since_exception_handled(monkeypatch, fake_hass):
         "ctx",
         0,
     )
-    assert not save_update.called
-    assert not save_total.called
+    assert not commit.called
 
 
 @pytest.mark.asyncio
@@ -107,14 +103,13 @@ async def test_fetch_since_success(monkeypatch, fake_hass):
     )
     saved = {"update": last_valid, "total": total}
 
-    async def fake_save_update(h, s, dt, key=None):
+    async def fake_commit(h, s, t, dt, key=None, **kwargs):
         saved["update"] = dt
-
-    async def fake_save_total(h, s, t, key=None):
         saved["total"] = t
 
-    monkeypatch.setattr(utils, "save_last_update", fake_save_update)
-    monkeypatch.setattr(utils, "save_last_total", fake_save_total)
+    monkeypatch.setattr(utils, "commit_progress", fake_commit)
+    schedule = MagicMock()
+    monkeypatch.setattr(utils, "schedule_future_statistics_update", schedule)
     await fetch_since(
         fake_hass,
         "tok",
@@ -127,6 +122,10 @@ async def test_fetch_since_success(monkeypatch, fake_hass):
     )
     assert saved["update"] == last_valid
     assert saved["total"] == total
+    # Διόρθωση μετά το commit των στατιστικών, με μέγιστη αναμονή stats_delay
+    schedule.assert_called_once_with(
+        fake_hass, "sup", last_valid - timedelta(hours=1), total, "consumption", 60
+    )
 
     # Δοκιμή για παραγωγή (ATTR_PRODUCTION)
     saved.clear()
@@ -193,15 +192,14 @@ async def test_batch_fetch_single_batch(monkeypatch, fake_hass):
     )
     saved = {"update": None, "total": None}
 
-    async def fake_save_update(h, s, dt, key=None):
+    async def fake_commit(h, s, t, dt, key=None, **kwargs):
         saved["update"] = dt
-
-    async def fake_save_total(h, s, t, key=None):
         saved["total"] = t
 
-    monkeypatch.setattr(utils, "save_last_update", fake_save_update)
-    monkeypatch.setattr(utils, "save_last_total", fake_save_total)
+    monkeypatch.setattr(utils, "commit_progress", fake_commit)
     monkeypatch.setattr(utils, "load_last_total", AsyncMock(return_value=10.0))
+    schedule = MagicMock()
+    monkeypatch.setattr(utils, "schedule_future_statistics_update", schedule)
     await batch_fetch(
         fake_hass,
         "tok",
@@ -214,6 +212,9 @@ async def test_batch_fetch_single_batch(monkeypatch, fake_hass):
     )
     assert saved["update"] == last_valid
     assert saved["total"] == new_total
+    schedule.assert_called_once_with(
+        fake_hass, "sup", last_valid - timedelta(hours=1), new_total, "consumption", 60
+    )
 
     # Δοκιμή για παραγωγή (ATTR_PRODUCTION)
     saved.clear()
@@ -304,13 +305,11 @@ async def test_batch_fetch_no_records(monkeypatch, fake_hass):
 
     monkeypatch.setattr(utils, "get_data_from_api", AsyncMock(return_value=[]))
     pi = AsyncMock()
-    su = AsyncMock()
-    st = AsyncMock()
-    ru = AsyncMock()
+    commit = AsyncMock()
+    ru = MagicMock()
     monkeypatch.setattr(utils, "process_and_insert", pi)
-    monkeypatch.setattr(utils, "save_last_update", su)
-    monkeypatch.setattr(utils, "save_last_total", st)
-    monkeypatch.setattr(utils, "run_update_future_statistics", ru)
+    monkeypatch.setattr(utils, "commit_progress", commit)
+    monkeypatch.setattr(utils, "schedule_future_statistics_update", ru)
 
     await batch_fetch(
         fake_hass,
@@ -324,9 +323,8 @@ async def test_batch_fetch_no_records(monkeypatch, fake_hass):
     )
 
     pi.assert_not_awaited()
-    su.assert_not_awaited()
-    st.assert_not_awaited()
-    ru.assert_not_awaited()
+    commit.assert_not_awaited()
+    ru.assert_not_called()
 
 
 @pytest.mark.asyncio
@@ -439,8 +437,8 @@ async def test_batch_fetch_first_date_parse_error(monkeypatch, fake_hass, caplog
         utils, "process_and_insert", AsyncMock(return_value=(1, 1.0, fake_last))
     )
     # Stub save_last_* so no errors
-    monkeypatch.setattr(utils, "save_last_update", AsyncMock())
-    monkeypatch.setattr(utils, "save_last_total", AsyncMock())
+    monkeypatch.setattr(utils, "commit_progress", AsyncMock())
+    monkeypatch.setattr(utils, "schedule_future_statistics_update", MagicMock())
 
     # Run a single‐day batch
     start = datetime(2025, 3, 1)
@@ -468,17 +466,15 @@ async def test_fetch_since_first_date_parse_error(monkeypatch, fake_hass, caplog
         "process_and_insert",
         AsyncMock(return_value=(1, 2.0, last_valid)),
     )
-    # Stub out save_last_update and save_last_total
+    # Stub out commit_progress
     saved = {"u": None, "t": None}
 
-    async def fake_save_update(h, s, dt, key=None):
+    async def fake_commit(h, s, t, dt, key=None, **kwargs):
         saved["u"] = dt
-
-    async def fake_save_total(h, s, t, key=None):
         saved["t"] = t
 
-    monkeypatch.setattr(utils, "save_last_update", fake_save_update)
-    monkeypatch.setattr(utils, "save_last_total", fake_save_total)
+    monkeypatch.setattr(utils, "commit_progress", fake_commit)
+    monkeypatch.setattr(utils, "schedule_future_statistics_update", MagicMock())
 
     # Run fetch_since
     start = datetime(2025, 4, 1)
@@ -542,3 +538,856 @@ async def test_process_and_insert_display_names(monkeypatch, fake_hass):
     assert f"Κατανάλωση ΔΕΔΔΗΕ {supply}" in names
     assert f"Παραγωγή ΔΕΔΔΗΕ {supply}" in names
     assert f"Έγχυση ΔΕΔΔΗΕ {supply}" in names
+
+
+@pytest.mark.asyncio
+async def test_batch_fetch_saves_checkpoint_per_window(monkeypatch, fake_hass):
+    """
+    Κάθε παράθυρο με έγκυρες εγγραφές αποθηκεύει ατομικά last_update,
+    last_total και checkpoint με τον δείκτη του επόμενου παραθύρου.
+    """
+    curves = [{"meterDate": "01/01/2023 01:00", "consumption": "1"}]
+    monkeypatch.setattr(utils, "get_data_from_api", AsyncMock(return_value=curves))
+    lasts = [datetime(2023, 12, 31, 0, 0), datetime(2024, 6, 1, 0, 0)]
+    monkeypatch.setattr(
+        utils,
+        "process_and_insert",
+        AsyncMock(side_effect=[(24, 10.0, lasts[0]), (24, 20.0, lasts[1])]),
+    )
+    monkeypatch.setattr(utils, "load_last_total", AsyncMock(return_value=None))
+    monkeypatch.setattr(utils, "load_checkpoint", AsyncMock(return_value=None))
+    commit = AsyncMock()
+    monkeypatch.setattr(utils, "commit_progress", commit)
+    monkeypatch.setattr(utils, "schedule_future_statistics_update", MagicMock())
+
+    start = datetime(2023, 1, 1)
+    end = datetime(2024, 6, 1)
+    await batch_fetch(fake_hass, "tok", "sup", "tax", start, end, "CTX", 0)
+
+    assert commit.await_count == 2
+    first, second = commit.await_args_list
+    assert first.args[2:] == (10.0, lasts[0])
+    assert first.kwargs["start_dt"] == start
+    assert first.kwargs["cursor_dt"] == start + timedelta(days=365)
+    assert second.args[2:] == (20.0, lasts[1])
+
+
+@pytest.mark.asyncio
+async def test_batch_fetch_resumes_from_checkpoint(monkeypatch, fake_hass):
+    """
+    Checkpoint της ίδιας διαδικασίας (ίδιο start_dt): η λήψη συνεχίζει από
+    τον δείκτη του checkpoint με το αποθηκευμένο συσσωρευμένο σύνολο.
+    """
+    start = datetime(2020, 1, 1)
+    cursor = datetime(2024, 1, 1)
+    checkpoint = {
+        "start": start.isoformat(),
+        "cursor": cursor.isoformat(),
+        "last_update": datetime(2024, 1, 1, 0, 0).isoformat(),
+        "total": 500.0,
+    }
+    monkeypatch.setattr(utils, "load_checkpoint", AsyncMock(return_value=checkpoint))
+    monkeypatch.setattr(utils, "load_last_total", AsyncMock(return_value=1.0))
+    api = AsyncMock(return_value=[{"meterDate": "02/01/2024 01:00"}])
+    monkeypatch.setattr(utils, "get_data_from_api", api)
+    pi = AsyncMock(return_value=(24, 524.0, datetime(2024, 1, 3, 0, 0)))
+    monkeypatch.setattr(utils, "process_and_insert", pi)
+    monkeypatch.setattr(utils, "commit_progress", AsyncMock())
+    monkeypatch.setattr(utils, "schedule_future_statistics_update", MagicMock())
+
+    await batch_fetch(
+        fake_hass, "tok", "sup", "tax", start, datetime(2024, 1, 3), "CTX", 0
+    )
+
+    # Μία μόνο κλήση API, από τον δείκτη του checkpoint
+    api.assert_awaited_once()
+    assert api.await_args.args[4] == cursor
+    # Η επεξεργασία ξεκινά από το σύνολο του checkpoint
+    assert pi.await_args.args[3] == 500.0
+
+
+@pytest.mark.asyncio
+async def test_batch_fetch_ignores_foreign_checkpoint(monkeypatch, fake_hass):
+    """Checkpoint άλλης διαδικασίας (διαφορετικό start_dt) αγνοείται."""
+    checkpoint = {
+        "start": datetime(2019, 1, 1).isoformat(),
+        "cursor": datetime(2024, 1, 1).isoformat(),
+        "last_update": datetime(2024, 1, 1).isoformat(),
+        "total": 500.0,
+    }
+    monkeypatch.setattr(utils, "load_checkpoint", AsyncMock(return_value=checkpoint))
+    monkeypatch.setattr(utils, "load_last_total", AsyncMock(return_value=1.0))
+    api = AsyncMock(return_value=[])
+    monkeypatch.setattr(utils, "get_data_from_api", api)
+
+    start = datetime(2023, 12, 1)
+    await batch_fetch(
+        fake_hass, "tok", "sup", "tax", start, datetime(2024, 1, 3), "CTX", 0
+    )
+    assert api.await_args.args[4] == start
+
+
+def _raw_day(base, value="1"):
+    import json
+
+    records = [
+        {
+            "meterDate": (base + timedelta(hours=i)).strftime("%d/%m/%Y %H:%M"),
+            "consumption": value,
+        }
+        for i in range(1, 25)
+    ]
+    return json.dumps({"curves": records}).encode()
+
+
+@pytest.mark.asyncio
+async def test_process_and_insert_raw_bytes_inline(monkeypatch, fake_hass):
+    """
+    Ακατέργαστη απόκριση κάτω από το όριο offload_min_bytes επεξεργάζεται
+    inline, ακόμη και με ενεργό το process_offload.
+    """
+    pool = MagicMock(side_effect=AssertionError("process pool used"))
+    monkeypatch.setattr(utils, "get_process_pool", pool)
+    captured = []
+    monkeypatch.setattr(
+        utils, "async_import_statistics", lambda _h, _m, dl: captured.extend(dl)
+    )
+    base = datetime(2025, 5, 1)
+    count, total, last = await process_and_insert(
+        fake_hass,
+        _raw_day(base),
+        "SUP",
+        0.0,
+        "consumption",
+        {utils.CONF_PROCESS_OFFLOAD: True},
+    )
+    assert count == 24
+    assert total == 24.0
+    assert last == base + timedelta(days=1)
+    assert len(captured) == 24
+
+
+@pytest.mark.asyncio
+async def test_process_and_insert_offloads_large_payload(monkeypatch, fake_hass):
+    """Με process_offload και μεγάλη απόκριση, η επεξεργασία γίνεται στο pool."""
+    from concurrent.futures import ThreadPoolExecutor
+
+    executor = ThreadPoolExecutor(max_workers=1)
+    monkeypatch.setattr(utils, "get_process_pool", lambda: executor)
+    fake_hass.loop.run_in_executor = asyncio.get_running_loop().run_in_executor
+    submitted = []
+    original = utils.decode_and_accumulate
+
+    def spy(raw, supply, total, tz_name, policy):
+        submitted.append(len(raw))
+        return original(raw, supply, total, tz_name, policy)
+
+    monkeypatch.setattr(utils, "decode_and_accumulate", spy)
+    monkeypatch.setattr(utils, "async_import_statistics", lambda *_a: None)
+    raw = _raw_day(datetime(2025, 5, 1))
+    options = {utils.CONF_PROCESS_OFFLOAD: True, utils.CONF_OFFLOAD_MIN_BYTES: 10}
+    count, total, _ = await process_and_insert(
+        fake_hass, raw, "SUP", 5.0, "consumption", options
+    )
+    executor.shutdown()
+    assert submitted == [len(raw)]
+    assert count == 24
+    assert total == 29.0
+
+
+def test_process_pool_lifecycle():
+    """Το process pool δημιουργείται μία φορά και τερματίζεται."""
+    utils.shutdown_process_pool()
+    pool = utils.get_process_pool()
+    assert utils.get_process_pool() is pool
+    utils.shutdown_process_pool()
+    assert utils._PROCESS_POOL is None
+    # Δεύτερος τερματισμός χωρίς pool δεν αποτυγχάνει
+    utils.shutdown_process_pool()
+
+
+def test_process_pool_worker_runs_without_the_integration():
+    """
+    Πραγματικό spawn worker: η επεξεργασία στο pool δίνει το ίδιο αποτέλεσμα
+    με την inline, χωρίς να φορτώνεται η ενσωμάτωση ή το Home Assistant.
+    """
+    utils.shutdown_process_pool()
+    pool = utils.get_process_pool()
+    raw = _raw_day(datetime(2025, 5, 1), value="0.5")
+    policy = utils.validation_policy("consumption")
+    try:
+        result = pool.submit(
+            utils.decode_and_accumulate, raw, "SUP", 5.0, None, policy
+        ).result(timeout=60)
+        loaded = pool.submit(eval, "sorted(__import__('sys').modules)").result(
+            timeout=60
+        )
+    finally:
+        utils.shutdown_process_pool()
+    assert result == utils.decode_and_accumulate(raw, "SUP", 5.0, None, policy)
+    assert result[4] == 17.0
+    assert "deddie_metering.helpers.parsing" in loaded
+    assert [
+        name
+        for name in loaded
+        if name.startswith("homeassistant")
+        or name in ("deddie_metering.const", "deddie_metering.coordinator")
+    ] == []
+
+
+def test_worker_bootstrap_registers_package(tmp_path):
+    """Το helpers.worker καταχωρεί το πακέτο χωρίς να εκτελέσει το __init__."""
+    import runpy
+    import sys
+    from deddie_metering.helpers import worker
+
+    (tmp_path / "__init__.py").write_text("raise RuntimeError('loaded')")
+    runpy.run_path(
+        worker.__file__,
+        {"PACKAGE": "deddie_worker_pkg", "PACKAGE_PATH": str(tmp_path)},
+    )
+    try:
+        assert sys.modules["deddie_worker_pkg"].__path__ == [str(tmp_path)]
+        # Ήδη καταχωρημένο πακέτο δεν αντικαθίσταται
+        worker.register_package("deddie_worker_pkg", "other")
+        assert sys.modules["deddie_worker_pkg"].__path__ == [str(tmp_path)]
+    finally:
+        del sys.modules["deddie_worker_pkg"]
+
+
+def test_first_meter_date_raw_and_list():
+    assert utils._first_meter_date([]) is None
+    assert utils._first_meter_date([{"meterDate": "x"}]) == "x"
+    raw = _raw_day(datetime(2025, 5, 1))
+    assert utils._first_meter_date(raw) == "01/05/2025 01:00"
+    assert utils._first_meter_date(b'{"curves": []}') is None
+    with pytest.raises(Exception, match="boom"):
+        utils._first_meter_date(b'{"error": "boom"}')
+
+
+@pytest.mark.asyncio
+async def test_fetch_since_offload_requests_raw(monkeypatch, fake_hass):
+    """Με process_offload, το fetch_since ζητά raw απόκριση από το API."""
+    api = AsyncMock(return_value=b'{"curves": []}')
+    monkeypatch.setattr(utils, "get_data_from_api", api)
+    pi = AsyncMock()
+    monkeypatch.setattr(utils, "process_and_insert", pi)
+    await fetch_since(
+        fake_hass,
+        "tok",
+        "sup",
+        "tax",
+        datetime(2025, 4, 21),
+        datetime(2025, 4, 22),
+        "ctx",
+        0,
+        options={utils.CONF_PROCESS_OFFLOAD: True},
+    )
+    assert api.await_args.kwargs == {"raw": True}
+    pi.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_process_and_insert_cooperative_yields(monkeypatch, fake_hass):
+    """
+    Σε cooperative mode με max_slice_ms=0, η επεξεργασία παραχωρεί το event
+    loop ανάμεσα στα slices και ο watchdog καταγράφει κάθε slice.
+    """
+    from deddie_metering.helpers.watchdog import get_loop_lag_watchdog
+
+    base = datetime(2025, 5, 1)
+    records = [
+        {
+            "meterDate": (base + timedelta(hours=i)).strftime("%d/%m/%Y %H:%M"),
+            "consumption": "1",
+        }
+        for i in range(1, 24 * 3 + 1)
+    ]
+    sleeps = []
+    real_sleep = asyncio.sleep
+
+    async def fake_sleep(delay):
+        sleeps.append(delay)
+        await real_sleep(0)
+
+    monkeypatch.setattr(utils.asyncio, "sleep", fake_sleep)
+    monkeypatch.setattr(utils, "async_import_statistics", lambda *_a: None)
+    watchdog = get_loop_lag_watchdog("COOP")
+    watchdog.reset()
+    options = {utils.CONF_COOPERATIVE: True, utils.CONF_MAX_SLICE_MS: 0}
+    count, total, _ = await process_and_insert(
+        fake_hass, records, "COOP", 0.0, "consumption", options
+    )
+    assert count == 72
+    assert total == 72.0
+    # 3 ημέρες επεξεργασίας + 3 ημέρες δημιουργίας StatisticData
+    assert len(sleeps) == 6
+    assert watchdog.slices == len(sleeps) + 1
+    assert watchdog.max_slice >= 0.0
+
+    # Χωρίς cooperative mode ολόκληρη η επεξεργασία είναι ένα slice
+    sleeps.clear()
+    watchdog.reset()
+    await process_and_insert(fake_hass, records, "COOP", 0.0, "consumption")
+    assert sleeps == []
+    assert watchdog.slices == 1
+
+
+def test_backfill_window_days():
+    assert utils.backfill_window_days(None) == 364
+    assert utils.backfill_window_days({}) == 364
+    target = 30 * 24 * utils.ESTIMATED_RECORD_BYTES
+    assert utils.backfill_window_days({utils.CONF_BACKFILL_MEMORY_TARGET: target}) == 30
+    # Όρια: τουλάχιστον μία ημέρα, το πολύ 364
+    assert utils.backfill_window_days({utils.CONF_BACKFILL_MEMORY_TARGET: 1}) == 1
+    assert (
+        utils.backfill_window_days({utils.CONF_BACKFILL_MEMORY_TARGET: 10**12}) == 364
+    )
+
+
+@pytest.mark.asyncio
+async def test_batch_fetch_memory_bounded_windows(monkeypatch, fake_hass):
+    """Σε memory-bounded mode τα παράθυρα του batch_fetch μικραίνουν."""
+    api = AsyncMock(return_value=[])
+    monkeypatch.setattr(utils, "get_data_from_api", api)
+    monkeypatch.setattr(utils, "load_last_total", AsyncMock(return_value=0.0))
+    monkeypatch.setattr(utils, "load_checkpoint", AsyncMock(return_value=None))
+    target = 10 * 24 * utils.ESTIMATED_RECORD_BYTES
+    await batch_fetch(
+        fake_hass,
+        "tok",
+        "sup",
+        "tax",
+        datetime(2025, 1, 1),
+        datetime(2025, 1, 31),
+        "ctx",
+        0,
+        options={utils.CONF_BACKFILL_MEMORY_TARGET: target},
+    )
+    # 30 ημέρες σε παράθυρα των 10 ημερών
+    assert api.await_count == 3
+    assert api.await_args_list[0].args[5] == datetime(2025, 1, 11)
+
+
+@pytest.mark.asyncio
+async def test_process_and_insert_memory_bounded(monkeypatch, fake_hass):
+    """
+    Σε memory-bounded mode τα StatisticData εισάγονται σε τμήματα ακέραιων
+    ημερών, η λίστα records αδειάζει και η μέγιστη μνήμη κατά την επεξεργασία
+    μένει εντός του στόχου και είναι μικρότερη από την επεξεργασία χωρίς όριο.
+    Το tracemalloc σταματά μόνο αν το ξεκίνησε το ίδιο το test, ώστε να μην
+    επηρεάζεται η παρακολούθηση του υπόλοιπου suite.
+    """
+    import gc
+    import tracemalloc
+
+    days = 60
+    base = datetime(2025, 1, 1)
+
+    def make_records():
+        return [
+            {
+                "meterDate": (base + timedelta(hours=i)).strftime("%d/%m/%Y %H:%M"),
+                "consumption": "1",
+            }
+            for i in range(1, 24 * days + 1)
+        ]
+
+    chunks = []
+
+    def fake_import(_hass, _metadata, stats):
+        chunks.append(len(stats))
+
+    class Stat:
+        __slots__ = ("start", "state", "sum")
+
+        def __init__(self, start, state, sum):
+            self.start, self.state, self.sum = start, state, sum
+
+    monkeypatch.setattr(utils, "async_import_statistics", fake_import)
+    monkeypatch.setattr(utils, "StatisticData", Stat)
+
+    async def peak(options):
+        records = make_records()
+        was_tracing = tracemalloc.is_tracing()
+        if not was_tracing:
+            tracemalloc.start()
+        # Χωρίς συλλογή απορριμμάτων κατά τη μέτρηση, ώστε η απελευθέρωση
+        # άσχετων αντικειμένων να μην αλλοιώνει τη μέγιστη μνήμη
+        gc.collect()
+        gc.disable()
+        try:
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+            result = await process_and_insert(
+                fake_hass, records, "MEM", 0.0, "consumption", options
+            )
+            used = tracemalloc.get_traced_memory()[1] - baseline
+        finally:
+            gc.enable()
+            if not was_tracing:
+                tracemalloc.stop()
+        return result, records, used
+
+    (count, total, last), records, unbounded_peak = await peak(None)
+    assert chunks == [24 * days]
+    assert len(records) == 24 * days
+
+    chunks.clear()
+    target = 4 * 7 * 24 * utils.ESTIMATED_STATISTIC_BYTES
+    options = {utils.CONF_BACKFILL_MEMORY_TARGET: target}
+    (b_count, b_total, b_last), records, bounded_peak = await peak(options)
+    assert (b_count, b_total, b_last) == (count, total, last)
+    # Τμήματα των 7 ημερών και ένα τελικό με τις υπόλοιπες
+    assert chunks == [24 * 7] * 8 + [24 * 4]
+    assert records == []
+    assert bounded_peak < unbounded_peak
+    # Η μέγιστη μνήμη της επεξεργασίας (τα records του παραθύρου έχουν ήδη
+    # δεσμευτεί από τη λήψη) μένει εντός του προϋπολογισμού των StatisticData
+    # (target / 4), με περιθώριο 50% για τα ενδιάμεσα αντικείμενα (datetime,
+    # float) και την επιβάρυνση του allocator
+    assert bounded_peak <= target // 4 * 1.5
+
+
+@pytest.mark.asyncio
+async def test_process_and_insert_accepts_dst_days(monkeypatch, fake_hass):
+    """
+    Με τοπική ζώνη ώρας, η ημέρα επαναφοράς της χειμερινής ώρας (25 εγγραφές)
+    εισάγεται με μοναδικές, διαδοχικές ώρες έναρξης.
+    """
+    from zoneinfo import ZoneInfo
+
+    monkeypatch.setattr(
+        dt_util, "DEFAULT_TIME_ZONE", ZoneInfo("Europe/Athens"), raising=False
+    )
+    imported = []
+    monkeypatch.setattr(utils, "StatisticData", dict)
+    monkeypatch.setattr(
+        utils, "async_import_statistics", lambda _h, _m, stats: imported.extend(stats)
+    )
+    base = datetime(2025, 10, 26)
+    records = [
+        {
+            "meterDate": (base + timedelta(hours=i)).strftime("%d/%m/%Y %H:%M"),
+            "consumption": "1",
+        }
+        for i in range(1, 25)
+    ]
+    records.insert(3, dict(records[3]))
+    count, total, last = await process_and_insert(
+        fake_hass, records, "DST", 0.0, "consumption"
+    )
+    assert count == 25
+    assert total == 25.0
+    stamps = [stat["start"].timestamp() for stat in imported]
+    assert all(b - a == 3600 for a, b in zip(stamps, stamps[1:]))
+    assert len(stamps) == 25
+    assert last.replace(tzinfo=None) == datetime(2025, 10, 27)
+
+
+@pytest.mark.asyncio
+async def test_process_and_insert_validation_policy(monkeypatch, fake_hass):
+    """
+    Μηδενική παραγωγή (π.χ. τη νύχτα) γίνεται δεκτή, ενώ οι κανόνες της
+    πολιτικής επικύρωσης μπορούν να παρακαμφθούν ανά classType.
+    """
+    monkeypatch.setattr(utils, "async_import_statistics", lambda *_a: None)
+    base = datetime(2025, 5, 1)
+    records = [
+        {
+            "meterDate": (base + timedelta(hours=i)).strftime("%d/%m/%Y %H:%M"),
+            "consumption": 0 if i < 7 else 1.5,
+        }
+        for i in range(1, 25)
+    ]
+    count, total, _ = await process_and_insert(
+        fake_hass, records, "PV", 0.0, "production"
+    )
+    assert count == 24
+    assert total == 27.0
+
+    # Κενή τιμή: απόρριψη με την προεπιλογή, αποδοχή (ως 0) με παράκαμψη
+    records[0]["consumption"] = None
+    count, _, _ = await process_and_insert(fake_hass, records, "PV", 0.0, "production")
+    assert count == 0
+    options = {utils.CONF_VALIDATION_POLICY: {ATTR_PRODUCTION: {"null": "accept"}}}
+    count, total, _ = await process_and_insert(
+        fake_hass, records, "PV", 0.0, "production", options
+    )
+    assert count == 24
+    assert total == 27.0
+    # Η παράκαμψη αφορά μόνο το classType της
+    count, _, _ = await process_and_insert(
+        fake_hass, records, "PV", 0.0, "injection", options
+    )
+    assert count == 0
+
+
+@pytest.mark.asyncio
+async def test_fetch_prefix_total_windows_and_errors(monkeypatch, fake_hass):
+    """
+    Το νέο διάστημα λαμβάνεται σε παράθυρα έως την προηγούμενη ημέρα της
+    παλιάς αρχικής ημερομηνίας, με σύνολο από 0.0 και χωρίς αποθήκευση.
+    """
+    api = AsyncMock(side_effect=[[{"meterDate": "01/01/2025 01:00"}], []])
+    monkeypatch.setattr(utils, "get_data_from_api", api)
+    pi = AsyncMock(return_value=(24, 24.0, None))
+    monkeypatch.setattr(utils, "process_and_insert", pi)
+    save = AsyncMock()
+    monkeypatch.setattr(utils, "save_last_total", save)
+    options = {
+        utils.CONF_BACKFILL_MEMORY_TARGET: 10 * 24 * utils.ESTIMATED_RECORD_BYTES
+    }
+    total = await utils.fetch_prefix_total(
+        fake_hass,
+        "tok",
+        "S1",
+        "tax",
+        datetime(2025, 1, 1),
+        datetime(2025, 1, 15),
+        ATTR_PRODUCTION,
+        options,
+    )
+    assert total == 24.0
+    assert [c.args[4:6] for c in api.await_args_list] == [
+        (datetime(2025, 1, 1), datetime(2025, 1, 11)),
+        (datetime(2025, 1, 12), datetime(2025, 1, 14)),
+    ]
+    assert pi.await_args.args[3:5] == (0.0, "production")
+    save.assert_not_awaited()
+
+    api = AsyncMock(side_effect=Exception("boom"))
+    monkeypatch.setattr(utils, "get_data_from_api", api)
+    total = await utils.fetch_prefix_total(
+        fake_hass,
+        "tok",
+        "S1",
+        "tax",
+        datetime(2025, 1, 1),
+        datetime(2025, 1, 15),
+        ATTR_CONSUMPTION,
+    )
+    assert total is None
+
+
+@pytest.mark.asyncio
+async def test_rebase_initial_batches(monkeypatch, fake_hass):
+    """
+    Το re-basing μετατοπίζει τις υπάρχουσες εγγραφές και το last_total κατά
+    το σύνολο του νέου διαστήματος, ή δεν αλλάζει τίποτα όταν δεν είναι εφικτό.
+    """
+    new_dt, old_dt = datetime(2024, 1, 1), datetime(2025, 1, 1)
+    monkeypatch.setattr(
+        utils, "load_last_update", AsyncMock(return_value=datetime(2025, 4, 1))
+    )
+    monkeypatch.setattr(utils, "load_checkpoint", AsyncMock(return_value=None))
+    monkeypatch.setattr(utils, "load_last_total", AsyncMock(return_value=100.0))
+    save_total = AsyncMock()
+    monkeypatch.setattr(utils, "save_last_total", save_total)
+    prefix = AsyncMock(side_effect=[50.0, 0.0, 5.0])
+    monkeypatch.setattr(utils, "fetch_prefix_total", prefix)
+    shift = AsyncMock(return_value=10)
+    monkeypatch.setattr(utils, "shift_statistics", shift)
+
+    assert await utils.rebase_initial_batches(
+        fake_hass, "tok", "S1", "tax", new_dt, old_dt, True
+    )
+    assert [c.args[6] for c in prefix.await_args_list] == [
+        ATTR_CONSUMPTION,
+        ATTR_PRODUCTION,
+        ATTR_INJECTION,
+    ]
+    # Χωρίς μετατόπιση για μηδενικό σύνολο (παραγωγή)
+    assert [c.args[2:] for c in shift.await_args_list] == [
+        (old_dt, 50.0, "consumption"),
+        (old_dt, 5.0, "injection"),
+    ]
+    # Το last_total γράφεται άμεσα, χωρίς καθυστέρηση
+    assert [c.args[2:] for c in save_total.await_args_list] == [(150.0,), (105.0,)]
+    assert [c.kwargs for c in save_total.await_args_list] == [
+        {"key": ATTR_CONSUMPTION, "delay": False},
+        {"key": ATTR_INJECTION, "delay": False},
+    ]
+
+    # Αποτυχία λήψης του νέου διαστήματος: καμία μετατόπιση
+    shift.reset_mock()
+    monkeypatch.setattr(utils, "fetch_prefix_total", AsyncMock(return_value=None))
+    assert not await utils.rebase_initial_batches(
+        fake_hass, "tok", "S1", "tax", new_dt, old_dt, False
+    )
+    shift.assert_not_awaited()
+
+    # Αποτυχία του UPDATE
+    monkeypatch.setattr(utils, "fetch_prefix_total", AsyncMock(return_value=1.0))
+    monkeypatch.setattr(utils, "shift_statistics", AsyncMock(side_effect=Exception))
+    assert not await utils.rebase_initial_batches(
+        fake_hass, "tok", "S1", "tax", new_dt, old_dt, False
+    )
+
+    # Διακοπείσα αρχική λήψη ή κατηγορία χωρίς προηγούμενη λήψη
+    monkeypatch.setattr(utils, "load_checkpoint", AsyncMock(return_value={"a": 1}))
+    assert not await utils.rebase_initial_batches(
+        fake_hass, "tok", "S1", "tax", new_dt, old_dt, False
+    )
+    monkeypatch.setattr(utils, "load_last_update", AsyncMock(return_value=None))
+    assert not await utils.rebase_initial_batches(
+        fake_hass, "tok", "S1", "tax", new_dt, old_dt, False
+    )
+
+
+@pytest.mark.asyncio
+async def test_scan_revisions_patches_changed_hours(monkeypatch, fake_hass):
+    """
+    Οι ωριαίες τιμές της νέας λήψης συγκρίνονται με τις διαφορές των
+    αποθηκευμένων sum: μόνο οι αναθεωρημένες ώρες διορθώνονται και το
+    last_total αυξάνεται κατά τη συνολική διαφορά.
+    """
+    base = datetime(2025, 4, 20)
+    records = [
+        {
+            "meterDate": (base + timedelta(hours=i)).strftime("%d/%m/%Y %H:%M"),
+            "consumption": "2" if i == 5 else "1",
+        }
+        for i in range(1, 25)
+    ]
+    api = AsyncMock(return_value=records)
+    monkeypatch.setattr(utils, "get_data_from_api", api)
+    last_update = base + timedelta(days=1)
+    monkeypatch.setattr(utils, "load_last_update", AsyncMock(return_value=last_update))
+    monkeypatch.setattr(utils, "load_last_total", AsyncMock(return_value=500.0))
+    save_total = AsyncMock()
+    monkeypatch.setattr(utils, "save_last_total", save_total)
+    # Αποθηκευμένα sum: 1 KWh ανά ώρα, συν η ώρα πριν από το παράθυρο
+    first_ts = base.timestamp()
+    stored = {first_ts + 3600 * h: 100.0 + h for h in range(-1, 24)}
+    sums = AsyncMock(return_value=stored)
+    monkeypatch.setattr(utils, "load_statistic_sums", sums)
+    patch = AsyncMock(return_value=20)
+    monkeypatch.setattr(utils, "patch_statistics", patch)
+
+    delta = await utils.scan_revisions(
+        fake_hass,
+        "tok",
+        "S1",
+        "tax",
+        ATTR_CONSUMPTION,
+        {utils.CONF_REVISION_WINDOW_DAYS: 3},
+    )
+    assert delta == 1.0
+    assert api.await_args.args[4:7] == (
+        last_update - timedelta(days=3),
+        last_update,
+        ATTR_CONSUMPTION,
+    )
+    assert sums.await_args.args[2:] == (
+        first_ts - 3600,
+        first_ts + 23 * 3600,
+        "consumption",
+    )
+    assert patch.await_args.args[2:] == ([(first_ts + 4 * 3600, 1.0)], "consumption")
+    save_total.assert_awaited_once_with(
+        fake_hass, "S1", 501.0, key=ATTR_CONSUMPTION, delay=False
+    )
+
+    # Χωρίς διαφορές: καμία ενημέρωση
+    patch.reset_mock()
+    records[4]["consumption"] = "1"
+    assert await utils.scan_revisions(fake_hass, "t", "S1", "x", ATTR_CONSUMPTION) == 0
+    patch.assert_not_awaited()
+
+    # Χωρίς αποθηκευμένα δεδομένα για τις ώρες, ή χωρίς πλήρεις ημέρες
+    sums.return_value = {}
+    records[4]["consumption"] = "3"
+    assert await utils.scan_revisions(fake_hass, "t", "S1", "x", ATTR_CONSUMPTION) == 0
+    api.return_value = records[:5]
+    assert await utils.scan_revisions(fake_hass, "t", "S1", "x", ATTR_CONSUMPTION) == 0
+    monkeypatch.setattr(utils, "load_last_update", AsyncMock(return_value=None))
+    assert await utils.scan_revisions(fake_hass, "t", "S1", "x", ATTR_CONSUMPTION) == 0
+    patch.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_scan_revisions_reads_statistics_only_for_archive_mismatches(
+    monkeypatch, fake_hass
+):
+    """
+    Με raw_archive οι ωριαίες τιμές συγκρίνονται πρώτα με το τοπικό αρχείο:
+    ο πίνακας statistics διαβάζεται μόνο για το εύρος των ωρών που διαφέρουν
+    ή λείπουν, και αυτές αρχειοθετούνται με τις νέες τιμές.
+    """
+    base = datetime(2025, 4, 20)
+    records = [
+        {
+            "meterDate": (base + timedelta(hours=i)).strftime("%d/%m/%Y %H:%M"),
+            "consumption": "2" if i == 5 else "1",
+        }
+        for i in range(1, 25)
+    ]
+    monkeypatch.setattr(utils, "get_data_from_api", AsyncMock(return_value=records))
+    last_update = base + timedelta(days=1)
+    monkeypatch.setattr(utils, "load_last_update", AsyncMock(return_value=last_update))
+    monkeypatch.setattr(utils, "load_last_total", AsyncMock(return_value=500.0))
+    monkeypatch.setattr(utils, "save_last_total", AsyncMock())
+    first_ts = base.timestamp()
+    # Αρχειοθετημένες τιμές 1 KWh (float32), χωρίς την τελευταία ώρα
+    archived = [(int(first_ts) + 3600 * h, 1.0000001) for h in range(23)]
+    read = AsyncMock(return_value=archived)
+    monkeypatch.setattr(utils, "async_read_hours", read)
+    write = AsyncMock(return_value=2)
+    monkeypatch.setattr(utils, "async_archive_hours", write)
+    stored = {first_ts + 3600 * h: 100.0 + h for h in range(-1, 24)}
+    sums = AsyncMock(return_value=stored)
+    monkeypatch.setattr(utils, "load_statistic_sums", sums)
+    patch = AsyncMock(return_value=20)
+    monkeypatch.setattr(utils, "patch_statistics", patch)
+    options = {
+        utils.CONF_RAW_ARCHIVE: True,
+        utils.CONF_ARCHIVE_BACKEND: utils.ARCHIVE_BACKEND_MMAP,
+    }
+
+    delta = await utils.scan_revisions(
+        fake_hass, "tok", "S1", "tax", ATTR_CONSUMPTION, options
+    )
+    assert delta == 1.0
+    assert read.await_args.args[1:3] == ("S1", ATTR_CONSUMPTION)
+    assert [dt.timestamp() for dt in read.await_args.args[3:5]] == [
+        first_ts,
+        first_ts + 23 * 3600,
+    ]
+    assert read.await_args.args[5] == utils.ARCHIVE_BACKEND_MMAP
+    assert sums.await_args.args[2:4] == (first_ts + 3 * 3600, first_ts + 23 * 3600)
+    assert patch.await_args.args[2] == [(first_ts + 4 * 3600, 1.0)]
+    assert write.await_args.args[1:] == (
+        "S1",
+        ATTR_CONSUMPTION,
+        [(int(first_ts) + 4 * 3600, 2.0), (int(first_ts) + 23 * 3600, 1.0)],
+        utils.ARCHIVE_BACKEND_MMAP,
+    )
+
+    # Όλες οι ώρες συμφωνούν με το αρχείο: καμία ανάγνωση του statistics
+    sums.reset_mock()
+    patch.reset_mock()
+    read.return_value = [(int(first_ts) + 3600 * h, 1.0) for h in range(24)]
+    records[4]["consumption"] = "1"
+    assert (
+        await utils.scan_revisions(fake_hass, "t", "S1", "x", ATTR_CONSUMPTION, options)
+        == 0.0
+    )
+    sums.assert_not_awaited()
+    patch.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_scan_revisions_confirmed_tracking(monkeypatch, fake_hass):
+    """
+    Με confirmed_tracking ο επανέλεγχος κάνει μία κλήση, μόνο για τα
+    επιβεβαιωμένα δεδομένα μετά το confirmed_until, το οποίο προχωρά.
+    """
+    day1, day2 = datetime(2025, 4, 19), datetime(2025, 4, 20)
+    last_update = day2 + timedelta(days=1)
+    confirmed_until = day1
+    api = AsyncMock(return_value=[{"meterDate": "20/04/2025 01:00"}])
+    monkeypatch.setattr(utils, "get_data_from_api", api)
+    monkeypatch.setattr(utils, "load_last_update", AsyncMock(return_value=last_update))
+    monkeypatch.setattr(
+        utils, "load_confirmed_until", AsyncMock(return_value=confirmed_until)
+    )
+    save_confirmed = AsyncMock()
+    monkeypatch.setattr(utils, "save_confirmed_until", save_confirmed)
+    apply = AsyncMock(return_value=(0.5, day2))
+    monkeypatch.setattr(utils, "_apply_revisions", apply)
+    options = {utils.CONF_CONFIRMED_TRACKING: True}
+
+    delta = await utils.scan_revisions(
+        fake_hass, "tok", "S1", "tax", ATTR_PRODUCTION, options
+    )
+    assert delta == 0.5
+    api.assert_awaited_once()
+    assert api.await_args.args[4:6] == (confirmed_until, last_update)
+    assert api.await_args.kwargs == {"confirmed": True}
+    save_confirmed.assert_awaited_once_with(fake_hass, "S1", day2, key=ATTR_PRODUCTION)
+
+    # Χωρίς confirmed_until: από την αρχή του παραθύρου επανελέγχου
+    api.reset_mock()
+    monkeypatch.setattr(utils, "load_confirmed_until", AsyncMock(return_value=None))
+    apply.return_value = (0.0, last_update)
+    assert (
+        await utils.scan_revisions(fake_hass, "t", "S1", "x", ATTR_PRODUCTION, options)
+        == 0.0
+    )
+    assert api.await_count == 1
+    assert api.await_args.args[4] == last_update - timedelta(days=7)
+
+    # Παλαιό confirmed_until: η λήψη περιορίζεται στο παράθυρο επανελέγχου
+    api.reset_mock()
+    monkeypatch.setattr(
+        utils,
+        "load_confirmed_until",
+        AsyncMock(return_value=last_update - timedelta(days=400)),
+    )
+    await utils.scan_revisions(fake_hass, "t", "S1", "x", ATTR_PRODUCTION, options)
+    assert api.await_args.args[4:6] == (last_update - timedelta(days=7), last_update)
+
+    # Χωρίς νέα επιβεβαιωμένα δεδομένα: το confirmed_until δεν αλλάζει
+    save_confirmed.reset_mock()
+    monkeypatch.setattr(
+        utils, "load_confirmed_until", AsyncMock(return_value=confirmed_until)
+    )
+    apply.return_value = (0.0, None)
+    await utils.scan_revisions(fake_hass, "t", "S1", "x", ATTR_PRODUCTION, options)
+    save_confirmed.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_process_and_insert_archives_hourly_values(monkeypatch, fake_hass):
+    """Με raw_archive οι ωριαίες τιμές αποθηκεύονται στο ίδιο πέρασμα."""
+    base = datetime(2025, 5, 1, 1, 0)
+    records = [
+        {
+            "meterDate": (base + timedelta(hours=i)).strftime("%d/%m/%Y %H:%M"),
+            "consumption": str(i % 3),
+        }
+        for i in range(24)
+    ]
+    archived = AsyncMock()
+    monkeypatch.setattr(utils, "async_archive_hours", archived)
+    monkeypatch.setattr(utils, "async_import_statistics", MagicMock())
+    await process_and_insert(fake_hass, list(records), "XYZ", 5.0, "production")
+    archived.assert_not_awaited()
+
+    count, total, _ = await process_and_insert(
+        fake_hass, records, "XYZ", 5.0, "production", {utils.CONF_RAW_ARCHIVE: True}
+    )
+    assert (count, total) == (24, 5.0 + 24)
+    archived.assert_awaited_once()
+    args = archived.await_args.args
+    assert args[1:3] == ("XYZ", ATTR_PRODUCTION)
+    assert args[4] == utils.DEFAULT_ARCHIVE_BACKEND
+    rows = args[3]
+    assert [value for _, value in rows] == [float(i % 3) for i in range(24)]
+    assert [b - a for (a, _), (b, _) in zip(rows, rows[1:])] == [3600] * 23
+
+
+@pytest.mark.asyncio
+async def test_process_and_insert_compacts_cold_years(monkeypatch, fake_hass):
+    """Με archive_cold_after_years συμπιέζονται τα παλαιότερα έτη (mmap)."""
+    base = datetime(2025, 5, 1, 1, 0)
+    records = [
+        {
+            "meterDate": (base + timedelta(hours=i)).strftime("%d/%m/%Y %H:%M"),
+            "consumption": "1",
+        }
+        for i in range(24)
+    ]
+    monkeypatch.setattr(utils, "async_archive_hours", AsyncMock())
+    compact = AsyncMock()
+    monkeypatch.setattr(utils, "async_compact_archive", compact)
+    monkeypatch.setattr(utils, "async_import_statistics", MagicMock())
+    options = {utils.CONF_RAW_ARCHIVE: True, utils.CONF_ARCHIVE_COLD_AFTER_YEARS: 2}
+    await process_and_insert(
+        fake_hass, list(records), "XYZ", 0.0, "consumption", options
+    )
+    compact.assert_not_awaited()
+    options[utils.CONF_ARCHIVE_BACKEND] = utils.ARCHIVE_BACKEND_MMAP
+    await process_and_insert(fake_hass, records, "XYZ", 0.0, "consumption", options)
+    compact.assert_awaited_once_with(fake_hass, "XYZ", ATTR_CONSUMPTION, 2023)
@@ -0,0 +1,34 @@
+from deddie_metering.helpers import validation
+from deddie_metering.const import ATTR_PRODUCTION
+
+
+def test_resolve_policy_defaults_and_overrides(caplog):
+    defaults = validation.DEFAULT_VALIDATION_POLICY[ATTR_PRODUCTION]
+    assert validation.resolve_policy(defaults) == (True, False, False, True)
+    overrides = {"null": "accept", "negative": "reject"}
+    assert validation.resolve_policy(defaults, overrides) == (True, True, False, False)
+    # Μη έγκυροι κανόνες/ενέργειες αγνοούνται
+    bad = {"zero": "maybe", "unknown": "accept"}
+    assert validation.resolve_policy(defaults, bad) == (True, False, False, True)
+    assert "Μη έγκυρος κανόνας επικύρωσης" in caplog.text
+
+
+def test_compile_validator_rules_and_cache():
+    strict = validation.compile_validator((False, False, False, False))
+    assert strict({"consumption": "1.5"})
+    assert not strict({"consumption": 0})
+    assert not strict({"consumption": "0"})
+    assert not strict({"consumption": None})
+    assert not strict({"consumption": ""})
+    assert not strict({})
+    assert not strict({"consumption": "-1"})
+    # Μη αριθμητικές τιμές δεν απορρίπτουν την ημέρα
+    assert strict({"consumption": "bad"})
+
+    lenient = validation.compile_validator((True, True, True, True))
+    assert all(
+        lenient(rec)
+        for rec in ({"consumption": 0}, {"consumption": None}, {}, {"consumption": -2})
+    )
+    # Ο επικυρωτής δημιουργείται μία φορά ανά πολιτική
+    assert validation.compile_validator((True, True, True, True)) is lenient
@@ -0,0 +1,30 @@
+from deddie_metering.helpers import watchdog as watchdog_mod
+
+
+def test_watchdog_tracks_longest_slice(monkeypatch):
+    ticks = iter([1.0, 1.5, 2.0, 2.1, 3.0, 3.2])
+    monkeypatch.setattr(watchdog_mod.time, "perf_counter", lambda: next(ticks))
+    watchdog = watchdog_mod.LoopLagWatchdog()
+    # Χωρίς ενεργό slice δεν καταγράφεται τίποτα
+    assert watchdog.elapsed() == 0.0
+    watchdog.end_slice()
+    assert watchdog.slices == 0
+
+    watchdog.start_slice()  # 1.0
+    watchdog.end_slice()  # 1.5 -> 0.5
+    watchdog.start_slice()  # 2.0
+    watchdog.end_slice()  # 2.1 -> 0.1
+    assert watchdog.slices == 2
+    assert watchdog.max_slice == 0.5
+
+    watchdog.reset()
+    assert watchdog.max_slice == 0.0
+    assert watchdog.slices == 0
+    watchdog.start_slice()  # 3.0
+    assert watchdog.elapsed() == 3.2 - 3.0
+
+
+def test_get_loop_lag_watchdog_per_supply():
+    first = watchdog_mod.get_loop_lag_watchdog("SUP_A")
+    assert watchdog_mod.get_loop_lag_watchdog("SUP_A") is first
+    assert watchdog_mod.get_loop_lag_watchdog("SUP_B") is not first